@@ -38,6 +38,20 @@ pyinstaller --name="檔案重新命名工具" ^
     --add-data "ui_theme.py;." ^
     --add-data "security_utils.py;." ^
     --add-data "filename_validator.py;." ^
+    --add-data "rename_engine.py;." ^
+    --add-data "folder_scanner.py;." ^
+    --add-data "file_collection.py;." ^
+    --add-data "file_metadata.py;." ^
+    --add-data "file_statistics.py;." ^
+    --add-data "virtual_list.py;." ^
+    --add-data "file_search.py;." ^
+    --add-data "thumbnail_cache.py;." ^
+    --add-data "preview_loader.py;." ^
+    --add-data "image_decoder.py;." ^
+    --add-data "mp4_parser.py;." ^
+    --add-data "photo_pool.py;." ^
+    --add-data "contact_sheet.py;." ^
+    --add-data "process_decoder.py;." ^
     --hidden-import=tkinterdnd2 ^
     --hidden-import=PIL ^
     --hidden-import=PIL.Image ^
@@ -47,6 +61,20 @@ pyinstaller --name="檔案重新命名工具" ^
     --hidden-import=ui_theme ^
     --hidden-import=security_utils ^
     --hidden-import=filename_validator ^
+    --hidden-import=rename_engine ^
+    --hidden-import=folder_scanner ^
+    --hidden-import=file_collection ^
+    --hidden-import=file_metadata ^
+    --hidden-import=file_statistics ^
+    --hidden-import=virtual_list ^
+    --hidden-import=file_search ^
+    --hidden-import=thumbnail_cache ^
+    --hidden-import=preview_loader ^
+    --hidden-import=image_decoder ^
+    --hidden-import=mp4_parser ^
+    --hidden-import=photo_pool ^
+    --hidden-import=contact_sheet ^
+    --hidden-import=process_decoder ^
     --collect-all tkinterdnd2 ^
     --collect-all PIL ^
     file_renamer.py
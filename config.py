@@ -42,6 +42,7 @@ THEMES = {
 CONFIG_DIR = Path.home() / ".file_renamer"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 HISTORY_FILE = CONFIG_DIR / "history.json"
+THUMBNAIL_DIR = CONFIG_DIR / "thumbnails"
 
 # 預設配置
 DEFAULT_CONFIG = {
@@ -56,6 +57,10 @@ DEFAULT_CONFIG = {
     "last_anime_num": "01",
     "last_color": "00",
     "max_files": "0",
+    "include_subfolders": False,
+    "search_mode": "substring",
+    "preview_high_quality": False,
+    "process_decode_min_pixels": 24000000,
     "dark_mode": False,
     "window_geometry": DEFAULT_WINDOW_SIZE,
     "remember_settings": True
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+縮圖網格元件（聯絡表）- 以網格顯示整批檔案的縮圖和新舊檔名，只載入和繪製可見的格子
+"""
+
+import tkinter as tk
+
+from photo_pool import PhotoImagePool
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+# 格子的內邊距和檔名行高
+CELL_PADDING = 6
+CELL_TEXT_HEIGHT = 16
+
+
+def fit_to_cell(image, cell_size):
+    """
+    將縮圖置中放到固定大小的透明底圖上（在背景執行緒中調用）
+
+    所有格子的圖片模式和尺寸相同，捲動時移出畫面的 Tk 圖片可以直接重用；
+    透明的邊緣會顯示畫布的背景色，切換深色模式不需要重新生成
+    """
+    cell = Image.new('RGBA', tuple(cell_size), (0, 0, 0, 0))
+    offset = ((cell_size[0] - image.width) // 2, (cell_size[1] - image.height) // 2)
+    cell.paste(image, offset)
+    return cell
+
+
+def _ellipsize(text, max_chars):
+    """超過 max_chars 的文字保留開頭和結尾，中間以省略號代替"""
+    if len(text) <= max_chars:
+        return text
+    keep = max(1, max_chars - 1)
+    head = keep // 2
+    return text[:head] + "…" + text[len(text) - (keep - head):]
+
+
+class _Cell:
+    """一個可見格子的畫布項目和目前顯示的內容"""
+
+    def __init__(self, canvas):
+        self.image_id = canvas.create_image(0, 0, anchor=tk.NW, state='hidden')
+        self.hint_id = canvas.create_text(0, 0, anchor=tk.CENTER, state='hidden')
+        self.old_id = canvas.create_text(0, 0, anchor=tk.N, state='hidden')
+        self.new_id = canvas.create_text(0, 0, anchor=tk.N, state='hidden')
+        self.item = None
+        self.photo = None
+
+
+class ContactSheetView(tk.Canvas):
+    """
+    縮圖網格（捲動方式與 VirtualListView 相同，以網格的行為單位）
+
+    - 只為可見的格子建立畫布項目，捲動時重用
+    - 格子需要縮圖時調用 thumbnail_func(item)：已快取時返回 PIL 圖片，否則返回 None；
+      每次重繪結束後，把所有還沒有縮圖的可見項目（按顯示順序）交給 request_func(items)
+    - 縮圖載入後由調用者在主線程中調用 set_thumbnail(item, image)
+    - 只有可見的格子持有 Tk 圖片，移出畫面的圖片放回圖片池給新進入畫面的格子重用，
+      記憶體和解碼量只與可見範圍有關，與檔案數量無關
+    - label_func(item, index) 返回 (原檔名, 新檔名)；點擊格子時調用 on_activate(item)
+    """
+
+    def __init__(self, master, label_func, thumbnail_func, request_func, on_activate=None,
+                 image_size=(140, 140), yscrollcommand=None, **kwargs):
+        self._bg = kwargs.pop('bg', kwargs.pop('background', 'white'))
+        self._fg = kwargs.pop('fg', 'black')
+        self._new_fg = kwargs.pop('newforeground', 'blue')
+        super().__init__(master, bg=self._bg, highlightthickness=0, **kwargs)
+
+        self._label_func = label_func
+        self._thumbnail_func = thumbnail_func
+        self._request_func = request_func
+        self._on_activate = on_activate
+        self._yscrollcommand = yscrollcommand
+        self.image_size = tuple(image_size)
+        self.cell_width = self.image_size[0] + CELL_PADDING * 2
+        self.cell_height = self.image_size[1] + CELL_PADDING * 3 + CELL_TEXT_HEIGHT * 2
+        self._items = []
+        self._unavailable = set()   # 無法產生縮圖的項目（不再重複請求）
+        self._top = 0               # 第一個可見的網格行
+        self._cells = []
+        self._photo_pool = PhotoImagePool()
+        self._redraw_pending = False
+
+        self.bind('<Configure>', lambda e: self._schedule_redraw())
+        self.bind('<Button-1>', self._on_click)
+        self.bind('<MouseWheel>', self._on_mousewheel)
+        self.bind('<Button-4>', lambda e: self._scroll_units(-1))
+        self.bind('<Button-5>', lambda e: self._scroll_units(1))
+        self.bind('<Prior>', lambda e: self._scroll_units(-self._visible_rows()))
+        self.bind('<Next>', lambda e: self._scroll_units(self._visible_rows()))
+
+    # ---------- 資料 ----------
+
+    def set_items(self, items):
+        """替換全部項目（保持捲動位置；仍在原格子中的項目不會重新載入縮圖）"""
+        self._items = list(items)
+        self._unavailable.clear()
+        self._top = max(0, min(self._top, self._total_rows() - self._visible_rows()))
+        self._schedule_redraw()
+
+    def refresh_labels(self):
+        """命名參數改變後只更新可見格子的檔名"""
+        first = self._top * self._columns()
+        for slot, cell in enumerate(self._cells):
+            if cell.item is not None:
+                self._draw_labels(cell, first + slot)
+
+    def set_thumbnail(self, item, image):
+        """縮圖載入完成（主線程中調用；image 為 None 表示無法產生縮圖）"""
+        if image is None:
+            self._unavailable.add(item)
+        for cell in self._cells:
+            if cell.item == item and cell.photo is None:
+                self._show_image(cell, image)
+
+    def clear(self):
+        """清空項目並釋放所有 Tk 圖片"""
+        self._items = []
+        self._unavailable.clear()
+        self._top = 0
+        for cell in self._cells:
+            self._unbind(cell)
+        self._photo_pool.clear()
+        self._update_scrollbar()
+
+    def size(self):
+        return len(self._items)
+
+    # ---------- 捲動（Scrollbar相容） ----------
+
+    def yview(self, *args):
+        total = self._total_rows()
+        if not args:
+            if total == 0:
+                return 0.0, 1.0
+            return self._top / total, min(1.0, (self._top + self._visible_rows()) / total)
+        if args[0] == 'moveto':
+            self._set_top(int(round(float(args[1]) * total)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= max(1, self._visible_rows())
+            self._scroll_units(amount)
+
+    def _scroll_units(self, amount):
+        self._set_top(self._top + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # 阻止事件傳遞到主視窗的全域滾輪綁定
+        return self._scroll_units(int(-1 * (event.delta / 120)))
+
+    def _set_top(self, top):
+        top = max(0, min(top, self._total_rows() - self._visible_rows()))
+        if top != self._top:
+            self._top = top
+            self._schedule_redraw()
+
+    # ---------- 外觀 ----------
+
+    def configure(self, cnf=None, **kwargs):
+        """支援 fg 選項（格子中的原檔名顏色）"""
+        if cnf:
+            kwargs.update(cnf)
+        styled = False
+        if 'bg' in kwargs or 'background' in kwargs:
+            self._bg = kwargs.get('bg', kwargs.get('background'))
+        if 'fg' in kwargs:
+            self._fg = kwargs.pop('fg')
+            styled = True
+        result = super().configure(**kwargs) if kwargs else None
+        if styled:
+            for cell in self._cells:
+                self.itemconfigure(cell.old_id, fill=self._fg)
+                self.itemconfigure(cell.hint_id, fill=self._fg)
+        return result
+
+    config = configure
+
+    # ---------- 繪製 ----------
+
+    def _columns(self):
+        width = self.winfo_width()
+        if width <= 1:
+            width = int(self.cget('width'))
+        return max(1, width // self.cell_width)
+
+    def _visible_rows(self):
+        """完整可見的網格行數"""
+        height = self.winfo_height()
+        if height <= 1:
+            height = int(self.cget('height'))
+        return max(1, height // self.cell_height)
+
+    def _total_rows(self):
+        columns = self._columns()
+        return (len(self._items) + columns - 1) // columns
+
+    def _schedule_redraw(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _redraw(self):
+        """重繪所有可見格子（包含最後一行部分可見的格子）"""
+        self._redraw_pending = False
+        columns = self._columns()
+        count = columns * (self._visible_rows() + 1)
+        while len(self._cells) < count:
+            self._cells.append(_Cell(self))
+        first = self._top * columns
+        missing = []
+        for slot, cell in enumerate(self._cells):
+            index = first + slot
+            if slot >= count or index >= len(self._items):
+                self._unbind(cell)
+                continue
+            self._bind(cell, slot, columns, index, missing)
+        if missing:
+            self._request_func(missing)
+        self._update_scrollbar()
+
+    def _bind(self, cell, slot, columns, index, missing):
+        """把格子對應到第 index 個項目"""
+        item = self._items[index]
+        x = (slot % columns) * self.cell_width
+        y = (slot // columns) * self.cell_height
+        image_x, image_y = x + CELL_PADDING, y + CELL_PADDING
+        center_x = x + self.cell_width // 2
+        text_y = image_y + self.image_size[1] + CELL_PADDING
+        self.coords(cell.image_id, image_x, image_y)
+        self.coords(cell.hint_id, center_x, image_y + self.image_size[1] // 2)
+        self.coords(cell.old_id, center_x, text_y)
+        self.coords(cell.new_id, center_x, text_y + CELL_TEXT_HEIGHT)
+
+        if cell.item != item:
+            self._unbind(cell)
+            cell.item = item
+            self._show_image(cell, self._thumbnail_func(item))
+        if cell.photo is None and item not in self._unavailable:
+            missing.append(item)
+        self._draw_labels(cell, index)
+
+    def _draw_labels(self, cell, index):
+        old_name, new_name = self._label_func(cell.item, index)
+        max_chars = max(4, self.cell_width // 7)
+        self.itemconfigure(cell.old_id, text=_ellipsize(old_name, max_chars),
+                           fill=self._fg, state='normal')
+        self.itemconfigure(cell.new_id, text=_ellipsize(new_name, max_chars),
+                           fill=self._new_fg, state='normal')
+
+    def _show_image(self, cell, image):
+        """顯示縮圖；沒有縮圖時顯示提示文字（載入中或無預覽）"""
+        photo = self._photo_pool.acquire(image) if image is not None else None
+        cell.photo = photo
+        if photo is not None:
+            self.itemconfigure(cell.image_id, image=photo, state='normal')
+            self.itemconfigure(cell.hint_id, state='hidden')
+        else:
+            hint = "無預覽" if cell.item in self._unavailable else "載入中..."
+            self.itemconfigure(cell.image_id, image='', state='hidden')
+            self.itemconfigure(cell.hint_id, text=hint, fill=self._fg, state='normal')
+
+    def _unbind(self, cell):
+        """隱藏格子，Tk 圖片放回圖片池"""
+        if cell.photo is not None:
+            # 先從畫布上移除再放回，重用時覆寫像素不會觸發重繪
+            self.itemconfigure(cell.image_id, image='')
+            self._photo_pool.release(cell.photo)
+            cell.photo = None
+        cell.item = None
+        for item_id in (cell.image_id, cell.hint_id, cell.old_id, cell.new_id):
+            self.itemconfigure(item_id, state='hidden')
+
+    def _update_scrollbar(self):
+        if self._yscrollcommand:
+            first, last = self.yview()
+            self._yscrollcommand(first, last)
+
+    # ---------- 滑鼠 ----------
+
+    def _on_click(self, event):
+        self.focus_set()
+        if self._on_activate is None:
+            return
+        column = int(event.x) // self.cell_width
+        columns = self._columns()
+        if column >= columns:
+            return
+        index = (self._top + int(event.y) // self.cell_height) * columns + column
+        if index < len(self._items):
+            self._on_activate(self._items[index])
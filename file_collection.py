@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+有序檔案集合 - 保持插入順序，同時提供O(1)的成員檢查和追加
+"""
+
+
+class FileCollection:
+    """
+    有序、不重複的檔案路徑集合（列表 + 路徑到位置的索引）
+
+    可以註冊監聽器，在內容改變時收到增量通知。監聽器需要實現：
+        on_added(paths), on_removed(paths), on_replaced(old_path, new_path),
+        on_reordered(), on_cleared()
+    """
+
+    def __init__(self, paths=()):
+        self._items = []
+        self._positions = {}
+        self._listeners = []
+        self.version = 0    # 每次內容或順序改變時遞增
+        self.extend(paths)
+
+    def add_listener(self, listener):
+        """註冊監聽器（註冊時會收到現有內容的 on_added 通知）"""
+        self._listeners.append(listener)
+        if self._items:
+            listener.on_added(list(self._items))
+
+    def _notify(self, method, *args):
+        self.version += 1
+        for listener in self._listeners:
+            getattr(listener, method)(*args)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, path):
+        return path in self._positions
+
+    def __getitem__(self, index):
+        """支援整數索引和切片（切片返回普通列表）"""
+        return self._items[index]
+
+    def __repr__(self):
+        return f"FileCollection({self._items!r})"
+
+    def _append(self, path):
+        if path in self._positions:
+            return False
+        self._positions[path] = len(self._items)
+        self._items.append(path)
+        return True
+
+    def append(self, path):
+        """
+        追加檔案（已存在時忽略）
+
+        Returns:
+            是否真的追加了
+        """
+        if not self._append(path):
+            return False
+        self._notify('on_added', [path])
+        return True
+
+    def extend(self, paths):
+        """
+        批量追加檔案（已存在或重複的路徑會被忽略）
+
+        Returns:
+            實際追加的檔案列表
+        """
+        added = [path for path in paths if self._append(path)]
+        if added:
+            self._notify('on_added', added)
+        return added
+
+    def index(self, path):
+        """返回檔案的位置（O(1)），不存在時拋出 ValueError"""
+        try:
+            return self._positions[path]
+        except KeyError:
+            raise ValueError(f"{path!r} 不在檔案集合中")
+
+    def swap(self, i, j):
+        """交換兩個位置的檔案（O(1)）"""
+        items = self._items
+        items[i], items[j] = items[j], items[i]
+        self._positions[items[i]] = i
+        self._positions[items[j]] = j
+        self._notify('on_reordered')
+
+    def move(self, src, dst):
+        """將檔案從 src 移動到 dst，只更新兩者之間的位置索引"""
+        if src == dst:
+            return
+        path = self._items.pop(src)
+        self._items.insert(dst, path)
+        for pos in range(min(src, dst), max(src, dst) + 1):
+            self._positions[self._items[pos]] = pos
+        self._notify('on_reordered')
+
+    def replace(self, old_path, new_path):
+        """
+        原地替換檔案路徑（例如重新命名後），保持位置不變
+
+        Returns:
+            是否替換成功（舊路徑不存在或新路徑已存在時返回 False）
+        """
+        if old_path not in self._positions or new_path in self._positions:
+            return False
+        pos = self._positions.pop(old_path)
+        self._items[pos] = new_path
+        self._positions[new_path] = pos
+        self._notify('on_replaced', old_path, new_path)
+        return True
+
+    def remove_indices(self, indices):
+        """
+        批量刪除指定位置的檔案（只重建第一個刪除位置之後的索引）
+
+        Returns:
+            被刪除的檔案列表
+        """
+        to_remove = sorted({i for i in indices if 0 <= i < len(self._items)})
+        if not to_remove:
+            return []
+        removed = [self._items[i] for i in to_remove]
+        for path in removed:
+            del self._positions[path]
+        remove_set = set(to_remove)
+        first = to_remove[0]
+        tail = [path for pos, path in enumerate(self._items[first:], first) if pos not in remove_set]
+        del self._items[first:]
+        self._items.extend(tail)
+        for pos in range(first, len(self._items)):
+            self._positions[self._items[pos]] = pos
+        self._notify('on_removed', removed)
+        return removed
+
+    def remove(self, path):
+        """刪除指定檔案，不存在時拋出 ValueError"""
+        self.remove_indices([self.index(path)])
+
+    def clear(self):
+        """清空集合"""
+        self._items.clear()
+        self._positions.clear()
+        self._notify('on_cleared')
+
+    def to_list(self):
+        """返回檔案路徑列表的副本"""
+        return list(self._items)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+檔案中繼資料快取 - 以路徑為鍵快取 stat 結果（大小、修改時間、inode、類型），
+導入時填入一次，重新命名或外部變更時失效；並按目錄快取目錄中的檔名（每個目錄一次 scandir）
+"""
+
+import os
+import stat
+import itertools
+import threading
+from collections import namedtuple
+
+
+# 快取的項目數上限，超過時丟棄最早快取的一部分（之後存取時重新 stat）
+MAX_CACHED_ENTRIES = 200_000
+# 超過上限時丟棄的比例
+PRUNE_FRACTION = 0.25
+
+# 快取的檔案中繼資料
+FileMetadata = namedtuple('FileMetadata', ['size', 'mtime', 'inode', 'is_file', 'is_dir'])
+
+
+def directory_key(dir_path):
+    """
+    目錄的正規化鍵（normpath + normcase）
+
+    同一目錄可能以不同形式出現（例如檔案對話框的 "C:/x" 和 safe_join_path 產生的 "C:\\x"），
+    所有按目錄索引的快取都必須使用此鍵，否則重新命名後會更新到另一個集合
+    """
+    return os.path.normcase(os.path.normpath(dir_path))
+
+
+def _parent_key(path):
+    return directory_key(os.path.dirname(path))
+
+
+def _metadata_from_stat(st, inode=None):
+    """由 os.stat_result 建立 FileMetadata"""
+    return FileMetadata(
+        size=st.st_size,
+        mtime=st.st_mtime,
+        inode=inode if inode is not None else st.st_ino,
+        is_file=stat.S_ISREG(st.st_mode),
+        is_dir=stat.S_ISDIR(st.st_mode)
+    )
+
+
+class FileMetadataCache:
+    """
+    檔案中繼資料快取（執行緒安全）
+
+    - 不存在的路徑也會被快取（值為 None），避免重複探測
+    - 記錄每個目錄在快取時的修改時間，check_directories() 只需對每個目錄
+      stat 一次即可發現外部的新增、刪除或重新命名
+    - 限制：直接修改檔案內容（大小、修改時間改變，但目錄中沒有新增、刪除或重新命名）
+      不會改變目錄的修改時間，因此不會被 check_directories() 發現；需要最新值時使用 refresh()
+    - 重新命名或刪除的舊路徑不保留在快取中；項目超過 MAX_CACHED_ENTRIES 時丟棄最早快取的一部分
+    - directory_names() 以一次 scandir 取得目錄中的所有檔名（按 os.path.normcase 比較，
+      Windows上不區分大小寫），重新命名時同步更新，外部變更時失效
+    """
+
+    def __init__(self):
+        self._entries = {}      # 路徑 -> FileMetadata 或 None（不存在）
+        self._dir_mtimes = {}   # 目錄鍵（directory_key）-> 快取時的修改時間
+        self._dir_names = {}    # 目錄鍵（directory_key）-> 目錄中的檔名集合（normcase 後）
+        self.names_version = 0  # 已快取的目錄檔名改變時遞增
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember_directory(self, path):
+        """記錄檔案所在目錄的修改時間（每個目錄只記錄一次；不可持有鎖，stat 在鎖外進行）"""
+        dir_path = _parent_key(path)
+        with self._lock:
+            if dir_path in self._dir_mtimes:
+                return
+        try:
+            dir_mtime = os.stat(dir_path).st_mtime
+        except OSError:
+            dir_mtime = None
+        with self._lock:
+            self._dir_mtimes.setdefault(dir_path, dir_mtime)
+
+    def _store(self, path, metadata):
+        """寫入快取項目，超過上限時丟棄最早快取的項目（需持有鎖）"""
+        entries = self._entries
+        entries[path] = metadata
+        if len(entries) > MAX_CACHED_ENTRIES:
+            for old_path in list(itertools.islice(entries, int(MAX_CACHED_ENTRIES * PRUNE_FRACTION))):
+                del entries[old_path]
+
+    def get(self, path):
+        """
+        獲取檔案中繼資料（未快取時 stat 一次）
+
+        Returns:
+            FileMetadata，路徑不存在或無法讀取時返回 None
+        """
+        with self._lock:
+            if path in self._entries:
+                self.hits += 1
+                return self._entries[path]
+            self.misses += 1
+        try:
+            metadata = _metadata_from_stat(os.stat(path))
+        except (OSError, ValueError):
+            metadata = None
+        with self._lock:
+            self._store(path, metadata)
+        self._remember_directory(path)
+        return metadata
+
+    def refresh(self, paths):
+        """
+        重新 stat 指定的路徑（檔案內容被直接修改時 check_directories() 無法發現）
+
+        Returns:
+            中繼資料改變的路徑列表
+        """
+        changed = []
+        for path in paths:
+            with self._lock:
+                old = self._entries.pop(path, None)
+            if self.get(path) != old:
+                changed.append(path)
+        return changed
+
+    def put_entry(self, entry):
+        """
+        由 os.DirEntry 填入快取（掃描資料夾時使用，Windows上不需要額外的系統調用）
+
+        Returns:
+            FileMetadata，無法讀取時返回 None
+        """
+        try:
+            metadata = _metadata_from_stat(entry.stat(), entry.inode())
+        except OSError:
+            metadata = None
+        with self._lock:
+            self._store(entry.path, metadata)
+        self._remember_directory(entry.path)
+        return metadata
+
+    def exists(self, path):
+        """路徑是否存在"""
+        return self.get(path) is not None
+
+    def directory_names(self, dir_path):
+        """
+        目錄中所有項目的名稱（normcase 後的集合，第一次調用時 scandir 一次）
+
+        返回的集合由快取持有，調用者不應修改；目錄無法讀取時返回空集合
+        """
+        dir_path = directory_key(dir_path)
+        with self._lock:
+            names = self._dir_names.get(dir_path)
+        if names is not None:
+            return names
+        try:
+            # 先記錄修改時間再掃描，掃描期間的外部變更會在下次檢查時發現
+            dir_mtime = os.stat(dir_path).st_mtime
+            with os.scandir(dir_path) as entries:
+                names = {os.path.normcase(entry.name) for entry in entries}
+        except OSError:
+            dir_mtime = None
+            names = set()
+        with self._lock:
+            self._dir_mtimes.setdefault(dir_path, dir_mtime)
+            return self._dir_names.setdefault(dir_path, names)
+
+    def name_exists(self, path):
+        """
+        目錄中是否已有同名項目（查詢目錄檔名集合，不 stat 路徑本身）
+
+        衝突檢查使用：每個目錄只 scandir 一次，之後都是記憶體中的集合查詢
+        """
+        dir_path, name = os.path.split(path)
+        return os.path.normcase(name) in self.directory_names(dir_path)
+
+    def _update_directory_names(self, path, present):
+        """重新命名或刪除後更新已掃描目錄的檔名集合（需持有鎖）"""
+        dir_path, name = os.path.split(path)
+        names = self._dir_names.get(directory_key(dir_path))
+        if names is None:
+            return
+        if present:
+            names.add(os.path.normcase(name))
+        else:
+            names.discard(os.path.normcase(name))
+        self.names_version += 1
+
+    def is_file(self, path):
+        """路徑是否為檔案"""
+        metadata = self.get(path)
+        return metadata is not None and metadata.is_file
+
+    def is_dir(self, path):
+        """路徑是否為目錄"""
+        metadata = self.get(path)
+        return metadata is not None and metadata.is_dir
+
+    def size(self, path):
+        """檔案大小（不存在時為0）"""
+        metadata = self.get(path)
+        return metadata.size if metadata is not None else 0
+
+    def invalidate(self, path):
+        """使單個路徑的快取失效（下次存取時重新 stat，所在目錄的檔名集合也重新掃描）"""
+        with self._lock:
+            self._entries.pop(path, None)
+            if self._dir_names.pop(_parent_key(path), None) is not None:
+                self.names_version += 1
+
+    def record_rename(self, old_path, new_path):
+        """重新命名成功後更新快取（重新命名不改變大小、修改時間和inode）"""
+        with self._lock:
+            # 舊路徑不再保留（避免快取隨重新命名無限增長）
+            metadata = self._entries.pop(old_path, None)
+            if metadata is not None:
+                self._store(new_path, metadata)
+            else:
+                self._entries.pop(new_path, None)
+            self._update_directory_names(old_path, False)
+            self._update_directory_names(new_path, True)
+            # 自己造成的目錄變更不應視為外部變更
+            for path in (old_path, new_path):
+                self._dir_mtimes.pop(_parent_key(path), None)
+        for path in (old_path, new_path):
+            self._remember_directory(path)
+
+    def record_removal(self, path):
+        """刪除檔案後更新快取"""
+        with self._lock:
+            self._entries.pop(path, None)
+            self._update_directory_names(path, False)
+            self._dir_mtimes.pop(_parent_key(path), None)
+        self._remember_directory(path)
+
+    def check_directories(self):
+        """
+        檢查外部變更：每個已知目錄 stat 一次，修改時間改變時使該目錄下的快取失效
+
+        只能發現目錄中的新增、刪除和重新命名；直接修改檔案內容不會改變目錄的修改時間（見 refresh()）
+
+        Returns:
+            修改時間已改變的目錄鍵集合（directory_key 的結果）
+        """
+        with self._lock:
+            dir_mtimes = list(self._dir_mtimes.items())
+
+        changed_dirs = set()
+        for dir_path, cached_mtime in dir_mtimes:
+            try:
+                current_mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                current_mtime = None
+            if current_mtime != cached_mtime:
+                changed_dirs.add(dir_path)
+
+        if changed_dirs:
+            with self._lock:
+                for path in [p for p in self._entries if _parent_key(p) in changed_dirs]:
+                    del self._entries[path]
+                for dir_path in changed_dirs:
+                    self._dir_mtimes.pop(dir_path, None)
+                    if self._dir_names.pop(dir_path, None) is not None:
+                        self.names_version += 1
+        return changed_dirs
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self._dir_mtimes.clear()
+            self._dir_names.clear()
+            self.names_version += 1
+
+
+# 全域中繼資料快取實例
+metadata_cache = FileMetadataCache()
@@ -3,6 +3,8 @@ from tkinter import ttk, filedialog, messagebox
 import os
 from pathlib import Path
 import sys
+import time
+import multiprocessing
 from threading import Thread
 from datetime import datetime
 
@@ -71,13 +73,26 @@ except ImportError:
         if ext and not ext.startswith('.'):
             ext = '.' + ext
         return f"Character_{str(int(char_id)).zfill(2)}_{char_type}_{str(int(char_index)).zfill(2)}{ext.lower() if ext else ''}"
-    def safe_rename(old_path, new_path):
+    def safe_rename(old_path, new_path, metadata=None):
         try:
             os.rename(old_path, new_path)
+            if metadata is not None:
+                metadata.record_rename(old_path, new_path)
             return True, None
         except Exception as e:
             return False, str(e)
 
+# 核心模組（只依賴標準庫和本專案的模組，打包時必須包含）
+from rename_engine import RenameRules, compile_rules, build_rename_plan, BatchNamer
+from folder_scanner import FolderIngestJob
+from file_collection import FileCollection
+from file_metadata import metadata_cache, directory_key
+from file_statistics import FileStatistics
+from file_search import FileSearchIndex, MODE_SUBSTRING, MODE_GLOB, MODE_REGEX, MODE_FUZZY
+from virtual_list import VirtualListView
+from preview_loader import PreviewLoader
+from mp4_parser import mp4_metadata_cache, describe_mp4, read_cover
+
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
     HAS_DND = True
@@ -92,7 +107,7 @@ except ImportError:
         pass
 
 try:
-    from PIL import Image, ImageTk
+    from PIL import Image
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
@@ -104,8 +119,61 @@ except ImportError:
     except:
         pass
 
+# 圖片預覽模組（縮圖快取、解碼、Tk 圖片池、縮圖網格），匯入失敗時停用圖片預覽和縮圖網格
+try:
+    from thumbnail_cache import thumbnail_cache, disk_thumbnail_cache, thumbnail_key
+    from image_decoder import decode_thumbnail_bytes, to_display_image
+    from process_decoder import ProcessThumbnailDecoder, DEFAULT_PROCESS_MIN_PIXELS
+    from photo_pool import PhotoImagePool
+    from contact_sheet import ContactSheetView, fit_to_cell
+    HAS_IMAGE_PREVIEW = True
+except ImportError:
+    HAS_IMAGE_PREVIEW = False
+    HAS_PIL = False
+    try:
+        import sys
+        if not hasattr(sys, 'frozen'):
+            print("警告：無法匯入圖片預覽模組，圖片預覽和縮圖網格將不可用")
+    except:
+        pass
+    DEFAULT_PROCESS_MIN_PIXELS = 0
+    ProcessThumbnailDecoder = None
+    ContactSheetView = None
+    # 圖片池的備用實現（沒有圖片可以顯示）
+    class PhotoImagePool:
+        def acquire(self, image):
+            return None
+        def release(self, photo):
+            pass
+        def clear(self):
+            pass
+
 # tkinter已在第一行導入，無需重複檢查
 
+# 背景導入資料夾時，主線程取出掃描結果的間隔（毫秒）
+INGEST_POLL_INTERVAL = 50
+# 視窗重新獲得焦點時檢查外部檔案變更的最短間隔（秒）
+EXTERNAL_CHANGE_CHECK_INTERVAL = 2.0
+# 搜尋框停止輸入多久後才過濾列表（毫秒）
+SEARCH_DEBOUNCE_MS = 150
+# 候選檔案超過此數量時在背景執行緒中搜尋，避免輸入時卡頓
+SEARCH_THREAD_THRESHOLD = 20000
+# 預覽圖片的最大尺寸
+PREVIEW_IMAGE_SIZE = (300, 300)
+# 預取當前檔案前後各多少個檔案的縮圖
+PREFETCH_RADIUS = 4
+# 縮圖網格中每格縮圖的尺寸
+CONTACT_SHEET_IMAGE_SIZE = (140, 140)
+# 縮圖網格同時解碼的數量
+CONTACT_SHEET_WORKERS = 2
+# 搜尋模式（顯示名稱 -> 模式）
+SEARCH_MODE_LABELS = {
+    "包含": MODE_SUBSTRING,
+    "萬用字元": MODE_GLOB,
+    "正規表示式": MODE_REGEX,
+    "模糊": MODE_FUZZY,
+}
+
 
 class FileRenamerGUI:
     def __init__(self, root):
@@ -119,9 +187,16 @@ class FileRenamerGUI:
         else:
             self.root.geometry(DEFAULT_WINDOW_SIZE)
         
-        self.selected_files = []
+        self.selected_files = FileCollection()  # 有序檔案集合（O(1)成員檢查）
+        self.file_stats = FileStatistics()  # 增量統計（隨檔案集合變動更新）
+        self.media_scan_running = False     # 是否正在背景解析影片時長
+        self.selected_files.add_listener(self.file_stats)
+        self.search_index = FileSearchIndex(self.selected_files)  # 預先計算的搜尋索引
+        self.search_after_id = None  # 搜尋防抖的定時器
+        self.search_request_id = 0  # 最新的搜尋請求（背景搜尋只採用最新結果）
         self.file_char_id_map = {}  # 儲存每個檔案的角色編號設定
         self.preview_images = {}  # 儲存預覽圖片
+        self.photo_pool = PhotoImagePool()  # 重用預覽的 Tk 圖片（只在主線程中使用）
         self.color_map = COLOR_MAP
         self.rename_history = []  # 重命名歷史，用於撤銷
         self.dark_mode = False
@@ -141,17 +216,47 @@ class FileRenamerGUI:
         # 預覽刷新防抖（避免過於頻繁的刷新）
         self.preview_update_pending = False
         
+        # 預覽載入執行緒池（只保留最新的請求，限制同時解碼的數量）
+        self.preview_loader = PreviewLoader(self.load_preview_image, prefetch_func=self.prefetch_thumbnail)
+        # 超大圖片在子處理程序中解碼（像素數門檻可在設定檔中調整，0 表示停用）
+        self.thumbnail_decoder = ProcessThumbnailDecoder(min_pixels=self.get_process_decode_min_pixels()) \
+            if HAS_IMAGE_PREVIEW else None
+        # 縮圖網格只使用預取佇列：按可見順序載入，捲動後尚未開始的請求被新的可見範圍取代
+        self.contact_sheet_loader = PreviewLoader(None, max_workers=CONTACT_SHEET_WORKERS + 1,
+                                                  prefetch_func=self.load_contact_thumbnail)
+        self.contact_sheet_namer = None     # 縮圖網格最近一次刷新時的批次命名器
+        
         # 狀態追蹤
         self.current_preview_file = None
         self.current_preview_index = None
         
+        # 上次檢查外部檔案變更的時間
+        self.last_external_check = 0.0
+        
+        # 背景資料夾導入
+        self.ingest_job = None
+        self.pending_ingest_folders = []
+        self.ingest_added_count = 0
+        self.ingest_limit_reached = None
+        self.ingest_errors = []
+        
+        # 編譯好的命名上下文（命名參數改變時作廢，避免每個檔案都讀取Tk變數）
+        self.naming_context = None
+        # 批次命名器（Character索引分配結果），檔案、參數或資料夾內容改變時重建
+        self.batch_namer = None
+        self.batch_namer_key = None
+        
         self.setup_ui()
+        self.watch_rename_rules()
         self.setup_drag_drop()
         self.setup_keyboard_shortcuts()
         self.load_saved_settings()
         
         # 綁定視窗關閉事件，儲存設定
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # 視窗重新獲得焦點時（例如從檔案總管切換回來）檢查外部檔案變更
+        self.root.bind('<FocusIn>', self.on_focus_in, add='+')
     
     def setup_ui(self):
         """設置現代化UI"""
@@ -252,7 +357,12 @@ class FileRenamerGUI:
         self.folder_path_var = tk.StringVar()
         folder_path_entry = ttk.Entry(path_frame, textvariable=self.folder_path_var, width=40, style='Modern.TEntry')
         folder_path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 8))
-        self.create_modern_button(path_frame, "導入", self.import_folder_path, 'secondary').pack(side=tk.LEFT)
+        self.create_modern_button(path_frame, "導入", self.import_folder_path, 'secondary').pack(side=tk.LEFT, padx=(0, 8))
+        
+        # 是否包含子資料夾（遞迴掃描）
+        self.include_subfolders_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(path_frame, text="包含子資料夾", 
+                       variable=self.include_subfolders_var).pack(side=tk.LEFT)
         
         # 檔案列表（支援多選和調整順序）- 現代化卡片
         list_frame = self.create_modern_card(self.content_frame, "📋 已選擇的檔案（可多選調整順序）", padding=16)
@@ -280,16 +390,23 @@ class FileRenamerGUI:
         ttk.Label(search_frame, text="🔍 搜尋:", 
                  font=self.theme.get_font('body') if self.theme else ('Arial', 10)).pack(side=tk.LEFT, padx=(0, 8))
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', lambda *args: self.filter_file_list())
+        self.search_var.trace('w', lambda *args: self.schedule_filter())
         self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30, style='Modern.TEntry')
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 8))
+        self.search_mode_var = tk.StringVar(value="包含")
+        search_mode_combo = ttk.Combobox(search_frame, textvariable=self.search_mode_var,
+                                         values=list(SEARCH_MODE_LABELS.keys()),
+                                         state="readonly", width=10, style='Modern.TCombobox')
+        search_mode_combo.pack(side=tk.LEFT, padx=(0, 8))
+        search_mode_combo.bind('<<ComboboxSelected>>', lambda e: self.filter_file_list())
         self.create_modern_button(search_frame, "清除", lambda: self.search_var.set(""), 'secondary').pack(side=tk.LEFT)
         
         scrollbar = ttk.Scrollbar(list_frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.file_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, 
-                                       selectmode=tk.EXTENDED, height=10)
+        # 虛擬化列表：只繪製可見的行，列表項目為完整路徑，顯示檔案名稱
+        self.file_listbox = VirtualListView(list_frame, label_func=os.path.basename,
+                                            yscrollcommand=scrollbar.set, height=10)
         self.file_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.file_listbox.yview)
         
@@ -452,6 +569,7 @@ class FileRenamerGUI:
         # 配置文字樣式標籤（用於顯示錯誤和成功）
         self.preview_text.tag_config("error", foreground="red", font=("Arial", 9, "bold"))
         self.preview_text.tag_config("success", foreground="green", font=("Arial", 9, "bold"))
+        self.preview_text.tag_config("conflict", foreground="#d35400", font=("Arial", 9, "bold"))
         
         # 圖片預覽標籤頁
         image_preview_frame = ttk.Frame(self.preview_notebook)
@@ -467,6 +585,11 @@ class FileRenamerGUI:
         image_canvas_frame = ttk.Frame(image_preview_frame)
         image_canvas_frame.pack(fill=tk.BOTH, expand=True)
         
+        # 高品質預覽選項（快速顯示後再以 LANCZOS 重新縮放）
+        self.preview_high_quality_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(image_canvas_frame, text="高品質預覽",
+                        variable=self.preview_high_quality_var).pack(side=tk.RIGHT)
+        
         image_scrollbar = ttk.Scrollbar(image_preview_frame, orient=tk.VERTICAL)
         image_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
@@ -474,6 +597,27 @@ class FileRenamerGUI:
         self.preview_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         image_scrollbar.config(command=self.preview_canvas.yview)
         
+        # 縮圖網格標籤頁（整批檔案的縮圖和新舊檔名，只載入可見的格子；沒有圖片預覽模組時不顯示）
+        if HAS_IMAGE_PREVIEW:
+            contact_sheet_frame = ttk.Frame(self.preview_notebook)
+            self.preview_notebook.add(contact_sheet_frame, text="縮圖網格")
+            
+            contact_scrollbar = ttk.Scrollbar(contact_sheet_frame, orient=tk.VERTICAL)
+            contact_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            
+            self.contact_sheet = ContactSheetView(contact_sheet_frame,
+                                                  label_func=self.contact_sheet_labels,
+                                                  thumbnail_func=self.cached_contact_thumbnail,
+                                                  request_func=self.request_contact_thumbnails,
+                                                  on_activate=self.select_file_in_list,
+                                                  image_size=CONTACT_SHEET_IMAGE_SIZE,
+                                                  yscrollcommand=contact_scrollbar.set,
+                                                  height=300)
+            self.contact_sheet.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            contact_scrollbar.config(command=self.contact_sheet.yview)
+            self.contact_sheet_frame = contact_sheet_frame
+            self.preview_notebook.bind('<<NotebookTabChanged>>', lambda e: self.refresh_contact_sheet())
+        
         # 拖放提示
         if HAS_DND:
             drop_hint = ttk.Label(self.content_frame, text="💡 提示：可以直接拖放檔案到此視窗", 
@@ -512,6 +656,10 @@ class FileRenamerGUI:
         self.status_label = ttk.Label(status_frame, text="就緒", relief=tk.SUNKEN, anchor=tk.W)
         self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=2)
         
+        # 取消導入按鈕（僅在背景導入資料夾時顯示）
+        self.cancel_ingest_button = ttk.Button(status_frame, text="取消導入 (Esc)", 
+                                               command=self.cancel_folder_ingest)
+        
         # 統計資訊標籤
         self.stats_label = ttk.Label(status_frame, text="", relief=tk.SUNKEN, anchor=tk.E)
         self.stats_label.pack(side=tk.RIGHT, padx=5, pady=2)
@@ -554,12 +702,12 @@ class FileRenamerGUI:
                 if not file_path:
                     continue
                 
-                if os.path.isfile(file_path):
+                if metadata_cache.is_file(file_path):
                     ext = os.path.splitext(file_path)[1].lower()
                     if ext in valid_extensions:
                         if file_path not in self.selected_files:
                             files_to_add.append(file_path)
-                elif os.path.isdir(file_path):
+                elif metadata_cache.is_dir(file_path):
                     folders_to_process.append(file_path)
             
             added_count = 0
@@ -580,21 +728,17 @@ class FileRenamerGUI:
                     else:
                         files_to_add = []
                 
-                for file_path in files_to_add:
-                    if file_path not in self.selected_files:
-                        self.selected_files.append(file_path)
-                        added_count += 1
+                added_count += len(self.selected_files.extend(files_to_add))
             
-            # 再處理資料夾
+            # 再處理資料夾（在背景掃描，結果分批加入列表）
             for folder_path in folders_to_process:
-                folder_added = self.add_files_from_folder(folder_path)
-                added_count += folder_added
+                self.add_files_from_folder(folder_path)
             
             if added_count > 0:
                 self.update_file_list()
                 # 不顯示訊息框，避免打斷用戶操作
                 # messagebox.showinfo("成功", f"已添加 {added_count} 個檔案")
-            elif len(files) > 0:
+            elif len(files) > 0 and not folders_to_process:
                 messagebox.showwarning("警告", "沒有找到支援的檔案或資料夾（支援：MP4, JPG, PNG）")
         except Exception as e:
             messagebox.showerror("錯誤", f"處理拖放檔案時發生錯誤：{str(e)}")
@@ -642,9 +786,7 @@ class FileRenamerGUI:
                     else:
                         files_to_add = []
                 
-                for f in files_to_add:
-                    if f not in self.selected_files:
-                        self.selected_files.append(f)
+                self.selected_files.extend(files_to_add)
                 self.update_file_list()
                 # 更新狀態
                 self.update_status(f"已添加 {len(files_to_add)} 個檔案")
@@ -663,67 +805,135 @@ class FileRenamerGUI:
             # 記錄最後使用的資料夾
             if config_manager:
                 config_manager.set("last_folder", folder)
-            added_count = self.add_files_from_folder(folder)
-            if added_count > 0:
-                self.update_status(f"從資料夾添加了 {added_count} 個檔案")
+            self.add_files_from_folder(folder)
     
     def clear_files(self):
-        self.selected_files = []
+        self.cancel_folder_ingest()
+        self.selected_files.clear()
         self.file_char_id_map = {}
+        self.invalidate_batch_namer()
         self.update_file_list()
         self.preview_text.delete(1.0, tk.END)
         self.clear_image_preview()
     
+    def schedule_filter(self):
+        """搜尋框內容改變時延遲過濾（連續輸入時只過濾一次）"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.filter_file_list)
+    
+    def get_search_mode(self):
+        """當前的搜尋模式"""
+        if hasattr(self, 'search_mode_var'):
+            return SEARCH_MODE_LABELS.get(self.search_mode_var.get(), MODE_SUBSTRING)
+        return MODE_SUBSTRING
+    
     def filter_file_list(self):
-        """根據搜尋過濾檔案列表"""
-        search_text = self.search_var.get().lower() if hasattr(self, 'search_var') else ""
-        self.file_listbox.delete(0, tk.END)
-        filtered_count = 0
-        for file_path in self.selected_files:
-            file_name = os.path.basename(file_path).lower()
-            if not search_text or search_text in file_name:
-                self.file_listbox.insert(tk.END, os.path.basename(file_path))
-                filtered_count += 1
-        # 更新當前數量顯示
+        """根據搜尋過濾檔案列表（使用搜尋索引，虛擬化列表只繪製可見的行）"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        search_text = self.search_var.get() if hasattr(self, 'search_var') else ""
+        
+        self.search_request_id += 1
+        request_id = self.search_request_id
+        request, error = self.search_index.prepare(search_text, self.get_search_mode())
+        if request is None:
+            # 搜尋字串無效（例如正規表示式寫到一半），保留目前的列表
+            self.update_status(f"搜尋: {error}")
+            return
+        
+        if request.result is None and len(request.candidates) > SEARCH_THREAD_THRESHOLD:
+            # 檔案很多時在背景執行緒中匹配
+            def run_search():
+                results = self.search_index.run(request)
+                self.root.after(0, lambda: self._apply_search_results(request, results, request_id))
+            
+            Thread(target=run_search, daemon=True).start()
+            return
+        
+        self._apply_search_results(request, self.search_index.run(request), request_id)
+    
+    def _apply_search_results(self, request, results, request_id):
+        """在主線程中顯示搜尋結果"""
+        if request_id != self.search_request_id:
+            # 已經有更新的搜尋，忽略這個結果
+            return
+        if not self.search_index.commit(request, results):
+            # 搜尋期間檔案列表被修改過，結果可能已過時，重新搜尋
+            self.filter_file_list()
+            return
+        self.file_listbox.set_items(results)
+        self._update_count_label()
+    
+    def _update_count_label(self):
+        """更新當前數量顯示（顯示數量/總數）"""
         if hasattr(self, 'current_count_label'):
-            self.current_count_label.config(text=f"{filtered_count}/{len(self.selected_files)}")
+            self.current_count_label.config(text=f"{self.file_listbox.size()}/{len(self.selected_files)}")
+    
+    def _append_file_rows(self, file_paths):
+        """將新添加的檔案追加到列表末尾（不重建整個列表）"""
+        file_paths = self.search_index.filter_paths(file_paths, self.search_var.get(), self.get_search_mode())
+        if file_paths:
+            self.file_listbox.append_items(file_paths)
+        self._update_count_label()
     
     def update_file_list(self):
         """更新檔案列表"""
         self.filter_file_list()
         # 更新統計資訊
         self.update_statistics()
+        self.refresh_contact_sheet()
     
     def update_statistics(self):
-        """更新統計資訊"""
+        """更新統計資訊（使用增量聚合的統計，不重新掃描列表）"""
         if not hasattr(self, 'stats_label'):
             return
-        
-        total_files = len(self.selected_files)
-        if total_files == 0:
-            self.stats_label.config(text="")
+        self.stats_label.config(text=self.file_stats.summary_text())
+        self.scan_pending_media()
+    
+    def scan_pending_media(self):
+        """在背景執行緒中解析統計還缺少的影片時長（一次只有一個執行緒，完成後再檢查新加入的影片）"""
+        if self.media_scan_running or not self.file_stats.pending_media:
             return
+        self.media_scan_running = True
+        paths = list(self.file_stats.pending_media)
         
-        # 統計檔案類型
-        file_types = {}
-        total_size = 0
-        for file_path in self.selected_files:
-            ext = os.path.splitext(file_path)[1].lower()
-            file_types[ext] = file_types.get(ext, 0) + 1
-            try:
-                total_size += os.path.getsize(file_path)
-            except:
-                pass
+        def run_scan():
+            results = [(path, mp4_metadata_cache.get(path)) for path in paths]
+            self.root.after(0, lambda: self._apply_media_stats(results))
         
-        # 格式化統計資訊
-        type_info = ", ".join([f"{ext.upper()}: {count}" for ext, count in sorted(file_types.items())])
-        try:
-            from utils import format_file_size
-            size_info = format_file_size(total_size)
-        except:
-            size_info = f"{total_size / 1024 / 1024:.2f} MB"
-        stats_text = f"總數: {total_files} | {type_info} | 大小: {size_info}"
-        self.stats_label.config(text=stats_text)
+        Thread(target=run_scan, daemon=True).start()
+    
+    def _apply_media_stats(self, results):
+        self.media_scan_running = False
+        for path, info in results:
+            self.file_stats.add_media(path, info)
+        self.update_statistics()
+    
+    def on_focus_in(self, event=None):
+        """
+        視窗獲得焦點時檢查外部檔案變更（節流，每個已知目錄只 stat 一次）
+
+        目錄修改時間無法反映檔案內容的直接修改，因此另外重新 stat 選中和可見的檔案
+        （數量受列表高度限制），其縮圖和影片資訊的快取鍵隨之失效
+        """
+        now = time.monotonic()
+        if now - self.last_external_check < EXTERNAL_CHANGE_CHECK_INTERVAL:
+            return
+        self.last_external_check = now
+        changed_dirs = metadata_cache.check_directories()
+        selected_paths = self.get_selected_paths()
+        edited = metadata_cache.refresh(dict.fromkeys(selected_paths + self.file_listbox.visible_items()))
+        if changed_dirs or edited:
+            # 只重新讀取受影響資料夾中和被直接修改的檔案大小
+            self.file_stats.refresh_sizes(
+                [f for f in self.selected_files if directory_key(os.path.dirname(f)) in changed_dirs] + edited)
+            self.update_statistics()
+        if self.current_preview_file in edited:
+            # 正在預覽的檔案被修改，重新載入預覽圖片（而不是只更新新檔名）
+            self.current_preview_file = None
+            self._preview_selected_file()
     
     def update_status(self, message):
         """更新狀態欄訊息"""
@@ -749,56 +959,129 @@ class FileRenamerGUI:
             return True, None  # 如果輸入無效，視為無限制
     
     def add_files_from_folder(self, folder_path):
-        """從資料夾添加檔案（包含安全驗證）"""
+        """從資料夾添加檔案（包含安全驗證，在背景執行緒中掃描）
+        
+        Returns:
+            是否已開始導入（結果在導入完成後顯示於狀態欄）
+        """
         # 驗證路徑
         is_valid, error = validate_file_path(folder_path)
         if not is_valid:
             messagebox.showerror("錯誤", f"路徑無效: {error}")
-            return 0
+            return False
         
         if not os.path.isdir(folder_path):
             messagebox.showerror("錯誤", f"路徑不是有效的資料夾：{folder_path}")
-            return 0
+            return False
+        
+        self.start_folder_ingest([folder_path])
+        return True
+    
+    def start_folder_ingest(self, folders):
+        """啟動背景資料夾導入（如果已有導入在進行，排隊等待）"""
+        if self.ingest_job is not None:
+            self.pending_ingest_folders.extend(folders)
+            return
         
-        files_to_add = []
-        for ext in ['*.mp4', '*.jpg', '*.jpeg', '*.png']:
-            for file_path in Path(folder_path).glob(ext):
-                file_str = str(file_path)
-                if file_str not in self.selected_files:
-                    files_to_add.append(file_str)
+        self.ingest_added_count = 0
+        self.ingest_limit_reached = None  # 達到數量限制時記錄限制值
+        self.ingest_errors = []
+        self.ingest_job = FolderIngestJob(folders, SUPPORTED_EXTENSIONS,
+                                          recursive=self.include_subfolders_var.get(),
+                                          metadata_cache=metadata_cache)
+        self.ingest_job.start()
+        
+        self.cancel_ingest_button.pack(side=tk.RIGHT, padx=5, pady=2)
+        self.status_label.config(text="正在掃描資料夾...")
+        self.root.after(INGEST_POLL_INTERVAL, self._poll_folder_ingest)
+    
+    def cancel_folder_ingest(self):
+        """取消正在進行的資料夾導入（已添加的檔案保留）"""
+        if self.ingest_job is not None:
+            self.pending_ingest_folders = []
+            self.ingest_job.cancel()
+    
+    def _poll_folder_ingest(self):
+        """在主線程中定時取出掃描結果，分批添加到列表"""
+        job = self.ingest_job
+        if job is None:
+            return
         
+        finished = False
+        new_files = []
+        for event in job.drain():
+            if event[0] == "files":
+                # 取消後（包括達到數量限制）不再添加剩餘的結果
+                if not job.cancelled:
+                    new_files.extend(event[1])
+            elif event[0] == "error":
+                self.ingest_errors.append(f"{event[1]}: {event[2]}")
+            elif event[0] == "finished":
+                finished = True
+        
+        if new_files:
+            self._ingest_files_chunk(new_files)
+        
+        if finished:
+            self._finish_folder_ingest()
+        else:
+            self.status_label.config(
+                text=f"正在掃描資料夾... 已找到 {job.found_count} 個，已添加 {self.ingest_added_count} 個（Esc 取消）")
+            self.root.after(INGEST_POLL_INTERVAL, self._poll_folder_ingest)
+    
+    def _ingest_files_chunk(self, files):
+        """添加一批掃描到的檔案（掃描期間即檢查數量限制）"""
+        files_to_add = [f for f in files if f not in self.selected_files]
         if not files_to_add:
-            messagebox.showinfo("提示", "資料夾中沒有找到支援的檔案（支援：MP4, JPG, PNG）")
-            return 0
+            return
         
-        # 檢查數量限制
-        original_files_count = len(files_to_add)
-        can_add, max_files = self.check_max_files_limit(original_files_count)
+        can_add, max_files = self.check_max_files_limit(len(files_to_add))
         if not can_add:
-            messagebox.showwarning("警告", 
-                f"無法添加 {original_files_count} 個檔案！\n"
-                f"當前已有 {len(self.selected_files)} 個檔案，最大限制為 {max_files} 個。\n"
-                f"只能再添加 {max_files - len(self.selected_files)} 個檔案。")
-            # 只添加允許的數量
-            allowed_count = max_files - len(self.selected_files)
-            if allowed_count > 0:
-                files_to_add = files_to_add[:allowed_count]
-            else:
-                return 0
+            # 只添加允許的數量，並停止掃描
+            allowed_count = max(0, max_files - len(self.selected_files))
+            files_to_add = files_to_add[:allowed_count]
+            self.ingest_limit_reached = max_files
+            self.ingest_job.cancel()
+        
+        added = self.selected_files.extend(files_to_add)
+        self.ingest_added_count += len(added)
+        rows_before = self.file_listbox.size()
+        self._append_file_rows(added)
+        self.update_statistics()
         
-        added_count = 0
-        for file_path in files_to_add:
-            if file_path not in self.selected_files:
-                self.selected_files.append(file_path)
-                added_count += 1
+        # 新檔案出現在第一屏時，預先載入這些檔案的縮圖
+        if rows_before < self.file_listbox.visible_row_count() and self.file_listbox.size() > rows_before:
+            self.warm_visible_thumbnails()
+    
+    def _finish_folder_ingest(self):
+        """資料夾導入完成（或被取消）後的處理"""
+        job = self.ingest_job
+        self.ingest_job = None
+        self.cancel_ingest_button.pack_forget()
+        self.status_label.config(text="就緒")
+        self.update_statistics()
+        self.refresh_contact_sheet()
         
-        if added_count > 0:
-            self.update_file_list()
-            # 如果因為限制而沒有添加所有檔案，顯示提示
-            if not can_add and added_count < original_files_count:
-                messagebox.showinfo("提示", f"已添加 {added_count} 個檔案（已達最大限制 {max_files} 個）")
+        added_count = self.ingest_added_count
+        if self.ingest_errors:
+            messagebox.showerror("錯誤", "無法讀取資料夾：\n" + "\n".join(self.ingest_errors[:5]))
+        
+        if self.ingest_limit_reached is not None:
+            messagebox.showwarning("警告", 
+                f"已達最大選擇數量限制 {self.ingest_limit_reached} 個！\n"
+                f"本次已添加 {added_count} 個檔案，其餘檔案未添加。")
+        elif job.cancelled:
+            self.update_status(f"已取消導入，已添加 {added_count} 個檔案")
+        elif job.found_count == 0 and not self.ingest_errors:
+            messagebox.showinfo("提示", "資料夾中沒有找到支援的檔案（支援：MP4, JPG, PNG）")
+        else:
+            self.update_status(f"從資料夾添加了 {added_count} 個檔案")
         
-        return added_count
+        # 繼續處理排隊的資料夾
+        if self.pending_ingest_folders:
+            folders = self.pending_ingest_folders
+            self.pending_ingest_folders = []
+            self.start_folder_ingest(folders)
     
     def import_folder_path(self):
         """導入資料夾路徑（包含安全驗證）"""
@@ -815,44 +1098,60 @@ class FileRenamerGUI:
         
         self.add_files_from_folder(folder_path)
     
+    def get_selected_paths(self):
+        """返回列表中選中的檔案（列表中的行經過搜尋過濾，不能直接當作 selected_files 的索引）"""
+        return [self.file_listbox.item(row) for row in self.file_listbox.curselection()]
+    
     def on_file_select(self, event=None):
         """當檔案列表中的項目被選中時，顯示預覽"""
-        selected_indices = self.file_listbox.curselection()
-        if not selected_indices:
+        if self.only_selected_var.get():
+            # 只處理選中項時，選擇改變就是要處理的檔案改變
+            self.refresh_contact_sheet()
+        if not self.file_listbox.curselection():
             # 如果沒有選中任何項目，清除預覽
             self.clear_image_preview()
             return
-        
-        # 只顯示第一個選中檔案的預覽（如果多選，顯示第一個）
-        selected_index = selected_indices[0]
-        if 0 <= selected_index < len(self.selected_files):
-            file_path = self.selected_files[selected_index]
-            # 如果啟用了"僅處理選中項"，使用在處理列表中的索引
-            if self.only_selected_var.get():
-                files_to_process = self.get_files_to_process()
-                if file_path in files_to_process:
-                    process_index = files_to_process.index(file_path)
-                    self.show_single_file_preview(file_path, process_index)
-                else:
-                    # 如果文件不在處理列表中，使用原始索引
-                    self.show_single_file_preview(file_path, selected_index)
-            else:
-                self.show_single_file_preview(file_path, selected_index)
+        self._preview_selected_file()
+    
+    def _preview_selected_file(self):
+        """預覽第一個選中的檔案（如果多選，顯示第一個）"""
+        selected_paths = self.get_selected_paths()
+        if not selected_paths:
+            return
+        file_path = selected_paths[0]
+        # 使用在處理列表中的索引（"僅處理選中項"時為選中順序），不在其中時使用原始索引
+        files_to_process = self.get_files_to_process()
+        if file_path in files_to_process:
+            index = files_to_process.index(file_path)
+        else:
+            index = self.selected_files.index(file_path)
+        if file_path == self.current_preview_file:
+            # 仍是同一個檔案：只有新檔名可能改變，不必重新載入圖片
+            self.current_preview_index = index
+            self.refresh_preview_name()
+            return
+        self.show_single_file_preview(file_path, index)
+    
+    def refresh_preview_name(self):
+        """只更新預覽中的新檔名文字（參數改變時使用，圖片保持不變）"""
+        if not self.preview_canvas.find_withtag("filename_new"):
+            # 圖片仍在載入中，顯示時會使用最新的參數生成檔名
+            return
+        try:
+            new_name = self.generate_new_filename(self.current_preview_file, self.current_preview_index)
+        except Exception:
+            new_name = "生成失敗"
+        self.preview_canvas.itemconfig("filename_new", text=f"新檔名: {new_name}")
     
     def clear_image_preview(self):
         """清除圖片預覽（包含資源清理）"""
         # 清除Canvas內容
         self.preview_canvas.delete("all")
+        self.current_preview_file = None
+        self.current_preview_index = None
         
-        # 清理圖片引用以釋放內存
-        for img_id, img in list(self.preview_images.items()):
-            try:
-                del img
-            except:
-                pass
-        
-        # 清空圖片字典
-        self.preview_images.clear()
+        # 不再顯示的圖片放回圖片池
+        self._release_preview_images()
         
         # 顯示提示標籤
         self.preview_hint_label.pack(pady=20)
@@ -866,14 +1165,8 @@ class FileRenamerGUI:
         # 立即清除舊的預覽，確保及時刷新（包含資源清理）
         self.preview_canvas.delete("all")
         
-        # 清理舊的圖片引用以釋放內存
-        for img_id, img in list(self.preview_images.items()):
-            try:
-                del img
-            except:
-                pass
-        
-        self.preview_images.clear()
+        # 不再顯示的圖片放回圖片池
+        self._release_preview_images()
         
         # 隱藏提示標籤
         self.preview_hint_label.pack_forget()
@@ -892,24 +1185,38 @@ class FileRenamerGUI:
     def _load_preview_image_async(self, file_path, old_name, ext, index):
         """異步載入預覽圖片（增強穩定性，防止並發問題）"""
         # 生成唯一的加載ID，用於追踪
-        import time
         load_id = f"{file_path}_{index}_{time.time()}"
         self.current_load_id = load_id
         
-        def load_and_display():
-            try:
-                preview_img = self.load_preview_image(file_path, max_size=(300, 300))
-                # 在主線程中更新UI，並檢查是否仍然是當前請求
-                self.root.after(0, lambda: self._display_preview(preview_img, old_name, ext, file_path, index, load_id))
-            except Exception as e:
+        # 高品質預覽：先用快速解碼顯示，再載入高品質版本替換（已快取時直接使用高品質版本）
+        # 快取鍵由檔案中繼資料快取生成，主線程中不 stat
+        refine = HAS_PIL and self.preview_high_quality_var.get() and ext in ('.jpg', '.jpeg', '.png')
+        if refine and thumbnail_key(file_path, PREVIEW_IMAGE_SIZE, True, metadata=metadata_cache) in thumbnail_cache:
+            refine = False
+            high_quality = True
+        else:
+            high_quality = False
+        
+        def on_loaded(preview_img, error):
+            if error and not IN_EXE:
                 # 如果加載失敗，顯示錯誤信息
-                if not IN_EXE:
-                    print(f"預覽加載錯誤: {e}")
-                self.root.after(0, lambda: self._display_preview(None, old_name, ext, file_path, index, load_id))
+                print(f"預覽加載錯誤: {error}")
+            # 在主線程中更新UI，並檢查是否仍然是當前請求
+            self.root.after(0, lambda: show(preview_img))
         
-        # 在後台線程中載入圖片
-        thread = Thread(target=load_and_display, daemon=True)
-        thread.start()
+        def show(preview_img):
+            self._display_preview(preview_img, old_name, ext, file_path, index, load_id)
+            if refine and preview_img is not None and self.current_load_id == load_id:
+                self.preview_loader.request((file_path, PREVIEW_IMAGE_SIZE, True), on_refined)
+        
+        def on_refined(preview_img, error):
+            if preview_img is not None:
+                self.root.after(0, lambda: self._display_preview(preview_img, old_name, ext, file_path, index, load_id))
+        
+        # 交給預覽執行緒池載入（取代尚未開始的舊請求）
+        self.preview_loader.request((file_path, PREVIEW_IMAGE_SIZE, high_quality), on_loaded)
+        # 空閒時預取相鄰檔案，繼續切換時直接命中快取
+        self.prefetch_around(file_path)
         
         # 先顯示載入中提示
         try:
@@ -925,8 +1232,17 @@ class FileRenamerGUI:
             if not IN_EXE:
                 print(f"顯示載入提示錯誤: {e}")
     
+    def _release_preview_images(self):
+        """把已從畫布移除的預覽圖片放回圖片池"""
+        for photo in self.preview_images.values():
+            self.photo_pool.release(photo)
+        self.preview_images.clear()
+    
     def _display_preview(self, preview_img, old_name, ext, file_path, index, load_id):
-        """顯示預覽內容（增強穩定性，實時生成文件名）"""
+        """
+        顯示預覽內容（增強穩定性，實時生成文件名）
+        preview_img 是背景執行緒解碼好的 PIL 圖片，在這裡（主線程）才封裝成 Tk 圖片
+        """
         try:
             # 檢查這是否仍然是當前請求的預覽
             if not hasattr(self, 'current_load_id') or self.current_load_id != load_id:
@@ -942,14 +1258,15 @@ class FileRenamerGUI:
                     print(f"忽略過時的預覽請求（檔案已改變）: {file_path}")
                 return
             
-            # 實時生成新檔名（使用當前最新的參數設定）
-            new_name = self.generate_new_filename(file_path, index)
+            # 實時生成新檔名（使用當前最新的參數設定和索引，載入期間可能已經改變）
+            new_name = self.generate_new_filename(file_path, self.current_preview_index)
             
             if not IN_EXE:
                 print(f"顯示預覽: {old_name} -> {new_name}")
             
             # 清除載入中提示和所有舊內容
             self.preview_canvas.delete("all")
+            self._release_preview_images()
             
             # 計算居中位置
             canvas_width = self.preview_canvas.winfo_width()
@@ -957,14 +1274,15 @@ class FileRenamerGUI:
                 canvas_width = 400
             center_x = canvas_width // 2
             
-            if preview_img:
+            photo = self.photo_pool.acquire(preview_img)
+            if photo:
                 # 顯示預覽圖片（居中）
-                img_width = preview_img.width()
-                img_height = preview_img.height()
+                img_width = photo.width()
+                img_height = photo.height()
                 img_x = center_x - img_width // 2
                 
-                img_id = self.preview_canvas.create_image(img_x, 20, anchor=tk.NW, image=preview_img)
-                self.preview_images[img_id] = preview_img  # 保持引用
+                img_id = self.preview_canvas.create_image(img_x, 20, anchor=tk.NW, image=photo)
+                self.preview_images[img_id] = photo  # 保持引用
                 
                 # 如果是影片，顯示影片標記
                 if ext == '.mp4':
@@ -996,6 +1314,14 @@ class FileRenamerGUI:
                                           fill="blue", 
                                           tags="filename_new")
             
+            # 影片資訊（由背景執行緒載入預覽時解析並快取，主線程只查詢快取）
+            if ext == '.mp4':
+                info = mp4_metadata_cache.peek(file_path)[1]
+                if info is not None:
+                    self.preview_canvas.create_text(center_x, text_y + 50, anchor=tk.CENTER,
+                                                  text=f"🎬 {describe_mp4(info)}",
+                                                  font=("Arial", 10), fill="gray")
+            
             # 更新滾動區域
             self.preview_canvas.update_idletasks()
             self.preview_canvas.config(scrollregion=self.preview_canvas.bbox("all"))
@@ -1009,57 +1335,70 @@ class FileRenamerGUI:
             try:
                 # 嘗試生成新檔名
                 try:
-                    new_name = self.generate_new_filename(file_path, index)
+                    new_name = self.generate_new_filename(file_path, self.current_preview_index)
                 except:
                     new_name = "生成失敗"
                 
                 self.preview_canvas.delete("all")
                 center_x = 200
                 self.preview_canvas.create_text(center_x, 100, anchor=tk.CENTER, 
-                                              text=f"原檔名: {old_name}", font=("Arial", 11))
+                                              text=f"原檔名: {old_name}", font=("Arial", 11),
+                                              tags="filename_old")
                 self.preview_canvas.create_text(center_x, 125, anchor=tk.CENTER, 
                                               text=f"新檔名: {new_name}", 
-                                              font=("Arial", 11, "bold"), fill="blue")
+                                              font=("Arial", 11, "bold"), fill="blue",
+                                              tags="filename_new")
             except:
                 pass
     
-    def move_up(self):
+    def _move_selected(self, step):
+        """將選中的檔案上移（step=-1）或下移（step=1）一位，只重繪受影響的行"""
         selected = self.file_listbox.curselection()
         if not selected:
             return
-        for idx in selected:
-            if idx > 0:
-                self.selected_files[idx], self.selected_files[idx-1] = \
-                    self.selected_files[idx-1], self.selected_files[idx]
-        self.update_file_list()
+        # 下移時從後往前處理，避免相鄰的選中項互相覆蓋
+        rows = selected if step < 0 else reversed(selected)
+        new_rows = []
+        for row in rows:
+            file_path = self.file_listbox.item(row)
+            idx = self.selected_files.index(file_path)
+            target = idx + step
+            if not 0 <= target < len(self.selected_files):
+                new_rows.append(row)
+                continue
+            neighbour_row = self.file_listbox.row_of(self.selected_files[target])
+            self.selected_files.swap(idx, target)
+            if neighbour_row is not None:
+                # 相鄰檔案也在列表中顯示：交換兩行
+                self.file_listbox.swap_rows(row, neighbour_row)
+                new_rows.append(neighbour_row)
+            else:
+                # 相鄰檔案被搜尋過濾隱藏：顯示順序不變
+                new_rows.append(row)
         # 重新選中移動後的項目
-        for idx in selected:
-            if idx > 0:
-                self.file_listbox.selection_set(idx-1)
+        self.file_listbox.selection_clear(0, tk.END)
+        for row in new_rows:
+            self.file_listbox.selection_set(row)
+        # 順序改變，縮圖網格的位置和新檔名都要更新
+        self.refresh_contact_sheet()
+    
+    def move_up(self):
+        self._move_selected(-1)
     
     def move_down(self):
-        selected = self.file_listbox.curselection()
-        if not selected:
-            return
-        # 從後往前處理，避免索引變化問題
-        for idx in reversed(selected):
-            if idx < len(self.selected_files) - 1:
-                self.selected_files[idx], self.selected_files[idx+1] = \
-                    self.selected_files[idx+1], self.selected_files[idx]
-        self.update_file_list()
-        # 重新選中移動後的項目
-        for idx in selected:
-            if idx < len(self.selected_files) - 1:
-                self.file_listbox.selection_set(idx+1)
+        self._move_selected(1)
     
     def remove_selected(self):
         selected = self.file_listbox.curselection()
         if not selected:
             return
-        # 從後往前刪除，避免索引變化
-        for idx in reversed(selected):
-            del self.selected_files[idx]
-        self.update_file_list()
+        files_to_remove = [self.file_listbox.item(row) for row in selected]
+        # 批量刪除，只重建一次位置索引
+        self.selected_files.remove_indices([self.selected_files.index(f) for f in files_to_remove])
+        self.file_listbox.remove_items(files_to_remove)
+        self._update_count_label()
+        self.update_statistics()
+        self.refresh_contact_sheet()
     
     def set_all_type(self, file_type):
         """一鍵設置所有選中檔案的類型"""
@@ -1123,28 +1462,18 @@ class FileRenamerGUI:
         """實際執行預覽更新"""
         self.preview_update_pending = False
         
-        # 如果當前有選中的檔案，更新圖片預覽
-        selected_indices = self.file_listbox.curselection()
-        if selected_indices:
-            selected_index = selected_indices[0]
-            if 0 <= selected_index < len(self.selected_files):
-                file_path = self.selected_files[selected_index]
-                # 如果啟用了"僅處理選中項"，使用在處理列表中的索引
-                if self.only_selected_var.get():
-                    files_to_process = self.get_files_to_process()
-                    if file_path in files_to_process:
-                        process_index = files_to_process.index(file_path)
-                        self.show_single_file_preview(file_path, process_index)
-                    else:
-                        # 如果文件不在處理列表中，使用原始索引
-                        self.show_single_file_preview(file_path, selected_index)
-                else:
-                    self.show_single_file_preview(file_path, selected_index)
+        # 如果當前有選中的檔案，更新預覽的新檔名（同一個檔案不會重新載入圖片）
+        self._preview_selected_file()
         
         # 同時更新文字預覽（如果檔案列表不為空）
         if self.selected_files:
             self.update_text_preview()
         
+        # 縮圖網格只更新檔名
+        if self.is_contact_sheet_visible():
+            self.contact_sheet_namer = self.get_batch_namer()
+            self.contact_sheet.refresh_labels()
+        
         # 更新統計資訊
         self.update_statistics()
     
@@ -1171,139 +1500,67 @@ class FileRenamerGUI:
         if role_options:
             self.role_var.set(role_options[0])
     
+    def get_rename_rules(self):
+        """從UI讀取一次當前命名規則，返回不可變的規則快照（供重新命名引擎使用）"""
+        return RenameRules(
+            rule=self.rule_var.get(),
+            char_id=self.char_id_var.get(),
+            char_type=self.char_type_var.get(),
+            char_index=self.char_index_var.get(),
+            color=self.color_var.get(),
+            theme=self.theme_var.get(),
+            role=self.role_var.get(),
+            dream_index=self.dream_index_var.get(),
+            anime_num=self.anime_num_var.get()
+        )
+    
+    def watch_rename_rules(self):
+        """監聽所有命名參數，任何一個改變時作廢已編譯的命名上下文"""
+        for var in (self.rule_var, self.char_id_var, self.char_type_var, self.char_index_var,
+                    self.color_var, self.theme_var, self.role_var, self.dream_index_var,
+                    self.anime_num_var):
+            var.trace_add('write', self._invalidate_naming_context)
+    
+    def _invalidate_naming_context(self, *args):
+        self.naming_context = None
+    
+    def get_naming_context(self):
+        """返回當前命名規則編譯後的上下文（參數未改變時重用，不再讀取Tk變數）"""
+        if self.naming_context is None:
+            self.naming_context = compile_rules(self.get_rename_rules())
+        return self.naming_context
+    
+    def get_batch_namer(self):
+        """
+        返回要處理的檔案共用的批次命名器（單張預覽、縮圖網格、文字預覽和執行重新命名使用相同的索引分配）
+
+        命名參數、檔案列表、"僅處理選中項"的範圍、角色編號設定或已掃描資料夾的內容改變時重建
+        """
+        only_selected = self.only_selected_var.get()
+        files = self.get_files_to_process()
+        key = (self.get_naming_context(), self.selected_files.version,
+               tuple(files) if only_selected else None, metadata_cache.names_version)
+        if self.batch_namer is None or self.batch_namer_key != key:
+            self.batch_namer = BatchNamer(self.get_naming_context(), files, self.file_char_id_map)
+            self.batch_namer_key = key
+        return self.batch_namer
+    
+    def invalidate_batch_namer(self):
+        """角色編號設定改變後重新分配索引"""
+        self.batch_namer = None
+    
     def generate_new_filename(self, original_path, index):
         """生成新檔名（完全符合對外格式要求：Character_{角色編號}_{類型}_{索引}.ext）"""
-        try:
-            # 獲取原始檔案的擴展名（保留原始格式，重點是前面的格式）
-            original_ext = os.path.splitext(original_path)[1]
-            if original_ext:
-                original_ext = original_ext.lower()  # 擴展名轉為小寫
-            else:
-                # 如果沒有擴展名，不添加擴展名（重點是前面的格式）
-                original_ext = ''
-            
-            if self.rule_var.get() == "character":
-                # 對外模式：Character_{角色編號}_{類型}_{索引}.ext
-                
-                # 1. 角色編號：確保為兩位數字（01-99）
-                if original_path in self.file_char_id_map:
-                    char_id_raw = str(self.file_char_id_map[original_path])
-                else:
-                    char_id_raw = str(self.char_id_var.get())
-                
-                # 提取數字部分並補零（添加異常處理）
-                try:
-                    char_id_digits = ''.join(filter(str.isdigit, char_id_raw))
-                    char_id_num = int(char_id_digits) if char_id_digits else 1
-                    # 限制範圍在 1-99
-                    char_id_num = max(1, min(99, char_id_num))
-                    char_id = f"{char_id_num:02d}"  # 確保兩位數字
-                except (ValueError, TypeError):
-                    # 如果轉換失敗，使用預設值
-                    char_id = "01"
-                
-                # 2. 類型：確保為 Idle, Intro, Open（大小写敏感）
-                char_type_raw = str(self.char_type_var.get())
-                valid_types = ['Idle', 'Intro', 'Open']
-                if char_type_raw in valid_types:
-                    char_type = char_type_raw
-                else:
-                    # 如果類型無效，使用預設值
-                    char_type = 'Idle'
-                
-                # 3. 索引：根據類型決定
-                if char_type == "Open":
-                    # Open類型使用顏色索引（00-06）
-                    color_raw = str(self.color_var.get())
-                    try:
-                        color_digits = ''.join(filter(str.isdigit, color_raw))
-                        char_index_num = int(color_digits) if color_digits else 0
-                        # 限制範圍在 0-6
-                        char_index_num = max(0, min(6, char_index_num))
-                        char_index = f"{char_index_num:02d}"  # 確保兩位數字，範圍00-06
-                    except (ValueError, TypeError):
-                        # 如果轉換失敗，使用預設值
-                        char_index = "00"
-                else:
-                    # Idle和Intro使用輸入的索引（01-20）
-                    index_value = str(self.char_index_var.get())
-                    # 如果包含" - "，提取前面的數字部分
-                    if " - " in index_value:
-                        index_value = index_value.split(" - ")[0]
-                    # 提取數字部分並補零（添加異常處理）
-                    try:
-                        index_digits = ''.join(filter(str.isdigit, index_value))
-                        char_index_num = int(index_digits) if index_digits else 1
-                        # 限制範圍在 1-20
-                        char_index_num = max(1, min(20, char_index_num))
-                        char_index = f"{char_index_num:02d}"  # 確保兩位數字，範圍01-20
-                    except (ValueError, TypeError):
-                        # 如果轉換失敗，使用預設值
-                        char_index = "01"
-                
-                # 使用專用的生成函數確保格式完全精確
-                new_name = generate_character_filename(
-                    char_id=char_id,
-                    char_type=char_type,
-                    char_index=char_index,
-                    ext=original_ext
-                )
-                
-                # 驗證生成的文件名是否符合Character格式
-                is_valid, validation_error, parsed_data = validate_character_filename(new_name)
-                if not is_valid:
-                    # 如果驗證失敗，記錄錯誤但繼續使用生成的文件名
-                    # 因為generate_character_filename已經確保了格式正確
-                    # 打包成EXE時不輸出調試信息
-                    try:
-                        import sys
-                        if not hasattr(sys, 'frozen'):
-                            print(f"警告：文件名驗證失敗: {validation_error}")
-                    except:
-                        pass
-                
-                # Character規則不需要額外清理（因為格式已經完全精確）
-                return new_name
-            else:  # dream rule
-                theme = str(self.theme_var.get())
-                dream_index = str(self.dream_index_var.get()).zfill(2)
-                
-                if theme == "Anime":
-                    anime_num = str(self.anime_num_var.get()).zfill(2)
-                    # 確保格式精確：A_XX.ext
-                    new_name = f"A_{anime_num}{original_ext}"
-                else:
-                    role = str(self.role_var.get())
-                    # 確保格式精確：Role_XX.ext
-                    new_name = f"{role}_{dream_index}{original_ext}"
-            
-            # 使用遊戲引擎模式驗證和清理檔案名
-            sanitized_name, error = validate_and_sanitize_new_filename(
-                original_path, new_name, game_engine_mode=True
-            )
-            
-            if error:
-                # 如果清理失敗，使用安全的備用名稱
-                safe_name = sanitize_filename(new_name, game_engine_mode=True)
-                if safe_name and safe_name != "unnamed":
-                    return safe_name
-                # 最終備用名稱
-                return f"renamed_{index:04d}{original_ext}"
-            
-            # 最終驗證：確保文件名完全符合遊戲引擎標準
-            is_valid, validation_error = validate_game_engine_filename(sanitized_name)
-            if not is_valid:
-                # 如果驗證失敗，使用備用名稱
-                return f"renamed_{index:04d}{original_ext}"
-            
-            return sanitized_name
-        except Exception as e:
-            # 如果生成失敗，返回安全的備用名稱
-            ext = os.path.splitext(original_path)[1].lower()
-            return f"renamed_{index:04d}{ext}"
+        new_name, error = self.get_batch_namer().name_for(index, original_path)
+        if new_name is None:
+            raise ValueError(error)
+        return new_name
     
-    def load_preview_image(self, file_path, max_size=(200, 200)):
-        """載入預覽圖片（包含資源管理）"""
+    def load_preview_image(self, file_path, max_size=(200, 200), high_quality=False):
+        """
+        載入預覽圖片（依次查找記憶體快取和磁碟快取，都未命中時才解碼原圖）
+        在背景執行緒中執行，只返回 PIL 圖片；Tk 圖片由主線程在 _display_preview 中建立
+        """
         try:
             # 驗證檔案路徑
             is_valid, error = validate_file_path(file_path)
@@ -1311,7 +1568,7 @@ class FileRenamerGUI:
                 return None
             
             # 檢查檔案是否存在
-            if not os.path.exists(file_path) or not os.path.isfile(file_path):
+            if not metadata_cache.is_file(file_path):
                 return None
             
             ext = os.path.splitext(file_path)[1].lower()
@@ -1319,26 +1576,23 @@ class FileRenamerGUI:
             if ext in ['.jpg', '.jpeg', '.png']:
                 if HAS_PIL:
                     try:
-                        img = Image.open(file_path)
-                        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                        photo = ImageTk.PhotoImage(img)
-                        # 關閉原始圖片以釋放資源
-                        img.close()
-                        return photo
+                        return self.load_thumbnail(file_path, max_size, high_quality)
                     except Exception:
                         return None
                 else:
                     return None
             elif ext == '.mp4':
+                # 在背景執行緒中解析影片資訊，_display_preview 只查詢快取
+                mp4_metadata_cache.get(file_path)
                 # 對於影片，創建一個帶有播放圖標的預覽
                 if HAS_PIL:
                     try:
-                        # 創建一個深色背景的影片圖標
-                        img = Image.new('RGB', max_size, color='#2d2d2d')
-                        photo = ImageTk.PhotoImage(img)
-                        # 關閉圖片以釋放資源
-                        img.close()
-                        return photo
+                        # 有封面時顯示封面，否則使用深色背景（常量，只建立一次）
+                        img = self.load_video_cover(file_path, max_size)
+                        if img is None:
+                            img = thumbnail_cache.placeholder(
+                                'mp4', max_size, lambda size: Image.new('RGB', size, color='#2d2d2d'))
+                        return img
                     except Exception:
                         return None
                 else:
@@ -1346,16 +1600,141 @@ class FileRenamerGUI:
         except Exception:
             return None
     
+    def load_thumbnail(self, file_path, max_size, high_quality=False):
+        """
+        獲取圖片的縮圖（PIL圖片，不依賴Tk，可在背景執行緒中調用）
+        依次查找記憶體快取和磁碟快取，都未命中時才以降低的解析度解碼原圖
+        """
+        key = thumbnail_key(file_path, max_size, high_quality, metadata=metadata_cache)
+        img = thumbnail_cache.get(key)
+        if img is None:
+            img = disk_thumbnail_cache.get(key)
+            if img is not None:
+                img = to_display_image(img)
+            else:
+                img = self.thumbnail_decoder.decode(file_path, max_size, high_quality)
+                disk_thumbnail_cache.put(key, img)
+            thumbnail_cache.put(key, img)
+        return img
+    
+    def get_process_decode_min_pixels(self):
+        """讀取在子處理程序中解碼的像素數門檻（設定值無效時使用預設值）"""
+        if not config_manager:
+            return DEFAULT_PROCESS_MIN_PIXELS
+        try:
+            return max(0, int(config_manager.get("process_decode_min_pixels", DEFAULT_PROCESS_MIN_PIXELS)))
+        except (TypeError, ValueError):
+            return DEFAULT_PROCESS_MIN_PIXELS
+    
+    def load_video_cover(self, file_path, max_size):
+        """獲取影片內嵌封面的縮圖（只解析 moov，不讀取影像資料），沒有封面時返回 None"""
+        info = mp4_metadata_cache.get(file_path)
+        if info is None or info.cover is None:
+            return None
+        key = thumbnail_key(file_path, max_size, metadata=metadata_cache)
+        img = thumbnail_cache.get(key)
+        if img is None:
+            # 快取只記錄封面的位置，縮圖未快取時才讀取封面內容
+            cover = read_cover(file_path, info)
+            if cover is None:
+                return None
+            img = decode_thumbnail_bytes(cover, max_size)
+            thumbnail_cache.put(key, img)
+        return img
+    
+    def prefetch_thumbnail(self, file_path, max_size):
+        """預取縮圖到快取（只處理圖片，已快取時不做任何事）"""
+        if not HAS_PIL or os.path.splitext(file_path)[1].lower() not in ('.jpg', '.jpeg', '.png'):
+            return
+        if thumbnail_key(file_path, max_size, metadata=metadata_cache) in thumbnail_cache:
+            return
+        self.load_thumbnail(file_path, max_size)
+    
+    def is_contact_sheet_visible(self):
+        """縮圖網格標籤頁是否正在顯示"""
+        try:
+            return self.preview_notebook.select() == str(self.contact_sheet_frame)
+        except (AttributeError, tk.TclError):
+            return False
+    
+    def refresh_contact_sheet(self):
+        """以要處理的檔案更新縮圖網格（只在標籤頁顯示時進行，切換到標籤頁時會再刷新）"""
+        if not self.is_contact_sheet_visible():
+            # 不顯示時不再載入縮圖
+            self.contact_sheet_loader.cancel()
+            return
+        # 每次刷新取得一次批次命名器，格子的檔名直接使用（不必每個格子重新比對檔案列表）
+        self.contact_sheet_namer = self.get_batch_namer()
+        self.contact_sheet.set_items(self.get_files_to_process())
+    
+    def contact_sheet_labels(self, file_path, index):
+        """縮圖網格格子的 (原檔名, 新檔名)（使用刷新時取得的批次命名器）"""
+        try:
+            namer = self.contact_sheet_namer or self.get_batch_namer()
+            new_name, error = namer.name_for(index, file_path)
+            if new_name is None:
+                new_name = error
+        except Exception:
+            new_name = "生成失敗"
+        return os.path.basename(file_path), new_name
+    
+    def _contact_thumbnail_key(self, file_path):
+        """格子縮圖的快取鍵（修改時間和大小來自檔案中繼資料快取，主線程中不 stat）"""
+        key = thumbnail_key(file_path, CONTACT_SHEET_IMAGE_SIZE, metadata=metadata_cache)
+        return key + ('cell',) if key is not None else None
+    
+    def cached_contact_thumbnail(self, file_path):
+        """縮圖網格的快取縮圖（主線程中調用，未快取時返回 None）"""
+        return thumbnail_cache.get(self._contact_thumbnail_key(file_path))
+    
+    def request_contact_thumbnails(self, file_paths):
+        """載入可見格子的縮圖（取代尚未開始的舊請求）"""
+        self.contact_sheet_loader.prefetch([(path,) for path in file_paths])
+    
+    def load_contact_thumbnail(self, file_path):
+        """在背景執行緒中生成格子縮圖（置中放在固定大小的透明底圖上），完成後交給主線程顯示"""
+        key = self._contact_thumbnail_key(file_path)
+        img = thumbnail_cache.get(key)
+        if img is None:
+            img = self.load_preview_image(file_path, CONTACT_SHEET_IMAGE_SIZE)
+            if img is not None:
+                img = fit_to_cell(img, CONTACT_SHEET_IMAGE_SIZE)
+                thumbnail_cache.put(key, img)
+        self.root.after(0, lambda: self.contact_sheet.set_thumbnail(file_path, img))
+    
+    def select_file_in_list(self, file_path):
+        """在檔案列表中選中並顯示指定檔案（點擊縮圖網格的格子時使用）"""
+        row = self.file_listbox.row_of(file_path)
+        if row is None:
+            return
+        self.file_listbox.selection_clear(0, tk.END)
+        self.file_listbox.selection_set(row)
+        self.file_listbox.see(row)
+        self.on_file_select()
+    
+    def prefetch_around(self, file_path):
+        """預取列表中當前檔案前後 PREFETCH_RADIUS 個檔案的縮圖（由近到遠，下一個優先）"""
+        row = self.file_listbox.row_of(file_path)
+        if row is None:
+            return
+        size = self.file_listbox.size()
+        paths = []
+        for distance in range(1, PREFETCH_RADIUS + 1):
+            for neighbour in (row + distance, row - distance):
+                if 0 <= neighbour < size:
+                    paths.append(self.file_listbox.item(neighbour))
+        self.preview_loader.prefetch([(path, PREVIEW_IMAGE_SIZE) for path in paths])
+    
+    def warm_visible_thumbnails(self):
+        """預取列表第一屏檔案的縮圖（導入資料夾時使用）"""
+        paths = self.file_listbox.visible_items()
+        self.preview_loader.prefetch([(path, PREVIEW_IMAGE_SIZE) for path in paths])
+    
     def get_files_to_process(self):
         """獲取要處理的檔案列表（根據是否僅處理選中項）"""
         if self.only_selected_var.get():
-            # 僅處理選中的檔案，按照選中順序
-            selected_indices = self.file_listbox.curselection()
-            if not selected_indices:
-                return []
-            # 按照選中順序排列
-            files_to_process = [self.selected_files[i] for i in selected_indices]
-            return files_to_process
+            # 僅處理選中的檔案，按照列表中的順序
+            return self.get_selected_paths()
         else:
             # 處理所有檔案
             return self.selected_files
@@ -1363,71 +1742,61 @@ class FileRenamerGUI:
     def update_text_preview(self):
         """更新文字預覽"""
         files_to_process = self.get_files_to_process()
+        self.preview_text.delete(1.0, tk.END)
         if not files_to_process:
-            self.preview_text.delete(1.0, tk.END)
             return
         
-        # 文字預覽（包含遊戲引擎標準驗證）
-        self.preview_text.delete(1.0, tk.END)
-        validation_errors = []
-        
-        for i, file_path in enumerate(files_to_process):
-            new_name = self.generate_new_filename(file_path, i)
-            old_name = os.path.basename(file_path)
-            dir_path = os.path.dirname(file_path)
-            new_path = safe_join_path(dir_path, new_name)
+        # 由重新命名引擎批量生成計劃（與圖片預覽和執行重新命名共用編譯好的命名上下文），
+        # 衝突檢查只查詢每個資料夾掃描一次的檔名集合，參數改變時可以即時標示
+        plan = build_rename_plan(files_to_process, self.get_naming_context(), self.file_char_id_map,
+                                 namer=self.get_batch_namer())
+        
+        # 文字預覽（包含遊戲引擎標準驗證），收集後一次插入以減少Tk調用
+        chunks = []
+        separator = "-" * 60 + "\n"
+        for entry in plan:
+            old_name = os.path.basename(entry.old_path)
+            chunks += [f"原檔名: {old_name}\n", ()]
+            if entry.status == "error":
+                chunks += [f"  ⚠️ 無法生成新檔名: {entry.error}\n", "error", separator, ()]
+                continue
             
             # 驗證文件名（Character規則使用專用驗證）
-            if self.rule_var.get() == "character":
-                is_valid, error, parsed = validate_character_filename(new_name)
-                if is_valid:
-                    validation_status = "✓"
-                    # 顯示解析的詳細信息
-                    self.preview_text.insert(tk.END, f"原檔名: {old_name}\n")
-                    self.preview_text.insert(tk.END, f"新檔名: {new_name} {validation_status}\n", "success")
-                    self.preview_text.insert(tk.END, 
-                        f"  角色編號: {parsed['char_id']}, 類型: {parsed['char_type']}, "
-                        f"索引: {parsed['char_index']}, 擴展名: {parsed['ext']}\n")
+            if plan.rules.rule == "character":
+                if entry.is_valid:
+                    parsed = entry.parsed
+                    chunks += [f"新檔名: {entry.new_name} ✓\n", "success",
+                               f"  角色編號: {parsed['char_id']}, 類型: {parsed['char_type']}, "
+                               f"索引: {parsed['char_index']}, 擴展名: {parsed['ext']}\n", ()]
                 else:
-                    validation_status = "✗"
-                    self.preview_text.insert(tk.END, f"原檔名: {old_name}\n")
-                    self.preview_text.insert(tk.END, f"新檔名: {new_name} {validation_status}\n")
-                    self.preview_text.insert(tk.END, f"  ⚠️ 格式驗證失敗: {error}\n", "error")
-                    validation_errors.append(f"{old_name}: {error}")
+                    chunks += [f"新檔名: {entry.new_name} ✗\n", (),
+                               f"  ⚠️ 格式驗證失敗: {entry.error}\n", "error"]
             else:
                 # 夢想規則使用遊戲引擎標準驗證
-                is_valid, error = validate_game_engine_filename(new_name)
-                validation_status = "✓" if is_valid else "✗"
-                self.preview_text.insert(tk.END, f"原檔名: {old_name}\n")
-                self.preview_text.insert(tk.END, f"新檔名: {new_name} {validation_status}\n")
-                if not is_valid:
-                    self.preview_text.insert(tk.END, f"  ⚠️ 驗證失敗: {error}\n", "error")
-                    validation_errors.append(f"{old_name}: {error}")
+                chunks += [f"新檔名: {entry.new_name} {'✓' if entry.is_valid else '✗'}\n", ()]
+                if not entry.is_valid:
+                    chunks += [f"  ⚠️ 驗證失敗: {entry.error}\n", "error"]
             
-            self.preview_text.insert(tk.END, f"完整路徑: {new_path}\n")
-            self.preview_text.insert(tk.END, "-" * 60 + "\n")
+            if entry.status == "conflict":
+                chunks += ["  ⚠️ 衝突: 資料夾中已有同名檔案\n", "conflict"]
+            elif entry.status == "duplicate":
+                chunks += ["  ⚠️ 重名: 與本批次前面檔案的新檔名相同，執行時將跳過\n", "conflict"]
+            if entry.old_path.lower().endswith('.mp4'):
+                # 只顯示已解析的影片資訊（由統計的背景解析填入），不在主線程中讀取檔案
+                info = mp4_metadata_cache.peek(entry.old_path)[1]
+                if info is not None:
+                    chunks += [f"影片: {describe_mp4(info)}\n", ()]
+            chunks += [f"完整路徑: {entry.new_path}\n", (), separator, ()]
+        
+        self.preview_text.insert(tk.END, *chunks)
     
     def on_only_selected_change(self):
         """當"僅處理選中項"選項改變時，刷新預覽"""
         # 如果當前有選中的檔案，更新預覽
-        selected_indices = self.file_listbox.curselection()
-        if selected_indices:
-            selected_index = selected_indices[0]
-            if 0 <= selected_index < len(self.selected_files):
-                file_path = self.selected_files[selected_index]
-                # 如果啟用了"僅處理選中項"，使用在處理列表中的索引
-                if self.only_selected_var.get():
-                    files_to_process = self.get_files_to_process()
-                    if file_path in files_to_process:
-                        process_index = files_to_process.index(file_path)
-                        self.show_single_file_preview(file_path, process_index)
-                    else:
-                        # 如果文件不在處理列表中，使用原始索引
-                        self.show_single_file_preview(file_path, selected_index)
-                else:
-                    self.show_single_file_preview(file_path, selected_index)
-        # 同時刷新文字預覽
+        self._preview_selected_file()
+        # 同時刷新文字預覽和縮圖網格（處理的檔案範圍改變）
         self.update_text_preview()
+        self.refresh_contact_sheet()
     
     def preview_rename(self):
         """預覽重新命名結果"""
@@ -1443,21 +1812,15 @@ class FileRenamerGUI:
         self.update_text_preview()
         
         # 如果當前有選中的檔案，更新圖片預覽
-        selected_indices = self.file_listbox.curselection()
-        if selected_indices:
-            selected_index = selected_indices[0]
-            if 0 <= selected_index < len(self.selected_files):
-                file_path = self.selected_files[selected_index]
-                # 計算在處理列表中的索引
-                files_to_process = self.get_files_to_process()
-                if file_path in files_to_process:
-                    process_index = files_to_process.index(file_path)
-                    self.show_single_file_preview(file_path, process_index)
-                else:
-                    self.show_single_file_preview(file_path, selected_index)
+        self._preview_selected_file()
     
     def handle_rename_conflict(self, old_path, new_path):
-        """處理重新命名衝突，讓用戶選擇"""
+        """
+        處理重新命名衝突，讓用戶選擇
+
+        Returns:
+            "overwrite"（由執行重新命名時的 safe_rename 覆蓋目標）、"skip"、"cancel" 或 "error"
+        """
         old_name = os.path.basename(old_path)
         new_name = os.path.basename(new_path)
         
@@ -1485,19 +1848,13 @@ class FileRenamerGUI:
                     return "error"
                 
                 # 檢查原始檔案是否存在
-                if not os.path.exists(old_path):
+                if not metadata_cache.exists(old_path):
                     messagebox.showerror("錯誤", "原始檔案不存在")
                     return "error"
                 
-                # 使用安全的重命名（safe_rename 內部會處理衝突）
-                # 注意：safe_rename 會檢查目標文件是否存在，這裡不需要單獨刪除
-                # 避免競態條件：在檢查和刪除之間，文件可能被修改
-                success, error_msg = safe_rename(old_path, new_path)
-                if success:
-                    return "success"
-                else:
-                    messagebox.showerror("錯誤", f"覆蓋失敗：{error_msg or '未知錯誤'}")
-                    return "error"
+                # 不在這裡重新命名：加入重新命名列表後由 safe_rename 刪除目標再重新命名
+                # （與其他檔案一起記錄歷史，也不會對同一個檔案重新命名兩次）
+                return "overwrite"
             except Exception as e:
                 messagebox.showerror("錯誤", f"覆蓋失敗：{str(e)}")
                 return "error"
@@ -1516,42 +1873,18 @@ class FileRenamerGUI:
                 messagebox.showwarning("警告", "請先選擇檔案！")
             return
         
-        # 先預覽，確認無誤
-        rename_list = []
-        conflicts = []
-        errors = []  # 預先定義errors列表
-        
-        for i, file_path in enumerate(files_to_process):
-            try:
-                # 驗證原始檔案路徑
-                is_valid, error = validate_file_path(file_path)
-                if not is_valid:
-                    errors.append(f"{os.path.basename(file_path)}: {error}")
-                    continue
-                
-                # 檢查檔案是否存在
-                if not os.path.exists(file_path):
-                    errors.append(f"{os.path.basename(file_path)}: 檔案不存在")
-                    continue
-                
-                # 檢查是否為檔案（不是目錄）
-                if not os.path.isfile(file_path):
-                    errors.append(f"{os.path.basename(file_path)}: 不是檔案")
-                    continue
-                
-                new_name = self.generate_new_filename(file_path, i)
-                dir_path = os.path.dirname(file_path)
-                
-                # 使用安全的路徑連接
-                new_path = safe_join_path(dir_path, new_name)
-                
-                # 檢查新檔名是否已存在
-                if os.path.exists(new_path) and os.path.abspath(new_path) != os.path.abspath(file_path):
-                    conflicts.append((file_path, new_path))
-                else:
-                    rename_list.append((file_path, new_path))
-            except Exception as e:
-                errors.append(f"{os.path.basename(file_path)}: {str(e)}")
+        # 先檢查外部變更（每個目錄只 stat 一次），再由重新命名引擎檢查原始檔案和目標衝突
+        # （資料夾內容改變時批次命名器會重新分配索引）
+        metadata_cache.check_directories()
+        plan = build_rename_plan(files_to_process, self.get_naming_context(),
+                                 self.file_char_id_map, check_files=True,
+                                 namer=self.get_batch_namer())
+        rename_list = [(entry.old_path, entry.new_path) for entry in plan.renames]
+        conflicts = [(entry.old_path, entry.new_path) for entry in plan.conflicts]
+        errors = [f"{os.path.basename(entry.old_path)}: {entry.error}" for entry in plan.errors]
+        # 與本批次其他檔案重名的項目不能覆蓋（會刪除剛重新命名的檔案），只能跳過
+        errors += [f"{os.path.basename(entry.old_path)}: 新檔名 {entry.new_name} 與本批次其他檔案相同，已跳過"
+                   for entry in plan.duplicates]
         
         # 如果有錯誤，顯示錯誤訊息
         if errors:
@@ -1566,7 +1899,7 @@ class FileRenamerGUI:
                 result = self.handle_rename_conflict(old_path, new_path)
                 if result == "cancel":
                     return
-                elif result == "success":
+                elif result == "overwrite":
                     rename_list.append((old_path, new_path))
                 # skip的情況不加入列表
         
@@ -1601,7 +1934,7 @@ class FileRenamerGUI:
         for i, (old_path, new_path) in enumerate(rename_list):
             try:
                 # 使用安全的重命名函數
-                success, error_msg = safe_rename(old_path, new_path)
+                success, error_msg = safe_rename(old_path, new_path, metadata_cache)
                 
                 if success:
                     success_count += 1
@@ -1717,6 +2050,7 @@ class FileRenamerGUI:
                             messagebox.showwarning("警告", f"角色編號 {char_id} 超出範圍（1-99），已跳過")
                     except ValueError:
                         messagebox.showwarning("警告", f"角色編號 {char_id} 不是有效數字，已跳過")
+            self.invalidate_batch_namer()
             
             messagebox.showinfo("完成", f"已為 {len(self.file_char_id_map)} 個檔案設定角色編號！\n請在預覽中確認結果。")
             setup_window.destroy()
@@ -1725,8 +2059,8 @@ class FileRenamerGUI:
     
     def batch_set_char_id(self):
         """批量設定角色編號"""
-        selected_indices = self.file_listbox.curselection()
-        if not selected_indices:
+        selected_paths = self.get_selected_paths()
+        if not selected_paths:
             messagebox.showwarning("警告", "請先選擇要設定的檔案！")
             return
         
@@ -1737,7 +2071,7 @@ class FileRenamerGUI:
         batch_window.transient(self.root)
         batch_window.grab_set()
         
-        ttk.Label(batch_window, text=f"為 {len(selected_indices)} 個選中的檔案設定角色編號", 
+        ttk.Label(batch_window, text=f"為 {len(selected_paths)} 個選中的檔案設定角色編號", 
                  font=("Arial", 10, "bold")).pack(pady=10)
         
         input_frame = ttk.Frame(batch_window)
@@ -1752,15 +2086,14 @@ class FileRenamerGUI:
         
         def apply_batch_settings():
             char_id = batch_char_id_var.get()
-            for idx in selected_indices:
-                if 0 <= idx < len(self.selected_files):
-                    file_path = self.selected_files[idx]
-                    self.file_char_id_map[file_path] = char_id
-            messagebox.showinfo("完成", f"已為 {len(selected_indices)} 個檔案設定角色編號：{char_id}")
+            for file_path in selected_paths:
+                self.file_char_id_map[file_path] = char_id
+            self.invalidate_batch_namer()
+            messagebox.showinfo("完成", f"已為 {len(selected_paths)} 個檔案設定角色編號：{char_id}")
             batch_window.destroy()
             # 刷新預覽
             self.on_index_change()
-            self.update_status(f"已批量設定 {len(selected_indices)} 個檔案的角色編號")
+            self.update_status(f"已批量設定 {len(selected_paths)} 個檔案的角色編號")
         
         button_frame = ttk.Frame(batch_window)
         button_frame.pack(pady=10)
@@ -1786,6 +2119,8 @@ class FileRenamerGUI:
         self.root.bind('<Control-Return>', lambda e: self.execute_rename())
         # Ctrl+T: 切換深色模式
         self.root.bind('<Control-t>', lambda e: self.toggle_dark_mode())
+        # Esc: 取消資料夾導入
+        self.root.bind('<Escape>', lambda e: self.cancel_folder_ingest())
     
     def load_saved_settings(self):
         """載入儲存的設定"""
@@ -1829,6 +2164,21 @@ class FileRenamerGUI:
         if hasattr(self, 'max_files_var'):
             self.max_files_var.set(config_manager.get("max_files", "0"))
         
+        # 載入是否包含子資料夾
+        if hasattr(self, 'include_subfolders_var'):
+            self.include_subfolders_var.set(config_manager.get("include_subfolders", False))
+        
+        # 載入高品質預覽設定
+        if hasattr(self, 'preview_high_quality_var'):
+            self.preview_high_quality_var.set(config_manager.get("preview_high_quality", False))
+        
+        # 載入搜尋模式
+        if hasattr(self, 'search_mode_var'):
+            saved_mode = config_manager.get("search_mode", MODE_SUBSTRING)
+            for label, mode in SEARCH_MODE_LABELS.items():
+                if mode == saved_mode:
+                    self.search_mode_var.set(label)
+        
         # 載入深色模式
         dark_mode = config_manager.get("dark_mode", False)
         if dark_mode:
@@ -1869,6 +2219,18 @@ class FileRenamerGUI:
         if hasattr(self, 'max_files_var'):
             config_manager.set("max_files", self.max_files_var.get())
         
+        # 儲存是否包含子資料夾
+        if hasattr(self, 'include_subfolders_var'):
+            config_manager.set("include_subfolders", self.include_subfolders_var.get())
+        
+        # 儲存高品質預覽設定
+        if hasattr(self, 'preview_high_quality_var'):
+            config_manager.set("preview_high_quality", self.preview_high_quality_var.get())
+        
+        # 儲存搜尋模式
+        if hasattr(self, 'search_mode_var'):
+            config_manager.set("search_mode", self.get_search_mode())
+        
         # 儲存深色模式
         config_manager.set("dark_mode", self.dark_mode)
         
@@ -1877,14 +2239,17 @@ class FileRenamerGUI:
     def on_closing(self):
         """視窗關閉時的處理（包含資源清理）"""
         try:
+            # 停止背景資料夾導入和預覽載入
+            self.cancel_folder_ingest()
+            self.preview_loader.shutdown()
+            self.contact_sheet_loader.shutdown()
+            if self.thumbnail_decoder is not None:
+                self.thumbnail_decoder.shutdown()
+            
             # 清理圖片資源
             if hasattr(self, 'preview_images'):
-                for img_id, img in list(self.preview_images.items()):
-                    try:
-                        del img
-                    except:
-                        pass
                 self.preview_images.clear()
+                self.photo_pool.clear()
             
             # 保存設定
             self.save_settings()
@@ -1911,7 +2276,7 @@ class FileRenamerGUI:
         
         try:
             # 使用安全的重命名函數
-            success, error_msg = safe_rename(old_path, new_path)
+            success, error_msg = safe_rename(old_path, new_path, metadata_cache)
             
             if success:
                 self.update_status(f"已撤銷重命名：{os.path.basename(old_path)} -> {os.path.basename(new_path)}")
@@ -2055,6 +2420,8 @@ class FileRenamerGUI:
         # 更新Canvas背景
         if hasattr(self, 'preview_canvas'):
             self.preview_canvas.configure(bg=theme_colors['bg_primary'])
+        if hasattr(self, 'contact_sheet'):
+            self.contact_sheet.configure(bg=theme_colors['bg_primary'], fg=theme_colors['text_primary'])
         
         # 儲存設定
         if config_manager:
@@ -2085,6 +2452,8 @@ class FileRenamerGUI:
 
 
 def main():
+    # 打包成EXE後，子處理程序（大圖解碼）從這裡進入時直接執行任務，不建立視窗
+    multiprocessing.freeze_support()
     if HAS_DND:
         root = TkinterDnD.Tk()
     else:
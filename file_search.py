@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+檔案搜尋索引 - 導入時預先計算小寫檔名，支援包含、萬用字元、正規表示式和模糊搜尋，
+並快取編譯好的匹配器和逐步輸入的搜尋結果
+"""
+
+import os
+import re
+import fnmatch
+from collections import namedtuple
+from functools import lru_cache
+
+
+# 搜尋模式
+MODE_SUBSTRING = "substring"    # 檔名包含搜尋字串
+MODE_GLOB = "glob"              # 萬用字元（*.png、IMG_00??.jpg）
+MODE_REGEX = "regex"            # 正規表示式
+MODE_FUZZY = "fuzzy"            # 模糊搜尋（字元按順序出現即可，例如 "i01p" 匹配 "Idle_01.png"）
+SEARCH_MODES = (MODE_SUBSTRING, MODE_GLOB, MODE_REGEX, MODE_FUZZY)
+
+# 保留的縮小快取層數（每層是一個較短的搜尋字串及其結果）
+MAX_NARROWING_CACHE = 16
+
+# 在背景執行緒中準備好的搜尋
+# result 不為 None 時表示已命中快取，不需要再執行匹配
+SearchRequest = namedtuple('SearchRequest', ['query', 'mode', 'candidates', 'version', 'result'])
+
+
+def normalize_query(query, mode=MODE_SUBSTRING):
+    """
+    搜尋字串統一轉為小寫（檔名鍵也是小寫）
+
+    正規表示式保持原樣：轉為小寫會改變 \\D、\\S、\\W、\\B 等的含義，大小寫由 re.IGNORECASE 處理
+    """
+    query = query or ""
+    return query if mode == MODE_REGEX else query.lower()
+
+
+def _fuzzy_matcher(query):
+    """字元按順序出現即可（線性掃描子序列，不會像正規表示式一樣回溯）"""
+    def match(key):
+        chars = iter(key)
+        return all(char in chars for char in query)
+    return match
+
+
+@lru_cache(maxsize=64)
+def compile_matcher(query, mode=MODE_SUBSTRING):
+    """
+    編譯搜尋字串為匹配函數（按 搜尋字串+模式 快取）
+
+    匹配函數接受小寫檔名，返回是否符合
+
+    Returns:
+        (matcher, error_message)，搜尋字串無效時 matcher 為 None
+    """
+    query = normalize_query(query, mode)
+    if mode == MODE_SUBSTRING:
+        return (lambda key: query in key), None
+    if mode == MODE_GLOB:
+        # 不含萬用字元時當作包含搜尋，避免只能完整匹配檔名
+        if not any(char in query for char in "*?["):
+            return (lambda key: query in key), None
+        return re.compile(fnmatch.translate(query)).match, None
+    if mode == MODE_REGEX:
+        try:
+            return re.compile(query, re.IGNORECASE).search, None
+        except re.error as e:
+            return None, f"正規表示式無效: {e}"
+    if mode == MODE_FUZZY:
+        return _fuzzy_matcher(query), None
+    return None, f"未知的搜尋模式: {mode}"
+
+
+def _narrows(mode, cached_query, query):
+    """舊搜尋的結果是否一定包含新搜尋的結果（可以只過濾舊結果）"""
+    if mode in (MODE_SUBSTRING, MODE_FUZZY):
+        # 包含舊字串的字串一定也包含（或按順序包含）舊字串的字元
+        return cached_query in query
+    return cached_query == query
+
+
+class FileSearchIndex:
+    """
+    檔案列表的搜尋索引（作為 FileCollection 的監聽器使用）
+
+    - 每個檔案的小寫檔名只在添加時計算一次
+    - 記住最近的搜尋結果：包含和模糊模式下，新搜尋字串包含舊字串時只需過濾舊結果
+      （繼續輸入時越搜越快；刪除字元時直接命中快取）
+    - 搜尋結果保持 FileCollection 中的順序
+    - 搜尋可以拆成 prepare（主線程）、run（可在背景執行緒）、commit（主線程）三步，
+      version 用於判斷背景搜尋期間集合是否被修改過
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._keys = {}         # 路徑 -> 小寫檔名
+        self._cache = []        # [(模式, 搜尋字串, 結果列表)]，每層的結果包含下一層
+        self.version = 0        # 集合每次改變時遞增
+        collection.add_listener(self)
+
+    def key(self, path):
+        """返回檔案的搜尋鍵（小寫檔名）"""
+        key = self._keys.get(path)
+        if key is None:
+            key = os.path.basename(path).lower()
+        return key
+
+    def prepare(self, query, mode=MODE_SUBSTRING):
+        """
+        準備搜尋：查找快取並選出需要匹配的候選檔案（主線程調用）
+
+        Returns:
+            (SearchRequest, error_message)，搜尋字串無效時 SearchRequest 為 None
+        """
+        query = normalize_query(query, mode)
+        if not query:
+            return SearchRequest(query, mode, None, self.version, self.collection.to_list()), None
+        matcher, error = compile_matcher(query, mode)
+        if matcher is None:
+            return None, error
+
+        # 找出最深的、結果包含新搜尋結果的快取層，只過濾它的結果
+        base = None
+        keep = 0
+        for level, (cached_mode, cached_query, results) in enumerate(self._cache):
+            if cached_mode != mode or not _narrows(mode, cached_query, query):
+                break
+            if cached_query == query:
+                return SearchRequest(query, mode, None, self.version, list(results)), None
+            base = results
+            keep = level + 1
+        del self._cache[keep:]
+
+        candidates = list(base) if base is not None else self.collection.to_list()
+        return SearchRequest(query, mode, candidates, self.version, None), None
+
+    def run(self, request):
+        """
+        執行匹配（只讀取快照，可在背景執行緒中調用）
+
+        Returns:
+            符合的檔案路徑列表
+        """
+        if request.result is not None:
+            return request.result
+        matcher = compile_matcher(request.query, request.mode)[0]
+        key = self.key
+        return [path for path in request.candidates if matcher(key(path))]
+
+    def commit(self, request, results):
+        """
+        記住搜尋結果（主線程調用）
+
+        Returns:
+            集合在搜尋期間沒有改變時返回 True；否則結果可能已過時，應重新搜尋
+        """
+        if request.version != self.version:
+            return False
+        if request.query and request.result is None:
+            if not self._cache or not _narrows(request.mode, self._cache[-1][1], request.query) \
+                    or self._cache[-1][0] != request.mode:
+                self._cache.clear()
+            self._cache.append((request.mode, request.query, results))
+            if len(self._cache) > MAX_NARROWING_CACHE:
+                del self._cache[0]
+        return True
+
+    def search(self, query, mode=MODE_SUBSTRING):
+        """
+        在主線程中同步搜尋
+
+        Returns:
+            (符合的檔案路徑列表, error_message)；query 為空時返回全部檔案
+        """
+        request, error = self.prepare(query, mode)
+        if request is None:
+            return None, error
+        results = self.run(request)
+        self.commit(request, results)
+        return list(results), None
+
+    def filter_paths(self, paths, query, mode=MODE_SUBSTRING):
+        """從給定的檔案中篩選符合 query 的檔案（追加新檔案到已篩選的列表時使用）"""
+        query = normalize_query(query, mode)
+        if not query:
+            return list(paths)
+        matcher = compile_matcher(query, mode)[0]
+        if matcher is None:
+            return []
+        return [path for path in paths if matcher(self.key(path))]
+
+    def invalidate(self):
+        """清空搜尋結果快取"""
+        self._cache.clear()
+
+    # FileCollection 監聽器介面
+    def on_added(self, paths):
+        self.version += 1
+        keys = self._keys
+        for path in paths:
+            keys[path] = os.path.basename(path).lower()
+        # 新檔案追加在末尾，直接補充到已快取的結果中，保持快取有效
+        for cached_mode, cached_query, results in self._cache:
+            matcher = compile_matcher(cached_query, cached_mode)[0]
+            results.extend(path for path in paths if matcher(keys[path]))
+
+    def on_removed(self, paths):
+        self.version += 1
+        removed = set(paths)
+        for path in paths:
+            self._keys.pop(path, None)
+        for level, (cached_mode, cached_query, results) in enumerate(self._cache):
+            self._cache[level] = (cached_mode, cached_query, [p for p in results if p not in removed])
+
+    def on_replaced(self, old_path, new_path):
+        self.version += 1
+        self._keys.pop(old_path, None)
+        self._keys[new_path] = os.path.basename(new_path).lower()
+        # 新檔名可能改變是否符合，丟棄快取
+        self._cache.clear()
+
+    def on_reordered(self):
+        self.version += 1
+        self._cache.clear()
+
+    def on_cleared(self):
+        self.version += 1
+        self._keys.clear()
+        self._cache.clear()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+檔案統計聚合器 - 在添加、刪除和重新命名時按增量更新統計，避免每次刷新都重新掃描整個列表
+"""
+
+import os
+
+from file_metadata import metadata_cache
+from mp4_parser import mp4_metadata_cache, format_duration
+try:
+    from utils import format_file_size
+except ImportError:
+    # 工具模組無法匯入時（例如缺少配置模組）使用簡化的格式
+    def format_file_size(size_bytes):
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size_bytes < 1024 or unit == 'GB':
+                return f"{size_bytes:.2f} {unit}"
+            size_bytes /= 1024.0
+
+
+class FileStatistics:
+    """
+    已選檔案的統計資訊（按副檔名計數、總大小、按資料夾計數）
+
+    作為 FileCollection 的監聽器使用，所有更新都是增量的；
+    影片時長只使用已快取的 MP4 中繼資料，未解析的影片放入 pending_media，
+    由調用者在背景執行緒中解析後以 add_media() 補上（監聽器中不讀取檔案內容）
+    """
+
+    def __init__(self, metadata=None, media=None):
+        self.metadata = metadata if metadata is not None else metadata_cache
+        self.media = media if media is not None else mp4_metadata_cache
+        self.ext_counts = {}    # 副檔名 -> 數量
+        self.dir_counts = {}    # 資料夾 -> 數量
+        self.total_size = 0
+        self._sizes = {}        # 路徑 -> 計入總大小的位元組數（刪除時精確扣除）
+        self.video_duration = 0.0
+        self._durations = {}    # 影片路徑 -> 計入總時長的秒數
+        self.pending_media = set()  # 尚未解析的影片路徑
+
+    def __len__(self):
+        return len(self._sizes)
+
+    @staticmethod
+    def _increment(counts, key, delta):
+        value = counts.get(key, 0) + delta
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    def _add(self, path):
+        size = self.metadata.size(path)
+        self._sizes[path] = size
+        self.total_size += size
+        self._increment(self.ext_counts, os.path.splitext(path)[1].lower(), 1)
+        self._increment(self.dir_counts, os.path.dirname(path), 1)
+        if path.lower().endswith('.mp4'):
+            known, info = self.media.peek(path)
+            if known:
+                self._add_duration(path, info)
+            else:
+                self.pending_media.add(path)
+
+    def _add_duration(self, path, info):
+        if info is not None:
+            self._durations[path] = info.duration
+            self.video_duration += info.duration
+
+    def add_media(self, path, info):
+        """補上在背景解析的影片時長（檔案已移除或已計入時忽略）"""
+        if path in self.pending_media:
+            self.pending_media.discard(path)
+            self._add_duration(path, info)
+
+    def _remove(self, path):
+        size = self._sizes.pop(path, None)
+        if size is None:
+            return
+        self.total_size -= size
+        self._increment(self.ext_counts, os.path.splitext(path)[1].lower(), -1)
+        self._increment(self.dir_counts, os.path.dirname(path), -1)
+        self.video_duration -= self._durations.pop(path, 0.0)
+        self.pending_media.discard(path)
+
+    # FileCollection 監聽器介面
+    def on_added(self, paths):
+        for path in paths:
+            self._add(path)
+
+    def on_removed(self, paths):
+        for path in paths:
+            self._remove(path)
+
+    def on_replaced(self, old_path, new_path):
+        self._remove(old_path)
+        self._add(new_path)
+
+    def on_reordered(self):
+        # 統計與順序無關
+        pass
+
+    def on_cleared(self):
+        self.ext_counts.clear()
+        self.dir_counts.clear()
+        self._sizes.clear()
+        self.total_size = 0
+        self._durations.clear()
+        self.video_duration = 0.0
+        self.pending_media.clear()
+
+    def refresh_sizes(self, paths):
+        """重新讀取指定檔案的大小（外部變更後使用）"""
+        for path in paths:
+            if path in self._sizes:
+                new_size = self.metadata.size(path)
+                self.total_size += new_size - self._sizes[path]
+                self._sizes[path] = new_size
+
+    def summary_text(self):
+        """狀態欄顯示的統計文字（只依賴聚合值，與列表長度無關）"""
+        total_files = len(self._sizes)
+        if total_files == 0:
+            return ""
+        type_info = ", ".join([f"{ext.upper()}: {count}" for ext, count in sorted(self.ext_counts.items())])
+        stats_text = f"總數: {total_files} | {type_info} | 大小: {format_file_size(self.total_size)}"
+        if self._durations:
+            stats_text += f" | 影片時長: {format_duration(self.video_duration)}"
+        if len(self.dir_counts) > 1:
+            stats_text += f" | 資料夾: {len(self.dir_counts)}"
+        return stats_text
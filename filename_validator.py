@@ -5,6 +5,7 @@ Character_{角色編號}_{類型}_{索引}.ext
 """
 
 import re
+from collections import namedtuple
 
 
 # Character規則格式：Character_{角色編號}_{類型}_{索引}.ext
@@ -14,6 +15,109 @@ CHARACTER_FILENAME_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+CHARACTER_PREFIX = "Character_"
+
+# 解析後的Character檔名主體（不含擴展名），同一個主體的解析結果全域共用
+CharacterName = namedtuple('CharacterName', ['char_id', 'char_type', 'char_index'])
+
+
+def _build_character_tables():
+    """
+    預先生成所有有效的Character檔名主體（命名空間是封閉的：99個角色編號 x 47種類型和索引，共4653個）
+
+    Returns:
+        (主體 -> CharacterName, (角色編號, 類型, 索引) -> 主體)
+    """
+    index_ranges = {'Idle': range(1, 21), 'Intro': range(1, 21), 'Open': range(0, 7)}
+    names = {}
+    stems = {}
+    for char_id_num in range(1, 100):
+        char_id = f"{char_id_num:02d}"
+        for char_type, index_range in index_ranges.items():
+            for index_num in index_range:
+                char_index = f"{index_num:02d}"
+                stem = f"{CHARACTER_PREFIX}{char_id}_{char_type}_{char_index}"
+                name = CharacterName(char_id, char_type, char_index)
+                names[stem] = name
+                stems[name] = stem
+    return names, stems
+
+
+# 所有有效的檔名主體（生成和驗證都只需一次字典查找）
+CHARACTER_NAMES, CHARACTER_STEMS = _build_character_tables()
+
+
+def lookup_character_stem(stem):
+    """
+    查找Character檔名主體（"Character" 前綴不區分大小寫，與格式驗證一致）
+
+    Returns:
+        CharacterName，不是有效的主體時返回 None
+    """
+    name = CHARACTER_NAMES.get(stem)
+    if name is None and stem[:len(CHARACTER_PREFIX)].lower() == CHARACTER_PREFIX.lower():
+        name = CHARACTER_NAMES.get(CHARACTER_PREFIX + stem[len(CHARACTER_PREFIX):])
+    return name
+
+
+def _split_extension(filename):
+    """
+    拆分為 (主體, 擴展名)（擴展名不能再包含點）
+
+    Returns:
+        (主體, 擴展名)，擴展名格式不符時返回 (None, None)
+    """
+    stem, dot, rest = filename.partition('.')
+    if not dot:
+        return stem, ""
+    if not rest or '.' in rest:
+        return None, None
+    return stem, dot + rest
+
+
+class ValidationBatch:
+    """
+    批量驗證/清理的結果（逐個產生，不建立完整的結果列表，適合處理大型清單）
+
+    - 迭代時依次產生每個名稱的結果（格式由各批量函數決定）
+    - 統計數量在迭代過程中累加；summary() 會先處理完剩餘的名稱再返回統計
+    """
+
+    def __init__(self, names, check, labels=('valid', 'invalid')):
+        """
+        Args:
+            names: 名稱的可迭代對象
+            check: check(name) -> (結果, 是否通過)
+            labels: 統計中 (通過, 未通過) 的鍵名
+        """
+        self.labels = labels
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self._results = self._run(names, check)
+
+    def _run(self, names, check):
+        for name in names:
+            result, passed = check(name)
+            self.total += 1
+            if passed:
+                self.passed += 1
+            else:
+                self.failed += 1
+            yield result
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._results)
+
+    def summary(self):
+        """處理完所有名稱並返回統計，例如 {'total': 3, 'valid': 2, 'invalid': 1}"""
+        for _ in self._results:
+            pass
+        return {'total': self.total, self.labels[0]: self.passed, self.labels[1]: self.failed}
+
 
 def validate_character_filename(filename):
     """
@@ -38,6 +142,19 @@ def validate_character_filename(filename):
     if not filename:
         return False, "檔案名為空", None
     
+    # 快速路徑：在預先生成的有效主體中查找
+    stem, ext = _split_extension(filename)
+    if stem is not None:
+        name = lookup_character_stem(stem)
+        if name is not None:
+            return True, None, {
+                'char_id': name.char_id,
+                'char_type': name.char_type,
+                'char_index': name.char_index,
+                'ext': ext.lower()
+            }
+    
+    # 無效的檔名：逐項檢查以提供詳細的錯誤訊息
     # 檢查格式（重點是前面的格式）
     match = CHARACTER_FILENAME_PATTERN.match(filename)
     if not match:
@@ -101,35 +218,64 @@ def generate_character_filename(char_id, char_type, char_index, ext=''):
         
     Returns:
         格式化的文件名
-    """
-    # 確保角色編號為兩位數字
-    char_id_str = str(int(char_id)).zfill(2)
-    
-    # 確保類型正確
-    valid_types = ['Idle', 'Intro', 'Open']
-    if char_type not in valid_types:
-        raise ValueError(f"類型 '{char_type}' 無效，應為 {valid_types}")
-    
-    # 確保索引為兩位數字
-    char_index_str = str(int(char_index)).zfill(2)
     
+    Raises:
+        ValueError: 參數超出範圍（生成的文件名無效）
+    """
     # 處理擴展名（保留原始格式，但轉為小寫）
     if ext:
         if not ext.startswith('.'):
             ext = '.' + ext
         ext = ext.lower()
     
-    # 生成文件名（重點是前面的格式）
-    filename = f"Character_{char_id_str}_{char_type}_{char_index_str}{ext}"
+    # 已是兩位數字字串時直接查表，否則先補零
+    stem = CHARACTER_STEMS.get((char_id, char_type, char_index))
+    if stem is None:
+        # 確保角色編號為兩位數字
+        char_id_str = str(int(char_id)).zfill(2)
+        
+        # 確保類型正確
+        valid_types = ['Idle', 'Intro', 'Open']
+        if char_type not in valid_types:
+            raise ValueError(f"類型 '{char_type}' 無效，應為 {valid_types}")
+        
+        # 確保索引為兩位數字
+        char_index_str = str(int(char_index)).zfill(2)
+        stem = CHARACTER_STEMS.get((char_id_str, char_type, char_index_str))
+        if stem is None:
+            # 超出範圍：取得詳細的錯誤訊息
+            _, error, _ = validate_character_filename(f"Character_{char_id_str}_{char_type}_{char_index_str}{ext}")
+            raise ValueError(f"生成的文件名無效: {error}")
     
-    # 驗證生成的文件名（重點是前面的格式）
-    is_valid, error, _ = validate_character_filename(filename)
-    if not is_valid:
+    # 有效的主體已在表中，只需檢查擴展名（不能再包含點）
+    filename = stem + ext
+    if ext and ('.' in ext[1:] or len(ext) == 1):
+        _, error, _ = validate_character_filename(filename)
         raise ValueError(f"生成的文件名無效: {error}")
     
     return filename
 
 
+def validate_character_filenames(filenames):
+    """
+    批量驗證Character規則的文件名
+
+    Args:
+        filenames: 檔案名的可迭代對象（可以是生成器，例如逐行讀取的清單）
+
+    Returns:
+        ValidationBatch，逐個產生 (filename, is_valid, error_message, parsed_data)，
+        summary() 返回 {'total', 'valid', 'invalid'}
+    """
+    validate = validate_character_filename
+
+    def check(filename):
+        is_valid, error, parsed = validate(filename)
+        return (filename, is_valid, error, parsed), is_valid
+
+    return ValidationBatch(filenames, check)
+
+
 def ensure_character_format(filename):
     """
     確保文件名符合Character格式（如果不符，嘗試修正）
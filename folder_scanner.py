@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+資料夾掃描器 - 使用 os.scandir 單次讀取目錄，支援並行遞迴掃描子資料夾
+"""
+
+import os
+import queue
+import time
+from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from config import SUPPORTED_EXTENSIONS
+except ImportError:
+    # 與 file_renamer 的預設配置相同
+    SUPPORTED_EXTENSIONS = ['.mp4', '.jpg', '.jpeg', '.png']
+
+# 遞迴掃描時的預設工作執行緒數量（網路磁碟上主要等待I/O，少量執行緒即可）
+DEFAULT_SCAN_WORKERS = 4
+# 背景導入時每批交給主執行緒的最大檔案數和最長間隔（秒）
+INGEST_CHUNK_SIZE = 500
+INGEST_CHUNK_INTERVAL = 0.1
+
+
+def _normalize_extensions(extensions):
+    """
+    將擴展名列表轉為小寫，返回 {擴展名: 順序}（O(1)查找，並保留列表中的順序用於排序）
+    """
+    if extensions is None:
+        extensions = SUPPORTED_EXTENSIONS
+    ranks = {}
+    for ext in extensions:
+        ranks.setdefault(ext.lower(), len(ranks))
+    return ranks
+
+
+def _iter_directory(dir_path, extensions, subdirs=None, cancel_event=None, metadata_cache=None):
+    """
+    讀取單個目錄一次，產生符合擴展名的 (排序鍵, 檔案路徑)
+
+    DirEntry.is_file()/is_dir() 直接使用目錄項中的類型資訊（d_type），
+    一般情況下不需要額外的 stat 系統調用
+
+    Args:
+        extensions: _normalize_extensions() 的結果
+        subdirs: 如果提供列表，子資料夾路徑會追加到其中
+        metadata_cache: 如果提供 FileMetadataCache，符合的檔案會順便填入快取
+    """
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            try:
+                if entry.is_file():
+                    rank = extensions.get(os.path.splitext(entry.name)[1].lower())
+                    if rank is not None:
+                        if metadata_cache is not None:
+                            metadata_cache.put_entry(entry)
+                        # 與舊版按副檔名逐個 glob 相同：先按副檔名分組，組內按檔名排序
+                        yield (rank, entry.name.lower(), entry.name), entry.path
+                elif subdirs is not None and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+            except OSError:
+                # 無法讀取的項目（例如權限不足或已被刪除）直接跳過
+                continue
+
+
+def _scan_directory(dir_path, extensions, collect_subdirs, cancel_event=None, metadata_cache=None):
+    """
+    讀取單個目錄一次，返回排序後的符合擴展名的檔案和子資料夾
+
+    scandir 的順序隨平台和檔案系統而不同，排序後導入順序（即預設的命名順序）才是確定的
+
+    Returns:
+        (files, subdirs)
+    """
+    subdirs = [] if collect_subdirs else None
+    found = sorted(_iter_directory(dir_path, extensions, subdirs, cancel_event, metadata_cache))
+    return [path for _, path in found], sorted(subdirs or [], key=lambda d: (d.lower(), d))
+
+
+def _scan_directory_safe(dir_path, extensions, cancel_event=None, metadata_cache=None):
+    """遞迴掃描時使用：子資料夾無法讀取時跳過而不中斷整個掃描"""
+    try:
+        return _scan_directory(dir_path, extensions, True, cancel_event, metadata_cache)
+    except OSError:
+        return [], []
+
+
+def iter_scan_folder(folder_path, extensions=None, recursive=False, max_workers=DEFAULT_SCAN_WORKERS,
+                     cancel_event=None, metadata_cache=None):
+    """
+    掃描資料夾，逐個目錄產生符合擴展名的檔案路徑
+
+    順序是確定的：每個目錄內先按副檔名（extensions 的順序）分組，組內按檔名排序；
+    遞迴時按前序遍歷（目錄本身的檔案，再依名稱順序進入子資料夾），與掃描完成的先後無關
+
+    Args:
+        folder_path: 資料夾路徑
+        extensions: 允許的擴展名（預設為 SUPPORTED_EXTENSIONS）
+        recursive: 是否包含子資料夾
+        max_workers: 遞迴掃描時的最大並行執行緒數量
+        cancel_event: threading.Event，設定後盡快停止掃描
+        metadata_cache: FileMetadataCache，掃描時順便填入檔案中繼資料
+
+    Yields:
+        檔案路徑（按上述順序，輪到的目錄讀取完成後即產生該目錄的結果）
+
+    Raises:
+        OSError: 根資料夾無法讀取
+    """
+    extensions = _normalize_extensions(extensions)
+
+    # 根資料夾的錯誤直接拋出，讓調用者顯示錯誤訊息
+    files, subdirs = _scan_directory(folder_path, extensions, recursive, cancel_event, metadata_cache)
+    for file_path in files:
+        yield file_path
+
+    if not recursive or not subdirs:
+        return
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    # 有界的執行緒池：每個目錄一個任務，完成後再提交其子資料夾；
+    # 結果先暫存，按前序遍歷的順序產生
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        def submit(dir_path):
+            future = executor.submit(_scan_directory_safe, dir_path, extensions, cancel_event, metadata_cache)
+            directories[future] = dir_path
+            return future
+
+        directories = {}    # 進行中的 future -> 目錄
+        pending = {submit(d) for d in subdirs}
+        results = {}        # 已掃描、尚未輪到的目錄 -> (files, subdirs)
+        stack = subdirs[::-1]   # 前序遍歷待產生的目錄（棧頂是下一個）
+        while stack:
+            if cancelled():
+                for future in pending:
+                    future.cancel()
+                return
+            if stack[-1] in results:
+                dir_files, dir_subdirs = results.pop(stack.pop())
+                stack.extend(reversed(dir_subdirs))
+                for file_path in dir_files:
+                    yield file_path
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_files, dir_subdirs = future.result()
+                results[directories.pop(future)] = (dir_files, dir_subdirs)
+                for sub_path in dir_subdirs:
+                    pending.add(submit(sub_path))
+
+
+def scan_folder(folder_path, extensions=None, recursive=False, max_workers=DEFAULT_SCAN_WORKERS):
+    """
+    掃描資料夾，返回符合擴展名的檔案路徑列表
+
+    Raises:
+        OSError: 根資料夾無法讀取
+    """
+    return list(iter_scan_folder(folder_path, extensions, recursive, max_workers))
+
+
+class FolderIngestJob:
+    """
+    背景資料夾導入工作
+
+    在工作執行緒中掃描資料夾，將找到的檔案分批放入佇列，
+    由主執行緒（例如透過 root.after 定時）調用 drain() 取出。
+    佇列中的事件：
+        ("files", [檔案路徑, ...])
+        ("error", 資料夾路徑, 錯誤訊息)
+        ("finished", None)
+    """
+
+    def __init__(self, folders, extensions=None, recursive=False, max_workers=DEFAULT_SCAN_WORKERS,
+                 chunk_size=INGEST_CHUNK_SIZE, metadata_cache=None):
+        self.folders = list(folders)
+        self.extensions = extensions
+        self.recursive = recursive
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.metadata_cache = metadata_cache
+        self.found_count = 0  # 已找到的檔案數量（僅由工作執行緒寫入）
+        self.cancel_event = Event()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """啟動工作執行緒"""
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """要求停止掃描（工作執行緒會在下一個檔案或目錄處停止）"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def drain(self, max_events=20):
+        """
+        取出佇列中已準備好的事件（不阻塞）
+
+        Returns:
+            事件列表
+        """
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        chunk = []
+        last_flush = time.monotonic()
+        try:
+            for folder in self.folders:
+                if self.cancelled:
+                    break
+                try:
+                    for file_path in iter_scan_folder(folder, self.extensions, self.recursive,
+                                                      self.max_workers, self.cancel_event,
+                                                      self.metadata_cache):
+                        chunk.append(file_path)
+                        self.found_count += 1
+                        now = time.monotonic()
+                        if len(chunk) >= self.chunk_size or now - last_flush >= INGEST_CHUNK_INTERVAL:
+                            self._queue.put(("files", chunk))
+                            chunk = []
+                            last_flush = now
+                except OSError as e:
+                    self._queue.put(("error", folder, str(e)))
+            if chunk:
+                self._queue.put(("files", chunk))
+        finally:
+            self._queue.put(("finished", None))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+預覽圖片解碼 - 以降低的解析度解碼大圖，只取得預覽需要的像素
+
+- JPEG：用 draft() 讓解碼器直接以 1/2、1/4、1/8 的尺寸解碼（DCT縮放）
+- 其他格式：完整解碼後先用 reduce() 做整數倍的快速縮小
+- 快速模式用雙線性插值縮放到目標尺寸；高品質模式保留兩倍的餘量再用 LANCZOS
+- JPEG 內嵌的 EXIF 縮圖足夠大時直接使用（只讀取檔案開頭，不解碼像素）
+- 結果統一轉換為 Tk 可以直接複製的模式（RGB/RGBA 等），主線程建立 Tk 圖片時不必再轉換
+"""
+
+import io
+import struct
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+# 高品質模式在最終縮放前保留的倍數（與 Pillow thumbnail 的 reducing_gap 相同）
+HIGH_QUALITY_GAP = 2
+
+# 探測 EXIF 縮圖時讀取的檔案開頭長度（APP1 段最長 64KB，加上前面可能的 APP0 段）
+EXIF_PROBE_BYTES = 128 * 1024
+
+
+def _find_exif_segment(header):
+    """在 JPEG 開頭的資料中查找 EXIF APP1 段，返回 TIFF 資料（不含 "Exif\\0\\0"），找不到時返回 None"""
+    if header[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    while pos + 4 <= len(header):
+        if header[pos] != 0xFF:
+            return None
+        marker = header[pos + 1]
+        if marker == 0xFF:
+            # 填充位元組
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):
+            # 影像結束或掃描開始，之後不會再有 APP 段
+            return None
+        length = struct.unpack('>H', header[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and header[pos + 4:pos + 10] == b'Exif\x00\x00':
+            return header[pos + 10:pos + 2 + length]
+        pos += 2 + length
+    return None
+
+
+def _exif_thumbnail_bytes(tiff):
+    """從 TIFF 結構的 IFD1 中取出內嵌的 JPEG 縮圖資料"""
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+    try:
+        ifd0 = struct.unpack(endian + 'I', tiff[4:8])[0]
+        count = struct.unpack(endian + 'H', tiff[ifd0:ifd0 + 2])[0]
+        next_ifd = ifd0 + 2 + count * 12
+        ifd1 = struct.unpack(endian + 'I', tiff[next_ifd:next_ifd + 4])[0]
+        if ifd1 == 0:
+            return None
+        count = struct.unpack(endian + 'H', tiff[ifd1:ifd1 + 2])[0]
+        offset = length = None
+        for i in range(count):
+            entry = ifd1 + 2 + i * 12
+            tag, _, _, value = struct.unpack(endian + 'HHII', tiff[entry:entry + 12])
+            if tag == 0x0201:       # JPEGInterchangeFormat
+                offset = value
+            elif tag == 0x0202:     # JPEGInterchangeFormatLength
+                length = value
+        if not offset or not length or offset + length > len(tiff):
+            return None
+        return tiff[offset:offset + length]
+    except struct.error:
+        return None
+
+
+def load_embedded_thumbnail(file_path, max_size):
+    """
+    讀取 JPEG 內嵌的 EXIF 縮圖（只讀取檔案開頭）
+
+    Returns:
+        PIL 圖片；沒有內嵌縮圖，或縮圖比 max_size 小（顯示時需要放大）時返回 None
+    """
+    if not HAS_PIL:
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(EXIF_PROBE_BYTES)
+    except OSError:
+        return None
+    tiff = _find_exif_segment(header)
+    if tiff is None:
+        return None
+    data = _exif_thumbnail_bytes(tiff)
+    if data is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as embedded:
+            # 至少一邊達到預覽尺寸才算夠大
+            if embedded.width < max_size[0] and embedded.height < max_size[1]:
+                return None
+            embedded.load()
+            return embedded.copy()
+    except Exception:
+        return None
+
+
+# Tk 圖片可以直接複製像素的模式
+DISPLAY_MODES = ('1', 'L', 'RGB', 'RGBA')
+
+
+def to_display_image(image):
+    """將圖片轉換為 Tk 可以直接複製的模式（在背景執行緒中調用，已是這些模式時原樣返回）"""
+    if image.mode in DISPLAY_MODES:
+        return image
+    if image.mode in ('LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def _reduce_factor(size, target, gap):
+    """在保留 gap 倍餘量的前提下，可以整數倍縮小的倍數"""
+    width, height = size
+    target_width, target_height = target
+    return max(1, min(width // (target_width * gap), height // (target_height * gap)))
+
+
+def decode_thumbnail_bytes(data, max_size):
+    """將記憶體中的圖片（例如影片封面）解碼並縮小到 max_size 以內"""
+    with Image.open(io.BytesIO(data)) as source:
+        source.draft(source.mode, tuple(max_size))
+        source.thumbnail(tuple(max_size), Image.Resampling.BILINEAR)
+        return to_display_image(source.copy())
+
+
+def decode_thumbnail(file_path, max_size, high_quality=False):
+    """
+    解碼圖片並縮小到 max_size 以內（保持比例）
+
+    Args:
+        file_path: 圖片路徑
+        max_size: (寬, 高) 最大尺寸
+        high_quality: 是否使用高品質（較慢）的縮放
+
+    Returns:
+        PIL 圖片（已與原始檔案分離，可以長期保存；模式為 DISPLAY_MODES 之一）
+    """
+    if not high_quality and str(file_path).lower().endswith(('.jpg', '.jpeg')):
+        embedded = load_embedded_thumbnail(file_path, max_size)
+        if embedded is not None:
+            embedded.thumbnail(tuple(max_size), Image.Resampling.BILINEAR, reducing_gap=None)
+            return to_display_image(embedded)
+
+    gap = HIGH_QUALITY_GAP if high_quality else 1
+    resample = Image.Resampling.LANCZOS if high_quality else Image.Resampling.BILINEAR
+    max_size = tuple(max_size)
+
+    with Image.open(file_path) as source:
+        if source.format == 'JPEG':
+            # 解碼器直接輸出縮小後的圖片（不小於 max_size 的 gap 倍）
+            source.draft(source.mode, (max_size[0] * gap, max_size[1] * gap))
+            image = source
+        else:
+            source.load()
+            factor = _reduce_factor(source.size, max_size, gap)
+            image = source.reduce(factor) if factor > 1 else source
+
+        image.thumbnail(max_size, resample, reducing_gap=None)
+        # 複製結果，關閉原始圖片以釋放檔案和解碼資源
+        return to_display_image(image.copy())
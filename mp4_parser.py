@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+MP4 中繼資料解析 - 以記憶體映射讀取 ISO-BMFF 的 box 結構，只解析 moov 中需要的部分
+（mvhd、tkhd、hdlr、stsd 和 iTunes 封面 covr），從不讀取 mdat，數GB的影片也只需讀取幾KB
+"""
+
+import os
+import mmap
+import itertools
+import struct
+import threading
+from collections import namedtuple
+
+from file_metadata import metadata_cache
+
+
+# 解析結果
+# duration: 秒；width/height: 第一個影像軌的顯示尺寸；
+# cover: 封面圖片在檔案中的 (偏移, 長度)（沒有時為 None，內容由 read_cover() 按需讀取）
+Mp4Info = namedtuple('Mp4Info', [
+    'duration', 'width', 'height', 'video_codec', 'audio_codec', 'cover'
+])
+
+# 快取的項目數上限，超過時丟棄最早快取的一部分（與檔案中繼資料快取相同）
+MAX_CACHED_ENTRIES = 50_000
+PRUNE_FRACTION = 0.25
+
+# 需要進入解析子 box 的容器
+_CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'udta', b'ilst'}
+
+
+def _iter_boxes(data, start, end):
+    """
+    遍歷 [start, end) 範圍內的 box
+
+    Yields:
+        (類型, 內容起點, 內容終點)
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            # 損壞或被截斷的 box，停止解析
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find_box(data, start, end, box_type):
+    for child_type, child_start, child_end in _iter_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+
+def _parse_mvhd(data, start):
+    """返回影片時長（秒）"""
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack('>IQ', data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack('>II', data[start + 12:start + 20])
+    return duration / timescale if timescale else 0.0
+
+
+def _parse_tkhd(data, start, end):
+    """返回軌道的顯示尺寸（16.16 定點數，位於 tkhd 的最後8個位元組）"""
+    width, height = struct.unpack('>II', data[end - 8:end])
+    return width >> 16, height >> 16
+
+
+def _parse_trak(data, start, end):
+    """返回 (軌道類型, 寬, 高, 編碼格式)"""
+    width = height = 0
+    handler = codec = None
+    tkhd = _find_box(data, start, end, b'tkhd')
+    if tkhd:
+        width, height = _parse_tkhd(data, *tkhd)
+    mdia = _find_box(data, start, end, b'mdia')
+    if mdia:
+        hdlr = _find_box(data, mdia[0], mdia[1], b'hdlr')
+        if hdlr:
+            handler = bytes(data[hdlr[0] + 8:hdlr[0] + 12])
+        minf = _find_box(data, mdia[0], mdia[1], b'minf')
+        stbl = minf and _find_box(data, minf[0], minf[1], b'stbl')
+        stsd = stbl and _find_box(data, stbl[0], stbl[1], b'stsd')
+        if stsd and stsd[0] + 16 <= stsd[1]:
+            # stsd：版本/旗標(4) + 項目數(4)，第一個樣本描述的類型即編碼格式（avc1、hvc1、mp4a...）
+            codec = bytes(data[stsd[0] + 12:stsd[0] + 16]).decode('latin-1').strip()
+    return handler, width, height, codec
+
+
+def _parse_cover(data, udta_start, udta_end):
+    """返回 moov/udta/meta/ilst/covr/data 中封面圖片的 (偏移, 長度)，不複製圖片內容"""
+    meta = _find_box(data, udta_start, udta_end, b'meta')
+    if not meta:
+        return None
+    # meta 是 full box，子 box 前有 4 個位元組的版本/旗標
+    ilst = _find_box(data, meta[0] + 4, meta[1], b'ilst')
+    covr = ilst and _find_box(data, ilst[0], ilst[1], b'covr')
+    image = covr and _find_box(data, covr[0], covr[1], b'data')
+    if not image or image[0] + 8 > image[1]:
+        return None
+    # data box：類型(4) + 語系(4) + 圖片內容
+    return image[0] + 8, image[1] - image[0] - 8
+
+
+def parse_mp4(file_path):
+    """
+    解析 MP4 檔案的中繼資料（只讀取 moov，跳過 mdat）
+
+    Returns:
+        Mp4Info
+
+    Raises:
+        OSError: 無法讀取檔案
+        ValueError: 不是有效的 MP4 檔案（包括被截斷或損壞的 box）
+    """
+    try:
+        return _parse_file(file_path)
+    except (struct.error, IndexError) as e:
+        # 被截斷的 box（例如只剩版本位元組之前的內容）
+        raise ValueError(f"MP4 結構已損壞: {e}") from e
+
+
+def _parse_file(file_path):
+    """parse_mp4 的實作（截斷的 box 可能拋出 struct.error 或 IndexError）"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < 8:
+            raise ValueError("檔案太小，不是有效的 MP4")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            moov = _find_box(data, 0, len(data), b'moov')
+            if moov is None:
+                raise ValueError("找不到 moov box")
+
+            duration = 0.0
+            width = height = 0
+            video_codec = audio_codec = None
+            cover = None
+            for box_type, start, end in _iter_boxes(data, *moov):
+                if box_type == b'mvhd':
+                    duration = _parse_mvhd(data, start)
+                elif box_type == b'trak':
+                    handler, track_width, track_height, codec = _parse_trak(data, start, end)
+                    if handler == b'vide' and video_codec is None:
+                        width, height, video_codec = track_width, track_height, codec
+                    elif handler == b'soun' and audio_codec is None:
+                        audio_codec = codec
+                elif box_type == b'udta':
+                    cover = _parse_cover(data, start, end)
+
+            return Mp4Info(duration, width, height, video_codec, audio_codec, cover)
+
+
+def read_cover(file_path, info):
+    """
+    讀取封面圖片的位元組（只讀取封面所在的範圍，在背景執行緒中調用）
+
+    Returns:
+        封面圖片的位元組，沒有封面或檔案已被截短時返回 None
+
+    Raises:
+        OSError: 無法讀取檔案
+    """
+    if info is None or info.cover is None:
+        return None
+    offset, length = info.cover
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    return data if len(data) == length else None
+
+
+def format_duration(seconds):
+    """將秒數格式化為 mm:ss 或 h:mm:ss"""
+    seconds = int(round(seconds or 0))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def describe_mp4(info):
+    """影片資訊的簡短描述（例如 "1920x1080 | 01:23 | avc1"）"""
+    parts = []
+    if info.width and info.height:
+        parts.append(f"{info.width}x{info.height}")
+    parts.append(format_duration(info.duration))
+    if info.video_codec:
+        parts.append(info.video_codec)
+    return " | ".join(parts)
+
+
+class Mp4MetadataCache:
+    """
+    MP4 中繼資料快取（執行緒安全，按 路徑+修改時間+大小 判斷是否需要重新解析）
+
+    修改時間和大小來自檔案中繼資料快取，重複查詢不需要系統調用；
+    無法解析的檔案也會被快取（值為 None）；只快取封面的位置而不是內容，
+    項目超過 MAX_CACHED_ENTRIES 時丟棄最早快取的一部分
+    """
+
+    def __init__(self, metadata=None):
+        self.metadata = metadata if metadata is not None else metadata_cache
+        self._entries = {}      # 路徑 -> ((修改時間, 大小), Mp4Info 或 None)
+        self._lock = threading.Lock()
+
+    def _stamp(self, file_path):
+        metadata = self.metadata.get(file_path)
+        if metadata is None:
+            return None
+        return metadata.mtime, metadata.size
+
+    def peek(self, file_path):
+        """
+        只查詢快取，不解析檔案（可在主線程中調用）
+
+        Returns:
+            (是否已快取, Mp4Info 或 None)
+        """
+        stamp = self._stamp(file_path)
+        if stamp is None:
+            return True, None
+        with self._lock:
+            cached = self._entries.get(file_path)
+        if cached is not None and cached[0] == stamp:
+            return True, cached[1]
+        return False, None
+
+    def get(self, file_path):
+        """
+        獲取 MP4 中繼資料（未快取時解析檔案）
+
+        Returns:
+            Mp4Info，檔案不存在或無法解析時返回 None
+        """
+        stamp = self._stamp(file_path)
+        if stamp is None:
+            return None
+        with self._lock:
+            cached = self._entries.get(file_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            info = parse_mp4(file_path)
+        except (OSError, ValueError):
+            info = None
+        with self._lock:
+            entries = self._entries
+            entries[file_path] = (stamp, info)
+            if len(entries) > MAX_CACHED_ENTRIES:
+                for old_path in list(itertools.islice(entries, int(MAX_CACHED_ENTRIES * PRUNE_FRACTION))):
+                    del entries[old_path]
+        return info
+
+    def invalidate(self, file_path):
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 全域 MP4 中繼資料快取實例
+mp4_metadata_cache = Mp4MetadataCache()
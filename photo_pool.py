@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+預覽圖片池 - 在主線程中把背景執行緒解碼好的像素封裝成 Tk 圖片，並重用尺寸相同的 Tk 圖片
+
+Tk 不是執行緒安全的，PhotoImage 只能在主線程中建立和更新；
+背景執行緒只負責解碼成 RGB/RGBA 像素（見 image_decoder.to_display_image），
+主線程只需把像素直接複製進 Tk 圖片
+"""
+
+from collections import OrderedDict
+
+try:
+    from PIL import ImageTk
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+# 保留的閒置 Tk 圖片數量上限
+DEFAULT_POOL_SIZE = 4
+
+
+class PhotoImagePool:
+    """
+    Tk 圖片池（只能在主線程中使用）
+
+    - acquire(image)：取得顯示 image 的 Tk 圖片；有相同模式和尺寸的閒置圖片時直接覆寫像素，
+      不必重新建立和刪除 Tk 圖片（例如高品質預覽替換快速預覽時）
+    - release(photo)：不再顯示的 Tk 圖片放回池中（必須先從畫布上移除，覆寫顯示中的圖片很慢）
+    """
+
+    def __init__(self, max_idle=DEFAULT_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle = OrderedDict()  # 閒置的 Tk 圖片 -> (模式, 尺寸)
+        self._active = {}           # 使用中的 Tk 圖片 -> (模式, 尺寸)
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, image):
+        """
+        取得顯示 image（PIL 圖片）的 Tk 圖片
+
+        Returns:
+            ImageTk.PhotoImage，未安裝 Pillow 時返回 None
+        """
+        if not HAS_PIL or image is None:
+            return None
+        spec = (image.mode, image.size)
+        for photo, idle_spec in self._idle.items():
+            if idle_spec == spec:
+                del self._idle[photo]
+                photo.paste(image)
+                self.reused += 1
+                break
+        else:
+            photo = ImageTk.PhotoImage(image)
+            self.created += 1
+        self._active[photo] = spec
+        return photo
+
+    def release(self, photo):
+        """放回不再顯示的 Tk 圖片（池滿時丟棄最舊的，由 Pillow 刪除對應的 Tk 圖片）"""
+        spec = self._active.pop(photo, None)
+        if spec is None:
+            return
+        self._idle[photo] = spec
+        while len(self._idle) > self.max_idle:
+            self._idle.popitem(last=False)
+
+    def clear(self):
+        """丟棄所有 Tk 圖片"""
+        self._idle.clear()
+        self._active.clear()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+預覽載入器 - 固定數量的背景執行緒載入預覽，只保留最新的請求，空閒時預取相鄰檔案的縮圖
+"""
+
+import threading
+from collections import deque
+
+
+# 同時進行的預覽解碼數量上限
+DEFAULT_PREVIEW_WORKERS = 2
+
+
+class PreviewLoader:
+    """
+    預覽載入的執行緒池（最新的請求優先）
+
+    - 執行緒數量固定，同時進行的解碼數量不超過 max_workers
+    - 只保留一個等待中的請求：新請求會直接取代尚未開始的舊請求（在解碼前就取消）
+    - 已經開始的舊請求完成後，結果會被丟棄，不調用回呼
+    - 預取（低優先級）只在沒有前台請求時執行，並且至少保留一個執行緒給前台請求；
+      只有一個執行緒時不預取（否則預取會佔用唯一的執行緒，前台請求必須等待）
+
+    load_func(*args) 在背景執行緒中執行；callback(result, error) 也在背景執行緒中調用，
+    需要更新UI時應由調用者轉交給主線程（例如 root.after）。
+    prefetch_func(*args) 用於預取（只填入快取，不返回結果）
+    """
+
+    def __init__(self, load_func, max_workers=DEFAULT_PREVIEW_WORKERS, prefetch_func=None):
+        self._load_func = load_func
+        self._prefetch_func = prefetch_func
+        self._max_workers = max(1, max_workers)
+        self._max_prefetch = self._max_workers - 1   # 0 時停用預取
+        self._cond = threading.Condition()
+        self._pending = None        # 等待中的請求 (generation, args, callback)
+        self._generation = 0        # 每次提交新請求時遞增
+        self._prefetch_queue = deque()
+        self._prefetch_active = 0   # 正在執行的預取數量
+        self._workers = []
+        self._closed = False
+        self.cancelled_count = 0    # 尚未開始就被取代的請求數量
+
+    def request(self, args, callback):
+        """
+        提交預覽請求（取代所有舊請求）
+
+        Returns:
+            請求的代號，可用 is_current() 判斷是否仍是最新的請求
+        """
+        with self._cond:
+            if self._closed:
+                return None
+            self._generation += 1
+            if self._pending is not None:
+                self.cancelled_count += 1
+            self._pending = (self._generation, tuple(args), callback)
+            self._ensure_workers()
+            self._cond.notify()
+            return self._generation
+
+    def prefetch(self, args_list):
+        """
+        設定預取列表（取代尚未執行的舊預取，按列表順序執行）
+
+        前台請求總是先於預取執行；只有一個執行緒時不做任何事
+        """
+        if self._prefetch_func is None or self._max_prefetch == 0:
+            return
+        with self._cond:
+            if self._closed:
+                return
+            self._prefetch_queue = deque(tuple(args) for args in args_list)
+            if self._prefetch_queue:
+                self._ensure_workers()
+                self._cond.notify()
+
+    def cancel(self):
+        """取消所有請求（等待中的不再執行，進行中的結果會被丟棄）"""
+        with self._cond:
+            self._generation += 1
+            self._prefetch_queue.clear()
+            if self._pending is not None:
+                self.cancelled_count += 1
+                self._pending = None
+
+    def is_current(self, generation):
+        """請求是否仍是最新的"""
+        return generation == self._generation
+
+    def shutdown(self):
+        """停止所有背景執行緒（不等待進行中的解碼）"""
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._prefetch_queue.clear()
+            self._generation += 1
+            self._cond.notify_all()
+
+    def _ensure_workers(self):
+        """按需啟動背景執行緒（需持有鎖）"""
+        if len(self._workers) < self._max_workers:
+            worker = threading.Thread(target=self._worker_loop, name="PreviewLoader", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _can_prefetch(self):
+        return bool(self._prefetch_queue) and self._prefetch_active < self._max_prefetch
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._can_prefetch() and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if self._pending is not None:
+                    request = self._pending
+                    self._pending = None
+                else:
+                    request = None
+                    args = self._prefetch_queue.popleft()
+                    self._prefetch_active += 1
+
+            if request is None:
+                self._run_prefetch(args)
+                continue
+
+            generation, args, callback = request
+            try:
+                result, error = self._load_func(*args), None
+            except Exception as e:
+                result, error = None, str(e)
+
+            if self.is_current(generation):
+                callback(result, error)
+
+    def _run_prefetch(self, args):
+        try:
+            self._prefetch_func(*args)
+        except Exception:
+            # 預取失敗不影響前台，真正預覽時會再報告錯誤
+            pass
+        finally:
+            with self._cond:
+                self._prefetch_active -= 1
+                if self._can_prefetch():
+                    self._cond.notify()
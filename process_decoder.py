@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+多處理程序縮圖解碼 - 超大圖片在子處理程序中解碼，避免與 Tk 事件處理爭奪 GIL
+
+- 只有像素數達到門檻的圖片才交給子處理程序，小圖在執行緒中解碼更快
+- 結果經由共享記憶體傳回（不經過 pickle）：主處理程序預先分配區塊並重用，
+  子處理程序把像素寫入區塊，只返回模式、尺寸和長度
+- 子處理程序使用 spawn 啟動，Windows 打包成 EXE 時需要在入口調用 multiprocessing.freeze_support()
+"""
+
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
+
+from image_decoder import decode_thumbnail
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+# 預設門檻：像素數達到此值（約2400萬像素）的圖片才在子處理程序中解碼，0 表示停用
+DEFAULT_PROCESS_MIN_PIXELS = 24_000_000
+# 預設的子處理程序數量
+DEFAULT_PROCESS_WORKERS = 2
+# 縮圖每個像素最多佔用的位元組數（RGBA）
+MAX_BYTES_PER_PIXEL = 4
+
+
+def image_pixel_count(file_path):
+    """讀取圖片標頭獲取像素數（不解碼像素），無法讀取時返回 0"""
+    try:
+        with Image.open(file_path) as image:
+            width, height = image.size
+    except Exception:
+        return 0
+    return width * height
+
+
+def _attach_block(block_name):
+    """
+    子處理程序連接主處理程序的共享記憶體區塊（不交給子處理程序的資源追蹤器管理）
+
+    區塊由主處理程序建立和刪除；Python 3.13 以前連接時也會登記到資源追蹤器，子處理程序使用
+    自己的追蹤器時會誤報洩漏並提前刪除仍在使用的區塊。連接後再取消登記也不行：與主處理程序
+    共用追蹤器時會連主處理程序的登記一起移除，因此連接期間直接跳過登記
+    （子處理程序一次只執行一個解碼，暫時替換模組函數是安全的）
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=block_name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=block_name)
+    finally:
+        resource_tracker.register = register
+
+
+def _decode_into_shared_memory(file_path, max_size, high_quality, block_name):
+    """
+    子處理程序：解碼縮圖並寫入主處理程序分配的共享記憶體區塊
+
+    Returns:
+        (模式, 尺寸, 寫入的位元組數)
+    """
+    image = decode_thumbnail(file_path, max_size, high_quality)
+    data = image.tobytes()
+    block = _attach_block(block_name)
+    try:
+        block.buf[:len(data)] = data
+    finally:
+        block.close()
+    return image.mode, image.size, len(data)
+
+
+class ProcessThumbnailDecoder:
+    """
+    縮圖解碼器（大圖使用子處理程序，執行緒安全）
+
+    decode() 可在任意背景執行緒中調用；子處理程序池在第一次需要時才啟動，
+    子處理程序異常退出時改回在執行緒中解碼
+    """
+
+    def __init__(self, min_pixels=DEFAULT_PROCESS_MIN_PIXELS, max_workers=DEFAULT_PROCESS_WORKERS):
+        self.min_pixels = min_pixels
+        self.max_workers = max(1, max_workers)
+        self._executor = None
+        self._broken = False
+        self._free_blocks = []      # 可重用的共享記憶體區塊
+        self._lock = threading.Lock()
+        self.process_count = 0      # 在子處理程序中解碼的數量
+
+    def use_process(self, file_path):
+        """圖片是否應在子處理程序中解碼"""
+        if not HAS_PIL or self._broken or not self.min_pixels or self.min_pixels <= 0:
+            return False
+        return image_pixel_count(file_path) >= self.min_pixels
+
+    def decode(self, file_path, max_size, high_quality=False):
+        """
+        解碼圖片並縮小到 max_size 以內（與 image_decoder.decode_thumbnail 相同）
+
+        Returns:
+            PIL 圖片
+        """
+        if self.use_process(file_path):
+            try:
+                return self._decode_in_process(file_path, tuple(max_size), high_quality)
+            except BrokenProcessPool:
+                # 子處理程序無法啟動或已崩潰（例如記憶體不足），之後都在執行緒中解碼
+                self._broken = True
+        return decode_thumbnail(file_path, max_size, high_quality)
+
+    def _decode_in_process(self, file_path, max_size, high_quality):
+        nbytes = max_size[0] * max_size[1] * MAX_BYTES_PER_PIXEL
+        block = self._acquire_block(nbytes)
+        try:
+            future = self._get_executor().submit(
+                _decode_into_shared_memory, file_path, max_size, high_quality, block.name)
+            mode, size, length = future.result()
+            # 直接從共享記憶體複製到獨立的圖片中，區塊可以立即重用
+            with block.buf[:length] as view:
+                image = Image.frombytes(mode, size, view)
+        finally:
+            self._release_block(block)
+        self.process_count += 1
+        return image
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _acquire_block(self, nbytes):
+        with self._lock:
+            for i, block in enumerate(self._free_blocks):
+                if block.size >= nbytes:
+                    return self._free_blocks.pop(i)
+        return shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def _release_block(self, block):
+        with self._lock:
+            if len(self._free_blocks) < self.max_workers * 2:
+                self._free_blocks.append(block)
+                return
+        _destroy_block(block)
+
+    def shutdown(self):
+        """停止子處理程序並釋放共享記憶體（不等待進行中的解碼）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            blocks, self._free_blocks = self._free_blocks, []
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for block in blocks:
+            _destroy_block(block)
+
+
+def _destroy_block(block):
+    try:
+        block.close()
+        block.unlink()
+    except (OSError, BufferError):
+        pass
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+重新命名規劃引擎 - 不依賴Tk，根據檔案列表和凍結的規則快照批量生成重新命名計劃
+"""
+
+import os
+from functools import lru_cache
+from collections import namedtuple
+
+from security_utils import (
+    sanitize_filename, validate_file_path, safe_join_path,
+    validate_and_sanitize_new_filename, validate_game_engine_filename
+)
+from filename_validator import (
+    validate_character_filename, generate_character_filename,
+    lookup_character_stem, CHARACTER_STEMS
+)
+from file_metadata import metadata_cache, directory_key
+
+
+# Character規則的有效類型（大小写敏感）
+VALID_CHAR_TYPES = ('Idle', 'Intro', 'Open')
+# 各類型可用的索引範圍
+CHAR_INDEX_RANGES = {'Idle': range(1, 21), 'Intro': range(1, 21), 'Open': range(0, 7)}
+
+# 規則快照：在批次開始時從UI讀取一次，之後不再存取Tk變數
+# 各欄位保持UI中的原始字串（例如索引 "01 - 沒穿"），由引擎負責解析
+RenameRules = namedtuple('RenameRules', [
+    'rule',          # "character" 或 "dream"
+    'char_id',       # 角色編號
+    'char_type',     # Idle / Intro / Open
+    'char_index',    # Idle/Intro 的索引
+    'color',         # Open 的顏色索引
+    'theme',         # 夢想規則主題
+    'role',          # 夢想規則角色類型
+    'dream_index',   # 夢想規則索引
+    'anime_num',     # Anime主題編號
+], defaults=("character", "01", "Idle", "01", "00", "Hospital", "", "01", "01"))
+
+# 計劃中的單個項目
+# status: "ok"（可重新命名）、"conflict"（目標已存在）、"duplicate"（與本批次前面檔案的新檔名相同）、"error"（無法處理）
+RenameEntry = namedtuple('RenameEntry', [
+    'old_path', 'new_path', 'new_name', 'index',
+    'status', 'is_valid', 'error', 'parsed'
+])
+
+
+def _parse_number(raw, default, low, high):
+    """提取字串中的數字部分並限制範圍（失敗時返回預設值）"""
+    try:
+        digits = ''.join(filter(str.isdigit, str(raw)))
+        number = int(digits) if digits else default
+        return max(low, min(high, number))
+    except (ValueError, TypeError):
+        return default
+
+
+class NamingContext:
+    """
+    由規則快照編譯的命名上下文（同一批次的預覽和執行共用，見 compile_rules）
+
+    - 角色編號、類型和索引在建立時解析一次，之後生成檔名不再解析字串
+    - 新檔名只取決於 (角色編號覆寫, 擴展名)；夢想規則另外取決於資料夾（需要檢查完整路徑長度），
+      生成和驗證的結果都按此快取，同一批次中的檔案大多只需一次字典查找
+    - 快取只是記憶結果（重複計算的結果相同），規則本身不可變
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._names = {}        # 快取鍵 -> 新檔名（None 表示只能使用備用名稱）
+        self._char_ids = {}     # 角色編號覆寫的原始值 -> 兩位數字
+        self._validations = {}  # 新檔名 -> (is_valid, error, parsed)
+
+        if rules.rule == "character":
+            # 1. 角色編號：確保為兩位數字（01-99）
+            self.char_id = self._format_char_id(rules.char_id)
+
+            # 2. 類型：確保為 Idle, Intro, Open（大小写敏感）
+            char_type = str(rules.char_type)
+            if char_type not in VALID_CHAR_TYPES:
+                char_type = 'Idle'
+            self.char_type = char_type
+
+            # 3. 索引：Open類型使用顏色索引（00-06），Idle和Intro使用輸入的索引（01-20）
+            if char_type == "Open":
+                self.char_index = f"{_parse_number(rules.color, 0, 0, 6):02d}"
+            else:
+                index_value = str(rules.char_index)
+                # 如果包含" - "，提取前面的數字部分
+                if " - " in index_value:
+                    index_value = index_value.split(" - ")[0]
+                self.char_index = f"{_parse_number(index_value, 1, 1, 20):02d}"
+
+    def _format_char_id(self, raw):
+        char_id = self._char_ids.get(raw)
+        if char_id is None:
+            char_id = self._char_ids[raw] = f"{_parse_number(raw, 1, 1, 99):02d}"
+        return char_id
+
+    def char_id_for(self, char_id_override=None):
+        """檔案實際使用的角色編號（兩位數字）"""
+        return self.char_id if char_id_override is None else self._format_char_id(char_id_override)
+
+    def name_for(self, original_path, index, char_id_override=None, char_index=None):
+        """
+        生成新檔名（完全符合對外格式要求：Character_{角色編號}_{類型}_{索引}.ext）
+
+        Args:
+            original_path: 原始檔案路徑
+            index: 檔案在批次中的位置（用於備用名稱）
+            char_id_override: 此檔案單獨設定的角色編號（None表示使用規則中的編號）
+            char_index: Character規則下指定的索引（由 BatchNamer 分配，None表示使用規則中的索引）
+
+        Returns:
+            新檔名
+        """
+        # 獲取原始檔案的擴展名（保留原始格式，轉為小寫）
+        ext = os.path.splitext(original_path)[1].lower()
+        if self.rules.rule == "character":
+            key = (char_id_override, ext, char_index)
+        else:
+            key = (ext, os.path.dirname(original_path))
+        try:
+            new_name = self._names[key]
+        except KeyError:
+            new_name = self._names[key] = self._compile_name(original_path, ext, char_id_override, char_index)
+        except TypeError:
+            # 無法作為快取鍵的覆寫值，直接生成
+            new_name = self._compile_name(original_path, ext, char_id_override, char_index)
+        if new_name is None:
+            return f"renamed_{index:04d}{ext}"
+        return new_name
+
+    def _compile_name(self, original_path, ext, char_id_override, char_index=None):
+        """生成並驗證新檔名（每個快取鍵只執行一次），失敗時返回 None"""
+        try:
+            if self.rules.rule == "character":
+                # 使用專用的生成函數確保格式完全精確（函數內部已驗證格式）
+                return generate_character_filename(
+                    char_id=self.char_id_for(char_id_override),
+                    char_type=self.char_type,
+                    char_index=char_index if char_index is not None else self.char_index,
+                    ext=ext
+                )
+
+            # 夢想規則
+            rules = self.rules
+            if rules.theme == "Anime":
+                # 確保格式精確：A_XX.ext
+                new_name = f"A_{str(rules.anime_num).zfill(2)}{ext}"
+            else:
+                # 確保格式精確：Role_XX.ext
+                new_name = f"{rules.role}_{str(rules.dream_index).zfill(2)}{ext}"
+
+            # 使用遊戲引擎模式驗證和清理檔案名
+            sanitized_name, error = validate_and_sanitize_new_filename(
+                original_path, new_name, game_engine_mode=True
+            )
+
+            if error:
+                # 如果清理失敗，使用安全的備用名稱
+                safe_name = sanitize_filename(new_name, game_engine_mode=True)
+                if safe_name and safe_name != "unnamed":
+                    return safe_name
+                return None
+
+            # 最終驗證：確保文件名完全符合遊戲引擎標準
+            is_valid, validation_error = validate_game_engine_filename(sanitized_name)
+            if not is_valid:
+                return None
+
+            return sanitized_name
+        except Exception:
+            # 如果生成失敗，使用安全的備用名稱
+            return None
+
+    def validate(self, new_name):
+        """
+        按規則驗證新檔名（結果按檔名快取）
+
+        Returns:
+            (is_valid, error_message, parsed_data)
+            parsed_data 只在Character規則下提供
+        """
+        result = self._validations.get(new_name)
+        if result is None:
+            if self.rules.rule == "character":
+                result = validate_character_filename(new_name)
+            else:
+                is_valid, error = validate_game_engine_filename(new_name)
+                result = (is_valid, error, None)
+            self._validations[new_name] = result
+        return result
+
+
+@lru_cache(maxsize=32)
+def compile_rules(rules):
+    """
+    編譯規則快照（相同的快照返回同一個 NamingContext，預覽和執行重新命名共用快取）
+    """
+    return NamingContext(rules)
+
+
+def generate_filename(rules, original_path, index, char_id_override=None):
+    """
+    根據規則快照生成新檔名（完全符合對外格式要求：Character_{角色編號}_{類型}_{索引}.ext）
+
+    Args:
+        rules: RenameRules 規則快照
+        original_path: 原始檔案路徑
+        index: 檔案在批次中的位置（用於備用名稱）
+        char_id_override: 此檔案單獨設定的角色編號（None表示使用規則中的編號）
+
+    Returns:
+        新檔名
+    """
+    return compile_rules(rules).name_for(original_path, index, char_id_override)
+
+
+def validate_new_filename(rules, new_name):
+    """
+    按規則驗證新檔名
+
+    Returns:
+        (is_valid, error_message, parsed_data)
+        parsed_data 只在Character規則下提供
+    """
+    return compile_rules(rules).validate(new_name)
+
+
+class BatchNamer:
+    """
+    為一批檔案生成新檔名（預覽和執行重新命名共用）
+
+    Character規則下，同一資料夾中相同 (角色編號, 類型) 的檔案分配不同的索引，避免整批檔案得到同一個名稱：
+    - 從規則中選擇的索引開始依次分配，到範圍末尾後從範圍開頭繼續（Idle/Intro 01-20，Open 00-06）
+    - 資料夾中已存在的同名主體（任何擴展名）視為已佔用；資料夾的檔名由 existing_names(資料夾) 提供
+      （預設為中繼資料快取，每個資料夾只 scandir 一次），不必逐個檔案探測
+    - 檔案本身已經是符合的名稱時保留原索引
+    - 按檔案順序分配並記住結果，只查詢前面的檔案時不必處理整批
+    其他規則直接使用 NamingContext 生成
+    """
+
+    def __init__(self, context, files, char_id_overrides=None, existing_names=None):
+        self.context = context
+        self.files = files
+        self.overrides = char_id_overrides or {}
+        self._existing_names = existing_names or metadata_cache.directory_names
+        self._allocate = context.rules.rule == "character"
+        self._indices = []          # 位置 -> 分配的索引（None 表示索引已用完）
+        self._dir_stems = {}        # 資料夾鍵 -> 已存在的檔名主體（normcase 後）
+        self._groups = {}           # (資料夾鍵, 角色編號) -> [已分配的索引集合, 下一個候選位置]
+        if self._allocate:
+            index_range = CHAR_INDEX_RANGES[context.char_type]
+            start = int(context.char_index)
+            # 候選順序：從選擇的索引到範圍末尾，再從範圍開頭繼續
+            self._candidates = [f"{i:02d}" for i in index_range if i >= start] + \
+                               [f"{i:02d}" for i in index_range if i < start]
+
+    def name_for(self, position, original_path=None):
+        """
+        第 position 個檔案的新檔名
+
+        Args:
+            position: 檔案在批次中的位置
+            original_path: 檔案路徑（不是批次中該位置的檔案時不分配索引，例如預覽批次外的檔案）
+
+        Returns:
+            (新檔名, 錯誤訊息)，索引已用完時新檔名為 None
+        """
+        if original_path is None:
+            original_path = self.files[position]
+        override = self.overrides.get(original_path)
+        if not self._allocate or position >= len(self.files) or self.files[position] != original_path:
+            return self.context.name_for(original_path, position, override), None
+        while len(self._indices) <= position:
+            self._indices.append(self._allocate_next(len(self._indices)))
+        char_index = self._indices[position]
+        if char_index is None:
+            context = self.context
+            return None, (f"角色 {context.char_id_for(override)} 的 {context.char_type} 索引已用完"
+                          f"（{self._candidates[0] if self._candidates else ''} 起共 {len(self._candidates)} 個）")
+        return self.context.name_for(original_path, position, override, char_index), None
+
+    def _stems_in(self, dir_path):
+        stems = self._dir_stems.get(dir_path)
+        if stems is None:
+            stems = self._dir_stems[dir_path] = {
+                name.partition('.')[0] for name in self._existing_names(dir_path)}
+        return stems
+
+    def _allocate_next(self, position):
+        """為第 position 個檔案分配索引"""
+        file_path = self.files[position]
+        context = self.context
+        char_id = context.char_id_for(self.overrides.get(file_path))
+        dir_path, file_name = os.path.split(file_path)
+        # 同一資料夾的不同寫法（分隔符、大小寫、"."）必須歸入同一組，並與衝突檢查使用的目錄一致
+        dir_path = directory_key(dir_path)
+        group = self._groups.get((dir_path, char_id))
+        if group is None:
+            group = self._groups[(dir_path, char_id)] = [set(), 0]
+        assigned = group[0]
+
+        # 已經是符合的名稱：保留原索引
+        current = lookup_character_stem(file_name.partition('.')[0])
+        if current is not None and current.char_id == char_id and current.char_type == context.char_type \
+                and current.char_index not in assigned and current.char_index in self._candidates:
+            assigned.add(current.char_index)
+            return current.char_index
+
+        stems = self._stems_in(dir_path)
+        candidates = self._candidates
+        while group[1] < len(candidates):
+            char_index = candidates[group[1]]
+            group[1] += 1
+            stem = CHARACTER_STEMS[(char_id, context.char_type, char_index)]
+            if char_index not in assigned and os.path.normcase(stem) not in stems:
+                assigned.add(char_index)
+                return char_index
+        return None
+
+
+def check_source_file(file_path):
+    """
+    檢查原始檔案是否可以重新命名（使用中繼資料快取）
+
+    Returns:
+        (is_valid, error_message)
+    """
+    is_valid, error = validate_file_path(file_path)
+    if not is_valid:
+        return False, error
+    metadata = metadata_cache.get(file_path)
+    if metadata is None:
+        return False, "檔案不存在"
+    if not metadata.is_file:
+        return False, "不是檔案"
+    return True, None
+
+
+class RenamePlan:
+    """重新命名計劃（由 build_rename_plan 產生）"""
+
+    def __init__(self, context, entries):
+        self.context = context
+        self.rules = context.rules
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def _with_status(self, status):
+        return [entry for entry in self.entries if entry.status == status]
+
+    @property
+    def renames(self):
+        """可以直接重新命名的項目"""
+        return self._with_status("ok")
+
+    @property
+    def conflicts(self):
+        """目標檔案已存在的項目（可以選擇覆蓋）"""
+        return self._with_status("conflict")
+
+    @property
+    def duplicates(self):
+        """新檔名與本批次前面檔案相同的項目（只能跳過，覆蓋會刪除剛重新命名的檔案）"""
+        return self._with_status("duplicate")
+
+    @property
+    def errors(self):
+        """無法處理的項目"""
+        return self._with_status("error")
+
+    @property
+    def validation_errors(self):
+        """新檔名未通過格式驗證的項目"""
+        return [entry for entry in self.entries if entry.status != "error" and not entry.is_valid]
+
+
+def build_rename_plan(files, rules, char_id_overrides=None, check_files=False, namer=None):
+    """
+    批量生成重新命名計劃（不存取任何UI狀態）
+
+    Args:
+        files: 要處理的檔案路徑列表（順序即命名順序）
+        rules: RenameRules 規則快照（或已編譯的 NamingContext）
+        char_id_overrides: {檔案路徑: 角色編號}，單獨設定角色編號的檔案
+        check_files: 是否檢查原始檔案（執行重新命名前使用；目標衝突總是檢查）
+        namer: 已建立的 BatchNamer（預覽時重用已分配的索引），None 時建立新的
+
+    Returns:
+        RenamePlan
+    """
+    context = rules if isinstance(rules, NamingContext) else compile_rules(rules)
+    if namer is None:
+        namer = BatchNamer(context, files, char_id_overrides)
+    entries = []
+    claimed = set()     # 本批次已使用的目標路徑（normcase 後）
+
+    for i, file_path in enumerate(files):
+        try:
+            if check_files:
+                is_valid, error = check_source_file(file_path)
+                if not is_valid:
+                    entries.append(RenameEntry(file_path, None, None, i, "error", False, error, None))
+                    continue
+
+            new_name, error = namer.name_for(i, file_path)
+            if new_name is None:
+                entries.append(RenameEntry(file_path, None, None, i, "error", False, error, None))
+                continue
+            new_path = safe_join_path(os.path.dirname(file_path), new_name)
+            is_valid, error, parsed = context.validate(new_name)
+
+            # 與本批次前面檔案的新路徑相同為重名；目標名稱已存在於資料夾中為衝突
+            # （每個資料夾 scandir 一次後只查詢集合）
+            status = "ok"
+            target = os.path.normcase(new_path)
+            if target != os.path.normcase(os.path.abspath(file_path)):
+                if target in claimed:
+                    status = "duplicate"
+                elif metadata_cache.name_exists(new_path):
+                    status = "conflict"
+            claimed.add(target)
+
+            entries.append(RenameEntry(file_path, new_path, new_name, i, status, is_valid, error, parsed))
+        except Exception as e:
+            entries.append(RenameEntry(file_path, None, None, i, "error", False, str(e), None))
+
+    return RenamePlan(context, entries)
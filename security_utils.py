@@ -7,6 +7,8 @@ import os
 import re
 from pathlib import Path
 
+from filename_validator import ValidationBatch
+
 
 # Windows不允許的檔案名字符
 INVALID_FILENAME_CHARS = r'[<>:"/\\|?*\x00-\x1f]'
@@ -26,6 +28,34 @@ MAX_FILENAME_LENGTH = 255
 GAME_ENGINE_FILENAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
 # 遊戲引擎通常不允許空格
 GAME_ENGINE_INVALID_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+# 遊戲引擎文件名允許的字符
+_GAME_ENGINE_NAME_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-'
+# 連續的下劃線和連字符
+_SEPARATOR_RUNS = re.compile(r'[_-]+')
+
+
+class _ReplaceOthersTable(dict):
+    """str.translate 的轉換表：未列出的字符都替換為 replacement（第一次遇到時加入表中）"""
+
+    def __init__(self, keep, replacement):
+        super().__init__((ord(ch), ch) for ch in keep)
+        self.replacement = replacement
+
+    def __missing__(self, code):
+        self[code] = self.replacement
+        return self.replacement
+
+
+# str.translate 的轉換表（代替每次調用 re.sub / re.findall）
+# 標準模式：刪除路徑分隔符，Windows不允許的字符替換為下劃線
+_STANDARD_TRANSLATION = str.maketrans(
+    {'/': None, '\\': None, **{ch: '_' for ch in '<>:"|?*'}, **{chr(i): '_' for i in range(0x20)}}
+)
+# 遊戲引擎模式：字母、數字、下劃線、點、連字符以外的字符替換為下劃線
+_GAME_ENGINE_TRANSLATION = _ReplaceOthersTable(_GAME_ENGINE_NAME_CHARS + '.', '_')
+# 驗證用：刪除允許的字符，剩下的就是非法字符
+_GAME_ENGINE_ALLOWED_DELETION = str.maketrans('', '', _GAME_ENGINE_NAME_CHARS)
 # 遊戲引擎文件名長度限制（通常較短，這裡設為128字符）
 GAME_ENGINE_MAX_FILENAME_LENGTH = 128
 
@@ -50,18 +80,16 @@ def sanitize_filename(filename, game_engine_mode=False):
     if game_engine_mode:
         # 遊戲引擎模式：只允許字母、數字、下劃線、連字符
         # 移除所有非字母數字字符（除了下劃線和連字符）
-        name_part = re.sub(GAME_ENGINE_INVALID_CHARS, '_', name_part)
+        name_part = name_part.translate(_GAME_ENGINE_TRANSLATION)
         # 移除連續的下劃線和連字符
-        name_part = re.sub(r'[_-]+', '_', name_part)
+        name_part = _SEPARATOR_RUNS.sub('_', name_part)
         # 移除前導和尾隨的下劃線、連字符
         name_part = name_part.strip('_-')
         # 確保擴展名小寫（遊戲引擎通常要求）
         ext_part = ext_part.lower()
     else:
-        # 標準模式：移除路徑分隔符（防止路徑遍歷）
-        name_part = name_part.replace('/', '').replace('\\', '')
-        # 移除Windows不允許的字符
-        name_part = re.sub(INVALID_FILENAME_CHARS, '_', name_part)
+        # 標準模式：移除路徑分隔符（防止路徑遍歷），Windows不允許的字符替換為下劃線
+        name_part = name_part.translate(_STANDARD_TRANSLATION)
         # 移除前導和尾隨空格、點
         name_part = name_part.strip(' .')
     
@@ -102,10 +130,9 @@ def validate_game_engine_filename(filename):
     
     # 檢查是否符合遊戲引擎模式（只允許字母、數字、下劃線、連字符）
     # 注意：點號在文件名部分不允許（只在擴展名中允許）
-    if re.search(r'[^A-Za-z0-9_-]', name_part):
-        invalid_chars = set(re.findall(r'[^A-Za-z0-9_-]', name_part))
-        if invalid_chars:
-            return False, f"檔案名包含非法字符: {', '.join(sorted(invalid_chars))}"
+    invalid_chars = name_part.translate(_GAME_ENGINE_ALLOWED_DELETION)
+    if invalid_chars:
+        return False, f"檔案名包含非法字符: {', '.join(sorted(set(invalid_chars)))}"
     
     # 檢查文件名長度
     if len(name_part) > GAME_ENGINE_MAX_FILENAME_LENGTH:
@@ -127,6 +154,45 @@ def validate_game_engine_filename(filename):
     return True, None
 
 
+def validate_game_engine_filenames(filenames):
+    """
+    批量驗證文件名是否符合遊戲引擎標準
+
+    Args:
+        filenames: 檔案名的可迭代對象（可以是生成器）
+
+    Returns:
+        ValidationBatch，逐個產生 (filename, is_valid, error_message)，
+        summary() 返回 {'total', 'valid', 'invalid'}
+    """
+    validate = validate_game_engine_filename
+
+    def check(filename):
+        is_valid, error = validate(filename)
+        return (filename, is_valid, error), is_valid
+
+    return ValidationBatch(filenames, check)
+
+
+def sanitize_filenames(filenames, game_engine_mode=False):
+    """
+    批量清理檔案名
+
+    Args:
+        filenames: 檔案名的可迭代對象（可以是生成器）
+        game_engine_mode: 是否使用遊戲引擎模式（更嚴格）
+
+    Returns:
+        ValidationBatch，逐個產生 (原檔案名, 清理後的檔案名)，
+        summary() 返回 {'total', 'unchanged', 'changed'}
+    """
+    def check(filename):
+        sanitized = sanitize_filename(filename, game_engine_mode)
+        return (filename, sanitized), sanitized == filename
+
+    return ValidationBatch(filenames, check, labels=('unchanged', 'changed'))
+
+
 def validate_file_path(file_path):
     """
     驗證檔案路徑是否安全
@@ -256,13 +322,15 @@ def validate_and_sanitize_new_filename(original_path, new_name, game_engine_mode
     return sanitized, None
 
 
-def safe_rename(old_path, new_path):
+def safe_rename(old_path, new_path, metadata=None):
     """
     安全地重命名檔案，包含完整的驗證和錯誤處理
     
     Args:
         old_path: 原始檔案路徑
         new_path: 新檔案路徑
+        metadata: 檔案中繼資料快取（可選）；傳入時存在檢查使用快取，
+            並在刪除、重命名後更新快取，否則直接查詢檔案系統
         
     Returns:
         (success, error_message)
@@ -279,11 +347,18 @@ def safe_rename(old_path, new_path):
             return False, f"新路徑無效: {error}"
         
         # 檢查原始檔案是否存在
-        if not os.path.exists(old_path):
+        if metadata is not None:
+            old_metadata = metadata.get(old_path)
+            old_exists = old_metadata is not None
+            old_is_file = old_exists and old_metadata.is_file
+        else:
+            old_exists = os.path.exists(old_path)
+            old_is_file = os.path.isfile(old_path)
+        if not old_exists:
             return False, "原始檔案不存在"
         
         # 檢查原始檔案是否為檔案（不是目錄）
-        if not os.path.isfile(old_path):
+        if not old_is_file:
             return False, "原始路徑不是檔案"
         
         # 檢查新路徑是否已存在（且不是同一個檔案）
@@ -295,28 +370,45 @@ def safe_rename(old_path, new_path):
             # 如果新舊路徑相同，不需要重命名
             return True, None
         
-        if os.path.exists(new_path):
+        # 只改變大小寫時（不區分大小寫的系統上）目標就是原始檔案本身，不能刪除；
+        # 使用快取時先查詢目錄檔名集合（每個目錄只 scandir 一次），只有同名時才 stat 目標
+        new_exists = new_is_file = False
+        if os.path.normcase(old_abs) != os.path.normcase(new_abs):
+            if metadata is not None:
+                new_metadata = metadata.get(new_path) if metadata.name_exists(new_path) else None
+                new_exists = new_metadata is not None
+                new_is_file = new_exists and new_metadata.is_file
+            else:
+                new_exists = os.path.exists(new_path)
+                new_is_file = os.path.isfile(new_path)
+        if new_exists:
             # 目標文件已存在，需要先刪除（原子操作）
             try:
                 # 驗證目標文件是文件（不是目錄）
-                if not os.path.isfile(new_path):
+                if not new_is_file:
                     return False, "目標路徑是目錄，不是檔案"
                 # 刪除現有文件
                 os.remove(new_path)
+                if metadata is not None:
+                    metadata.record_removal(new_path)
             except OSError as e:
+                if metadata is not None:
+                    metadata.invalidate(new_path)
                 return False, f"無法刪除現有目標檔案: {str(e)}"
         
-        # 執行重命名（原子操作）
+        # 執行重命名（原子操作，失敗時會拋出異常，因此不需要再次檢查目標是否存在）
         try:
             os.rename(old_path, new_path)
         except OSError as e:
+            if metadata is not None:
+                # 快取可能已過期（例如檔案被外部程式移動），讓下次存取重新讀取
+                metadata.invalidate(old_path)
+                metadata.invalidate(new_path)
             # 如果重命名失敗，返回錯誤（不嘗試恢復，因為可能已經刪除目標文件）
             return False, f"重命名失敗: {str(e)}"
         
-        # 驗證重命名成功
-        if not os.path.exists(new_path):
-            return False, "重命名後檔案不存在"
-        
+        if metadata is not None:
+            metadata.record_rename(old_path, new_path)
         return True, None
     except PermissionError:
         return False, "權限不足，無法重命名檔案"
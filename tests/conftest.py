@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""測試設定：專案模組位於根目錄（扁平結構），加入匯入路徑"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
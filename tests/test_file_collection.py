@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""file_collection：每次修改後位置索引都與列表一致"""
+
+import pytest
+
+from file_collection import FileCollection
+
+
+def _assert_consistent(collection):
+    items = collection.to_list()
+    assert len(set(items)) == len(items)
+    for pos, path in enumerate(items):
+        assert collection.index(path) == pos
+    assert len(collection._positions) == len(items)
+
+
+def _collection(count):
+    return FileCollection([f"f{i}" for i in range(count)])
+
+
+@pytest.mark.parametrize("src, dst", [(0, 5), (5, 0), (3, 3), (9, 2), (2, 9)])
+def test_move_keeps_positions(src, dst):
+    collection = _collection(10)
+    expected = collection.to_list()
+    expected.insert(dst, expected.pop(src))
+    collection.move(src, dst)
+    assert collection.to_list() == expected
+    _assert_consistent(collection)
+
+
+@pytest.mark.parametrize("indices", [[0], [9], [2, 5, 7], [5, 2, 2, 99, -1], list(range(10))])
+def test_remove_indices_keeps_positions(indices):
+    collection = _collection(10)
+    valid = {i for i in indices if 0 <= i < 10}
+    expected_removed = [f"f{i}" for i in sorted(valid)]
+    assert collection.remove_indices(indices) == expected_removed
+    assert collection.to_list() == [f"f{i}" for i in range(10) if i not in valid]
+    _assert_consistent(collection)
+
+
+def test_mixed_operations_keep_positions():
+    collection = _collection(6)
+    collection.swap(0, 5)
+    collection.move(1, 4)
+    assert collection.replace("f3", "g3")
+    assert not collection.replace("f3", "h3")
+    collection.remove("f0")
+    collection.extend(["f1", "n1", "n2"])
+    _assert_consistent(collection)
+    with pytest.raises(ValueError):
+        collection.index("f0")
+
+
+def test_listeners_and_version_follow_changes():
+    events = []
+
+    class Listener:
+        def on_added(self, paths):
+            events.append(("added", paths))
+
+        def on_removed(self, paths):
+            events.append(("removed", paths))
+
+        def on_replaced(self, old_path, new_path):
+            events.append(("replaced", old_path, new_path))
+
+        def on_reordered(self):
+            events.append(("reordered",))
+
+        def on_cleared(self):
+            events.append(("cleared",))
+
+    collection = _collection(3)
+    version = collection.version
+    collection.add_listener(Listener())
+    collection.move(0, 2)
+    collection.remove_indices([1])
+    collection.clear()
+    assert events == [("added", ["f0", "f1", "f2"]), ("reordered",), ("removed", ["f2"]), ("cleared",)]
+    assert collection.version == version + 3
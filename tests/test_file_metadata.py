@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""file_metadata：按目錄的檔名集合在不同寫法的路徑之間共用，重新命名後保持正確"""
+
+import os
+
+from file_metadata import FileMetadataCache, directory_key
+
+
+def _touch(path):
+    open(path, 'wb').close()
+    return path
+
+
+def test_directory_key_merges_spellings(tmp_path):
+    base = str(tmp_path)
+    assert directory_key(base + "/.") == directory_key(base + "//") == directory_key(base)
+
+
+def test_rename_through_mixed_spellings_updates_one_name_set(tmp_path):
+    base = str(tmp_path)
+    old_path = _touch(base + "/./a.png")        # 例如檔案對話框返回的寫法
+    _touch(os.path.join(base, "b.png"))
+    cache = FileMetadataCache()
+    assert cache.name_exists(old_path)
+    assert cache.directory_names(base) is cache.directory_names(base + "/.")
+
+    new_path = os.path.normpath(os.path.join(base, "c.png"))    # safe_join_path 產生的寫法
+    os.rename(old_path, new_path)
+    cache.record_rename(old_path, new_path)
+
+    assert sorted(cache.directory_names(base + "//")) == ["b.png", "c.png"]
+    assert not cache.name_exists(os.path.join(base, "a.png"))
+    assert cache.name_exists(base + "/./c.png")
+    # 自己的重新命名不算外部變更；外部新增的檔案則會讓集合重新掃描
+    assert cache.check_directories() == set()
+    _touch(os.path.join(base, "d.png"))
+    os.utime(base, (0, 0))
+    assert cache.check_directories() == {directory_key(base)}
+    assert cache.name_exists(base + "/./d.png")
+
+
+def test_invalidate_drops_the_shared_name_set(tmp_path):
+    base = str(tmp_path)
+    cache = FileMetadataCache()
+    cache.directory_names(base)
+    _touch(os.path.join(base, "late.png"))
+    cache.invalidate(base + "/./late.png")
+    assert cache.name_exists(os.path.join(base, "late.png"))
+
+
+def test_refresh_reports_in_place_edits_missed_by_check_directories(tmp_path):
+    path = _touch(os.path.join(str(tmp_path), "a.png"))
+    cache = FileMetadataCache()
+    assert cache.size(path) == 0
+    with open(path, 'wb') as f:
+        f.write(b'x' * 5)
+    assert cache.check_directories() == set()
+    assert cache.size(path) == 0
+    assert cache.refresh([path]) == [path]
+    assert cache.size(path) == 5
+    assert cache.refresh([path]) == []
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""file_search：各搜尋模式的匹配器和縮小搜尋的快取"""
+
+import time
+
+import pytest
+
+from file_collection import FileCollection
+from file_search import (
+    compile_matcher, FileSearchIndex, MODE_SUBSTRING, MODE_GLOB, MODE_REGEX, MODE_FUZZY
+)
+
+
+def _matches(query, mode, key):
+    matcher, error = compile_matcher(query, mode)
+    assert error is None
+    return bool(matcher(key))
+
+
+@pytest.mark.parametrize("query, key, expected", [
+    ("IDLE", "character_01_idle_01.png", True),
+    ("intro", "character_01_idle_01.png", False),
+])
+def test_substring(query, key, expected):
+    assert _matches(query, MODE_SUBSTRING, key) is expected
+
+
+@pytest.mark.parametrize("query, key, expected", [
+    ("*.PNG", "photo.png", True),
+    ("img_00??.jpg", "img_0012.jpg", True),
+    ("img_00??.jpg", "img_00123.jpg", False),
+    ("hoto", "photo.png", True),    # 不含萬用字元時當作包含搜尋
+])
+def test_glob(query, key, expected):
+    assert _matches(query, MODE_GLOB, key) is expected
+
+
+@pytest.mark.parametrize("query, key, expected", [
+    (r"^\D+\.png$", "photo.png", True),
+    (r"\Bhoto", "photo.png", True),
+    (r"\S+_\d+", "idle_01.png", True),
+    (r"^\W", "photo.png", False),
+    (r"PHOTO", "photo.png", True),
+])
+def test_regex_keeps_escape_case(query, key, expected):
+    assert _matches(query, MODE_REGEX, key) is expected
+
+
+def test_invalid_regex_reports_error():
+    matcher, error = compile_matcher("(", MODE_REGEX)
+    assert matcher is None
+    assert "正規表示式無效" in error
+
+
+@pytest.mark.parametrize("query, key, expected", [
+    ("i01p", "idle_01.png", True),
+    ("I01P", "idle_01.png", True),
+    ("p01i", "idle_01.png", False),
+    ("aa", "a", False),
+])
+def test_fuzzy(query, key, expected):
+    assert _matches(query, MODE_FUZZY, key) is expected
+
+
+def test_fuzzy_is_linear_on_pathological_input():
+    matcher = compile_matcher("0000000z", MODE_FUZZY)[0]
+    start = time.perf_counter()
+    assert not matcher("0" * 60)
+    assert time.perf_counter() - start < 0.1
+
+
+def test_unknown_mode():
+    matcher, error = compile_matcher("x", "nope")
+    assert matcher is None and error
+
+
+def test_index_narrowing_and_updates():
+    collection = FileCollection(["/d/Idle_01.png", "/d/Intro_02.jpg", "/d/idle_03.mp4"])
+    index = FileSearchIndex(collection)
+    assert index.search("i", MODE_SUBSTRING)[0] == collection.to_list()
+    assert index.search("idle", MODE_SUBSTRING)[0] == ["/d/Idle_01.png", "/d/idle_03.mp4"]
+    collection.append("/d/IDLE_04.png")
+    assert index.search("idle_", MODE_SUBSTRING)[0] == [
+        "/d/Idle_01.png", "/d/idle_03.mp4", "/d/IDLE_04.png"]
+    collection.remove("/d/Idle_01.png")
+    assert index.search("idle", MODE_SUBSTRING)[0] == ["/d/idle_03.mp4", "/d/IDLE_04.png"]
+    assert index.search(r"^\D+_0[34]", MODE_REGEX)[0] == ["/d/idle_03.mp4", "/d/IDLE_04.png"]
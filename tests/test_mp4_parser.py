@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""mp4_parser：解析最小的 MP4 結構，以及被截斷或損壞的輸入"""
+
+import struct
+
+import pytest
+
+import mp4_parser
+from mp4_parser import parse_mp4, read_cover, Mp4MetadataCache, describe_mp4, format_duration
+
+
+def _box(box_type, payload=b''):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type, payload):
+    return _box(box_type, b'\0\0\0\0' + payload)
+
+
+def _sample_mp4(cover=b'\x89PNG-cover'):
+    # mvhd v0：建立/修改時間(8) + timescale + duration
+    mvhd = _full_box(b'mvhd', struct.pack('>IIII', 0, 0, 1000, 83500) + b'\0' * 80)
+    # tkhd：最後 8 個位元組是 16.16 定點數的寬高
+    tkhd = _full_box(b'tkhd', b'\0' * 72 + struct.pack('>II', 1920 << 16, 1080 << 16))
+    hdlr = _full_box(b'hdlr', b'\0\0\0\0' + b'vide' + b'\0' * 12)
+    stsd = _full_box(b'stsd', struct.pack('>I', 1) + _box(b'avc1', b'\0' * 8))
+    trak = _box(b'trak', tkhd + _box(b'mdia', hdlr + _box(b'minf', _box(b'stbl', stsd))))
+    data = _box(b'data', struct.pack('>II', 14, 0) + cover)
+    udta = _box(b'udta', _full_box(b'meta', _box(b'ilst', _box(b'covr', data))))
+    moov = _box(b'moov', mvhd + trak + udta)
+    return _box(b'ftyp', b'isom\0\0\0\0') + moov + _box(b'mdat', b'\0' * 64)
+
+
+def test_parse_sample(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(_sample_mp4())
+    info = parse_mp4(str(path))
+    assert info.duration == pytest.approx(83.5)
+    assert (info.width, info.height, info.video_codec) == (1920, 1080, 'avc1')
+    assert read_cover(str(path), info) == b'\x89PNG-cover'
+    assert describe_mp4(info) == "1920x1080 | 01:24 | avc1"
+    assert format_duration(3725) == "1:02:05"
+
+
+def test_every_truncation_raises_value_error_or_parses(tmp_path):
+    """任何長度的截斷都只能拋出 ValueError 或返回有效結果，快取則返回 None 或相同的結果"""
+    sample = _sample_mp4()
+    path = tmp_path / "cut.mp4"
+    for length in range(len(sample)):
+        path.write_bytes(sample[:length])
+        try:
+            info = parse_mp4(str(path))
+        except ValueError:
+            info = None
+        else:
+            assert isinstance(info, mp4_parser.Mp4Info)
+            assert info.duration >= 0
+            if info.cover is not None:
+                offset, size = info.cover
+                assert offset + size <= length
+        assert Mp4MetadataCache().get(str(path)) == info
+
+
+def test_truncated_mvhd_raises_value_error(tmp_path):
+    path = tmp_path / "bad.mp4"
+    path.write_bytes(_box(b'ftyp', b'isom') + _box(b'moov', _box(b'mvhd')))
+    with pytest.raises(ValueError):
+        parse_mp4(str(path))
+    assert Mp4MetadataCache().get(str(path)) is None
+
+
+def test_not_an_mp4(tmp_path):
+    path = tmp_path / "text.mp4"
+    path.write_bytes(b'hello world, not a video')
+    assert Mp4MetadataCache().get(str(path)) is None
+    with pytest.raises(ValueError):
+        parse_mp4(str(path))
+
+
+def test_cache_peek_does_not_parse(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(_sample_mp4())
+    cache = Mp4MetadataCache()
+    assert cache.peek(str(path)) == (False, None)
+    info = cache.get(str(path))
+    assert cache.peek(str(path)) == (True, info)
+    assert cache.peek(str(tmp_path / "missing.mp4")) == (True, None)
+
+
+def test_cache_holds_cover_position_and_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(mp4_parser, 'MAX_CACHED_ENTRIES', 4)
+    cache = Mp4MetadataCache()
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"clip{i}.mp4"
+        path.write_bytes(_sample_mp4(cover=bytes([i]) * 100))
+        paths.append(str(path))
+        info = cache.get(str(path))
+        assert isinstance(info.cover, tuple)
+        assert read_cover(str(path), info) == bytes([i]) * 100
+    assert len(cache._entries) <= 4
+    assert cache.peek(paths[0]) == (False, None)
+    assert cache.peek(paths[-1])[0]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""preview_loader：預取永遠不佔用前台請求需要的最後一個執行緒"""
+
+import threading
+
+from preview_loader import PreviewLoader
+
+
+def test_single_worker_never_prefetches():
+    prefetched = []
+    done = threading.Event()
+    loader = PreviewLoader(lambda path: path.upper(), max_workers=1, prefetch_func=prefetched.append)
+    try:
+        loader.prefetch([("a",), ("b",)])
+        results = []
+        loader.request(("c",), lambda result, error: (results.append((result, error)), done.set()))
+        assert done.wait(5)
+        assert results == [("C", None)]
+        assert prefetched == []
+    finally:
+        loader.shutdown()
+
+
+def test_foreground_request_runs_while_prefetch_blocks():
+    release = threading.Event()
+    started = threading.Event()
+    done = threading.Event()
+
+    def slow_prefetch(path):
+        started.set()
+        release.wait(5)
+
+    loader = PreviewLoader(lambda path: path, max_workers=2, prefetch_func=slow_prefetch)
+    try:
+        loader.prefetch([("a",), ("b",)])
+        assert started.wait(5)
+        loader.request(("c",), lambda result, error: done.set())
+        # 唯一的預取執行緒被阻塞時，前台請求仍由保留的執行緒完成
+        assert done.wait(5)
+    finally:
+        release.set()
+        loader.shutdown()
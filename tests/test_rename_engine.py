@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""rename_engine：規則編譯（compile_rules / NamingContext）、批次索引分配（BatchNamer）和重新命名計劃（build_rename_plan）"""
+
+import os
+
+from rename_engine import RenameRules, NamingContext, compile_rules, build_rename_plan, BatchNamer
+
+
+def _touch(directory, *names):
+    paths = []
+    for name in names:
+        path = os.path.join(str(directory), name)
+        open(path, 'wb').close()
+        paths.append(path)
+    return paths
+
+
+def _names(namer, count):
+    return [namer.name_for(i) for i in range(count)]
+
+
+def test_compile_rules_shares_one_context_per_rules_snapshot():
+    context = compile_rules(RenameRules(char_id='03'))
+    assert isinstance(context, NamingContext)
+    assert compile_rules(RenameRules(char_id='03')) is context
+    assert compile_rules(RenameRules(char_id='04')) is not context
+
+
+def test_naming_context_normalizes_character_fields():
+    context = NamingContext(RenameRules(char_id='7', char_type='Bogus', char_index='5 - 第五張'))
+    assert (context.char_id, context.char_type, context.char_index) == ('07', 'Idle', '05')
+    assert NamingContext(RenameRules(char_id='150', char_index='abc')).char_id == '99'
+    assert NamingContext(RenameRules(char_index='abc')).char_index == '01'
+    # Open 類型使用顏色索引（00-06）
+    assert NamingContext(RenameRules(char_type='Open', color='04', char_index='09')).char_index == '04'
+
+
+def test_naming_context_names_and_validates():
+    context = NamingContext(RenameRules(char_id='02', char_type='Intro', char_index='03'))
+    assert context.name_for("/x/a.PNG", 0) == "Character_02_Intro_03.png"
+    assert context.name_for("/x/a.mp4", 0, char_id_override='9', char_index='11') == "Character_09_Intro_11.mp4"
+    is_valid, error, parsed = context.validate("Character_02_Intro_03.png")
+    assert is_valid and error is None and parsed is not None
+    assert not context.validate("character_2_intro.png")[0]
+
+    dream = NamingContext(RenameRules(rule='dream', role='H_Cute', dream_index='4'))
+    assert dream.name_for("/x/a.JPG", 0) == "H_Cute_04.jpg"
+    anime = NamingContext(RenameRules(rule='dream', theme='Anime', anime_num='7'))
+    assert anime.name_for("/x/a.mp4", 0) == "A_07.mp4"
+    # 角色名稱中的非法字元按遊戲引擎模式清理
+    spaced = NamingContext(RenameRules(rule='dream', role='H Cute', dream_index='1'))
+    assert spaced.name_for("/x/a.png", 12) == "H_Cute_01.png"
+
+
+def test_batch_namer_allocates_distinct_indices_from_selected_index():
+    files = [f"/photos/{name}" for name in ("a.png", "b.jpg", "c.png")]
+    context = compile_rules(RenameRules(char_index='04'))
+    namer = BatchNamer(context, files, existing_names=lambda dir_path: set())
+    assert _names(namer, 3) == [
+        ("Character_01_Idle_04.png", None),
+        ("Character_01_Idle_05.jpg", None),
+        ("Character_01_Idle_06.png", None),
+    ]
+
+
+def test_batch_namer_skips_existing_stems_of_any_extension_and_keeps_matching_files():
+    files = ["/photos/a.png", "/photos/Character_01_Idle_02.png", "/photos/b.png"]
+    existing = {"Character_01_Idle_01.JPG", "Character_01_Idle_02.png"}
+    context = compile_rules(RenameRules(char_index='01'))
+    namer = BatchNamer(context, files, existing_names=lambda dir_path: existing)
+    new_names = [name for name, _ in _names(namer, 3)]
+    # 01 已被其他擴展名佔用；已符合的檔案保留 02
+    assert new_names == ["Character_01_Idle_03.png", "Character_01_Idle_02.png", "Character_01_Idle_04.png"]
+
+
+def test_batch_namer_wraps_and_reports_exhausted_range():
+    files = [f"/videos/v{i}.mp4" for i in range(9)]
+    context = compile_rules(RenameRules(char_type='Open', color='05'))
+    namer = BatchNamer(context, files, existing_names=lambda dir_path: set())
+    results = _names(namer, 9)
+    assert [name for name, _ in results[:7]] == [
+        f"Character_01_Open_{i:02d}.mp4" for i in (5, 6, 0, 1, 2, 3, 4)]
+    for name, error in results[7:]:
+        assert name is None
+        assert "索引已用完" in error
+
+
+def test_batch_namer_groups_by_folder_and_char_id_override():
+    files = ["/a/x.png", "/b/x.png", "/a/y.png", "/a/z.png"]
+    context = compile_rules(RenameRules())
+    namer = BatchNamer(context, files, {"/a/z.png": "7"}, existing_names=lambda dir_path: set())
+    assert [name for name, _ in _names(namer, 4)] == [
+        "Character_01_Idle_01.png", "Character_01_Idle_01.png",
+        "Character_01_Idle_02.png", "Character_07_Idle_01.png"]
+
+
+def test_batch_namer_falls_back_for_paths_outside_the_batch():
+    context = compile_rules(RenameRules(char_index='03'))
+    namer = BatchNamer(context, ["/a/x.png"], existing_names=lambda dir_path: set())
+    assert namer.name_for(5, "/a/other.png") == ("Character_01_Idle_03.png", None)
+
+
+def test_build_rename_plan_marks_exhausted_entries_as_errors(tmp_path):
+    files = _touch(tmp_path, *[f"v{i}.mp4" for i in range(8)])
+    plan = build_rename_plan(files, RenameRules(char_type='Open', color='00'))
+    assert len(plan.renames) == 7
+    assert [entry.old_path for entry in plan.errors] == files[7:]
+
+
+def test_build_rename_plan_separates_disk_conflicts_from_batch_duplicates(tmp_path):
+    files = _touch(tmp_path, "a.png", "b.png", "c.jpg")
+    _touch(tmp_path, "Ann_01.jpg")
+    plan = build_rename_plan(files, RenameRules(rule='dream', role='Ann'))
+    statuses = [(os.path.basename(entry.old_path), entry.new_name, entry.status) for entry in plan]
+    assert statuses == [
+        ("a.png", "Ann_01.png", "ok"),
+        ("b.png", "Ann_01.png", "duplicate"),
+        ("c.jpg", "Ann_01.jpg", "conflict"),
+    ]
+    assert [entry.old_path for entry in plan.duplicates] == [files[1]]
+    assert [entry.old_path for entry in plan.conflicts] == [files[2]]
+
+
+def test_build_rename_plan_keeps_file_already_named_correctly(tmp_path):
+    files = _touch(tmp_path, "Character_01_Idle_01.png")
+    plan = build_rename_plan(files, RenameRules())
+    entry, = plan
+    assert entry.status == "ok"
+    assert entry.new_path == os.path.normpath(files[0])
+
+
+def test_batch_namer_groups_mixed_separator_spellings_of_one_folder():
+    files = ["/a/./x.png", "/a//y.png", "/a/z.png"]
+    asked = []
+    context = compile_rules(RenameRules())
+    namer = BatchNamer(context, files, existing_names=lambda dir_path: asked.append(dir_path) or set())
+    assert [name for name, _ in _names(namer, 3)] == [
+        "Character_01_Idle_01.png", "Character_01_Idle_02.png", "Character_01_Idle_03.png"]
+    assert asked == [os.path.normcase("/a")]
+
+
+def test_rename_through_mixed_spelling_then_replan_skips_the_new_name(tmp_path):
+    from file_metadata import metadata_cache
+    base = str(tmp_path)
+    first, = _touch(tmp_path, "a.png")
+    first = base + "/./a.png"
+    entry, = build_rename_plan([first], RenameRules())
+    assert entry.status == "ok"
+    os.rename(first, entry.new_path)
+    metadata_cache.record_rename(first, entry.new_path)
+
+    second = _touch(tmp_path, "b.png")[0].replace(base, base + "//")
+    renamed = base + "/./" + entry.new_name
+    statuses = [(e.new_name, e.status) for e in build_rename_plan([renamed, second], RenameRules())]
+    assert statuses == [("Character_01_Idle_01.png", "ok"), ("Character_01_Idle_02.png", "ok")]
+
+
+def test_build_rename_plan_reports_every_status(tmp_path, monkeypatch):
+    # validate_file_path 不接受 Unix 絕對路徑，檢查原始檔案時使用相對路徑
+    monkeypatch.chdir(tmp_path)
+    _touch(".", "plan_a.png", "plan_b.png", "plan_c.jpg", "Ann_01.jpg")
+    files = ["plan_a.png", "plan_b.png", "plan_c.jpg", "plan_missing.png"]
+    plan = build_rename_plan(files, RenameRules(rule='dream', role='Ann'), check_files=True)
+    assert [(entry.new_name, entry.status) for entry in plan] == [
+        ("Ann_01.png", "ok"), ("Ann_01.png", "duplicate"), ("Ann_01.jpg", "conflict"), (None, "error")]
+    assert [entry.old_path for entry in plan.renames] == ["plan_a.png"]
+    assert [entry.old_path for entry in plan.errors] == ["plan_missing.png"]
+    assert plan.errors[0].error == "檔案不存在"
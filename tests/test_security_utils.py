@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""security_utils.safe_rename：不傳快取時直接查詢檔案系統，傳入快取時同步更新快取"""
+
+import os
+
+from file_metadata import FileMetadataCache
+from security_utils import safe_rename
+
+
+def test_safe_rename_without_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    open("a.png", 'wb').close()
+    assert safe_rename("a.png", "b.png") == (True, None)
+    assert os.listdir(".") == ["b.png"]
+    assert safe_rename("a.png", "c.png") == (False, "原始檔案不存在")
+
+
+def test_safe_rename_updates_given_cache_and_overwrites_target(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.png", "b.png"):
+        open(name, 'wb').close()
+    metadata = FileMetadataCache()
+    assert metadata.directory_names(".") == {"a.png", "b.png"}
+    assert safe_rename("a.png", "b.png", metadata) == (True, None)
+    assert os.listdir(".") == ["b.png"]
+    assert metadata.directory_names(".") == {"b.png"}
+    assert metadata.check_directories() == set()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""thumbnail_cache.thumbnail_key：由檔案中繼資料快取生成時不 stat，與直接 stat 生成的鍵相同"""
+
+import os
+
+from file_metadata import FileMetadataCache
+from thumbnail_cache import thumbnail_key
+
+
+def test_key_from_metadata_cache_matches_stat_and_skips_syscalls(tmp_path, monkeypatch):
+    path = tmp_path / "a.png"
+    path.write_bytes(b'x' * 10)
+    metadata = FileMetadataCache()
+    expected = thumbnail_key(str(path), (200, 200), True)
+    assert thumbnail_key(str(path), (200, 200), True, metadata=metadata) == expected
+
+    def no_stat(*args, **kwargs):
+        raise AssertionError("os.stat called")
+    monkeypatch.setattr(os, 'stat', no_stat)
+    assert thumbnail_key(str(path), [200, 200], True, metadata=metadata) == expected
+
+
+def test_missing_file_has_no_key(tmp_path):
+    missing = str(tmp_path / "missing.png")
+    assert thumbnail_key(missing, (64, 64)) is None
+    assert thumbnail_key(missing, (64, 64), metadata=FileMetadataCache()) is None
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+縮圖快取 - 在記憶體中保存已解碼的預覽縮圖（LRU，按位元組預算淘汰），
+避免在列表中來回切換時重複解碼同一張大圖；並在設定目錄下持久保存縮圖，
+下次開啟同一資料夾時只需讀取小檔案
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import THUMBNAIL_DIR
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+# 預設的記憶體預算（位元組）
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+# 預設的磁碟快取上限（位元組）
+DEFAULT_DISK_BUDGET = 256 * 1024 * 1024
+# 磁碟快取超過上限時淘汰到上限的比例（避免每次寫入都觸發淘汰）
+DISK_EVICT_TARGET = 0.8
+# 縮圖檔案的副檔名（PNG無損且支援透明度）
+DISK_THUMBNAIL_SUFFIX = ".png"
+# 臨時檔案超過此時間（秒）未修改才視為意外中斷留下的（其他處理程序可能正在寫入）
+STALE_TMP_SECONDS = 3600
+
+
+def thumbnail_key(file_path, max_size, high_quality=False, metadata=None):
+    """
+    生成縮圖快取鍵 (路徑, 修改時間, 大小, 縮圖尺寸, 是否高品質)
+
+    metadata 為 None 時重新 stat（一次系統調用），檔案被原地修改後修改時間改變，舊縮圖自然失效；
+    傳入檔案中繼資料快取時使用已快取的修改時間和大小（不需要系統調用，可在主線程中調用），
+    此時原地修改由快取的 refresh() 發現
+
+    Returns:
+        快取鍵，檔案不存在時返回 None
+    """
+    if metadata is not None:
+        cached = metadata.get(file_path)
+        if cached is None:
+            return None
+        return (file_path, cached.mtime, cached.size, tuple(max_size), bool(high_quality))
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_path, st.st_mtime, st.st_size, tuple(max_size), bool(high_quality))
+
+
+def image_nbytes(image):
+    """估算 PIL 圖片佔用的記憶體（寬 x 高 x 通道數）"""
+    width, height = image.size
+    return width * height * max(1, len(image.getbands()))
+
+
+class ThumbnailCache:
+    """
+    已解碼縮圖的 LRU 快取（執行緒安全）
+
+    - 值為 PIL 圖片（不是 PhotoImage），使用時再轉換，不依賴Tk
+    - 總大小超過預算時淘汰最久未使用的縮圖
+    - 常量佔位圖（例如影片的背景圖）單獨保存，不計入預算
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BUDGET):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()   # 鍵 -> (圖片, 位元組數)
+        self._placeholders = {}         # (類型, 尺寸) -> 圖片
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """
+        獲取快取的縮圖（命中時標記為最近使用）
+
+        Returns:
+            PIL 圖片，未命中時返回 None
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, image):
+        """加入縮圖（超過預算時淘汰最舊的項目；單張超過預算的圖片不快取）"""
+        if key is None or image is None:
+            return
+        nbytes = image_nbytes(image)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (image, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def placeholder(self, kind, max_size, factory):
+        """
+        獲取常量佔位圖（第一次使用時由 factory(max_size) 建立，之後重用）
+        """
+        key = (kind, tuple(max_size))
+        with self._lock:
+            image = self._placeholders.get(key)
+        if image is None:
+            image = factory(max_size)
+            with self._lock:
+                image = self._placeholders.setdefault(key, image)
+        return image
+
+    def invalidate_path(self, file_path):
+        """移除指定檔案的所有縮圖"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == file_path]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self._placeholders.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """快取統計（項目數、佔用位元組數、命中次數、未命中次數）"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class DiskThumbnailCache:
+    """
+    持久化的縮圖快取（執行緒安全）
+
+    - 檔名為快取鍵 (路徑, 修改時間, 大小, 縮圖尺寸) 的雜湊值，檔案改變後自然換成新的快取檔案
+    - 先寫入臨時檔案再 os.replace，中途失敗不會留下損壞的縮圖
+    - 讀取時更新快取檔案的修改時間，總大小超過上限時按修改時間淘汰最久未使用的
+    """
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR, max_bytes=DEFAULT_DISK_BUDGET):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.current_bytes = None   # 第一次使用時掃描目錄統計
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path_for(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.cache_dir, digest + DISK_THUMBNAIL_SUFFIX)
+
+    def _ensure_scanned(self):
+        """統計現有快取大小，並清理上次意外中斷留下的臨時檔案（需持有鎖）"""
+        if self.current_bytes is not None:
+            return
+        total = 0
+        stale_before = time.time() - STALE_TMP_SECONDS
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.name.endswith('.tmp'):
+                            # 只刪除很久未修改的臨時檔案，不影響其他處理程序正在進行的寫入
+                            if entry.stat().st_mtime < stale_before:
+                                os.remove(entry.path)
+                        elif entry.is_file():
+                            total += entry.stat().st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        self.current_bytes = total
+
+    def get(self, key):
+        """
+        讀取快取的縮圖
+
+        Returns:
+            PIL 圖片，未命中或無法讀取時返回 None
+        """
+        if key is None or not HAS_PIL:
+            return None
+        path = self._path_for(key)
+        try:
+            with Image.open(path) as cached:
+                cached.load()
+                image = cached.copy()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # 損壞的快取檔案，刪除後重新生成
+            self._discard(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)  # 標記為最近使用
+        except OSError:
+            pass
+        self.hits += 1
+        return image
+
+    def put(self, key, image):
+        """寫入縮圖（原子寫入，失敗時忽略）"""
+        if key is None or image is None or not HAS_PIL:
+            return
+        with self._lock:
+            self._ensure_scanned()
+        path = self._path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            os.makedirs(self.cache_dir, exist_ok=True)
+            image.save(tmp_path, format='PNG', compress_level=1)
+            size = os.path.getsize(tmp_path)
+            try:
+                # 取代已存在的縮圖時只計入大小的差值
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, path)
+        except Exception:
+            self._discard(tmp_path)
+            return
+        with self._lock:
+            self.current_bytes += size - old_size
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """按修改時間刪除最舊的縮圖，直到低於上限的 DISK_EVICT_TARGET（需持有鎖）"""
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(DISK_THUMBNAIL_SUFFIX):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * DISK_EVICT_TARGET
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.current_bytes = total
+
+    def clear(self):
+        """刪除所有快取的縮圖"""
+        with self._lock:
+            try:
+                with os.scandir(self.cache_dir) as entries:
+                    for entry in entries:
+                        self._discard(entry.path)
+            except OSError:
+                pass
+            self.current_bytes = 0
+
+
+# 全域縮圖快取實例
+thumbnail_cache = ThumbnailCache()
+disk_thumbnail_cache = DiskThumbnailCache()
@@ -8,6 +8,7 @@ import json
 from pathlib import Path
 from datetime import datetime
 from config import HISTORY_FILE, CONFIG_DIR
+from file_metadata import metadata_cache
 
 class HistoryManager:
     """歷史記錄管理器"""
@@ -74,13 +75,15 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.2f} {size_names[i]}"
 
 def get_file_info(file_path):
-    """獲取檔案資訊"""
+    """獲取檔案資訊（使用共用的中繼資料快取）"""
     try:
-        stat = os.stat(file_path)
+        metadata = metadata_cache.get(file_path)
+        if metadata is None:
+            raise FileNotFoundError(file_path)
         return {
-            "size": stat.st_size,
-            "size_formatted": format_file_size(stat.st_size),
-            "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+            "size": metadata.size,
+            "size_formatted": format_file_size(metadata.size),
+            "modified": datetime.fromtimestamp(metadata.mtime).strftime("%Y-%m-%d %H:%M:%S")
         }
     except Exception as e:
         return {
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+虛擬化列表元件 - 只繪製可見的行，適合顯示數萬個檔案
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class VirtualListView(tk.Canvas):
+    """
+    虛擬化列表（介面與 tk.Listbox 常用部分相容：curselection、selection_set、
+    selection_clear、see、size、yview 和 <<ListboxSelect>> 事件）
+
+    列表保存的是項目本身（例如檔案路徑），顯示文字由 label_func 產生。
+    只為可見的行建立畫布項目，捲動時重用；並維護 項目 -> 行 的索引，
+    交換或刪除項目時只需重繪受影響的可見行。
+    選擇模式等同 Listbox 的 EXTENDED（Shift/Ctrl 多選、拖曳選擇）。
+    """
+
+    # 自訂的顏色和字體選項（tk.Canvas 本身不支援，由 configure 攔截）
+    _STYLE_OPTIONS = ('fg', 'selectbackground', 'selectforeground', 'font')
+
+    def __init__(self, master, label_func=str, height=10, yscrollcommand=None, **kwargs):
+        self._bg = kwargs.pop('bg', kwargs.pop('background', 'white'))
+        self._fg = kwargs.pop('fg', 'black')
+        self._select_bg = kwargs.pop('selectbackground', '#3399FF')
+        self._select_fg = kwargs.pop('selectforeground', 'white')
+        self._font = tkfont.Font(font=kwargs.pop('font', 'TkDefaultFont'))
+        self.row_height = self._font.metrics('linespace') + 4
+
+        super().__init__(master, bg=self._bg, highlightthickness=1,
+                         height=height * self.row_height, **kwargs)
+
+        self._label_func = label_func
+        self._yscrollcommand = yscrollcommand
+        self._items = []            # 行 -> 項目
+        self._rows = {}             # 項目 -> 行
+        self._selection = set()     # 選中的行
+        self._anchor = None         # Shift選擇的錨點
+        self._active = None         # 鍵盤焦點行
+        self._top = 0               # 第一個可見行
+        self._pool = []             # 重用的 (背景矩形, 文字) 畫布項目
+        self._redraw_pending = False
+
+        self.bind('<Configure>', lambda e: self._schedule_redraw())
+        self.bind('<Button-1>', self._on_click)
+        self.bind('<Control-Button-1>', self._on_ctrl_click)
+        self.bind('<Shift-Button-1>', self._on_shift_click)
+        self.bind('<B1-Motion>', self._on_drag)
+        self.bind('<MouseWheel>', self._on_mousewheel)
+        self.bind('<Button-4>', lambda e: self._scroll_units(-3))
+        self.bind('<Button-5>', lambda e: self._scroll_units(3))
+        self.bind('<Up>', lambda e: self._on_key_move(-1, False))
+        self.bind('<Down>', lambda e: self._on_key_move(1, False))
+        self.bind('<Shift-Up>', lambda e: self._on_key_move(-1, True))
+        self.bind('<Shift-Down>', lambda e: self._on_key_move(1, True))
+        self.bind('<Prior>', lambda e: self._on_key_move(-self._visible_rows(), False))
+        self.bind('<Next>', lambda e: self._on_key_move(self._visible_rows(), False))
+        self.bind('<Home>', lambda e: self._on_key_move(-len(self._items), False))
+        self.bind('<End>', lambda e: self._on_key_move(len(self._items), False))
+
+    # ---------- 資料 ----------
+
+    def set_items(self, items):
+        """替換全部項目（清除選擇並捲動到頂部）"""
+        self._items = list(items)
+        self._rows = {item: row for row, item in enumerate(self._items)}
+        self._selection.clear()
+        self._anchor = self._active = None
+        self._top = 0
+        self._schedule_redraw()
+
+    def append_items(self, items):
+        """在末尾追加項目"""
+        start = len(self._items)
+        for offset, item in enumerate(items):
+            self._rows[item] = start + offset
+        self._items.extend(items)
+        if start < self._top + self._visible_rows() + 1:
+            self._schedule_redraw()
+        else:
+            self._update_scrollbar()
+
+    def remove_items(self, items):
+        """刪除指定項目（只重建第一個被刪除行之後的索引）"""
+        rows = sorted(self._rows[item] for item in items if item in self._rows)
+        if not rows:
+            return
+        remove_set = set(rows)
+        first = rows[0]
+        tail = [item for row, item in enumerate(self._items[first:], first) if row not in remove_set]
+        for item in items:
+            self._rows.pop(item, None)
+        del self._items[first:]
+        self._items.extend(tail)
+        for row in range(first, len(self._items)):
+            self._rows[self._items[row]] = row
+        self._selection.clear()
+        self._anchor = self._active = None
+        self._top = max(0, min(self._top, len(self._items) - self._visible_rows()))
+        self._schedule_redraw()
+
+    def swap_rows(self, row_a, row_b):
+        """交換兩行（只重繪這兩行）"""
+        items = self._items
+        items[row_a], items[row_b] = items[row_b], items[row_a]
+        self._rows[items[row_a]] = row_a
+        self._rows[items[row_b]] = row_b
+        self._draw_row(row_a)
+        self._draw_row(row_b)
+
+    def refresh_item(self, item):
+        """項目的顯示文字改變後重繪該行"""
+        row = self._rows.get(item)
+        if row is not None:
+            self._draw_row(row)
+
+    def item(self, row):
+        """返回指定行的項目"""
+        return self._items[row]
+
+    def row_of(self, item):
+        """返回項目所在的行（不在列表中時返回 None）"""
+        return self._rows.get(item)
+
+    def items(self):
+        """返回所有項目（按顯示順序）"""
+        return list(self._items)
+
+    def size(self):
+        return len(self._items)
+
+    def visible_row_count(self):
+        """一屏可顯示的行數"""
+        return self._visible_rows()
+
+    def visible_items(self):
+        """返回目前可見的項目"""
+        return self._items[self._top:self._top + self._visible_rows()]
+
+    # ---------- 選擇（Listbox相容） ----------
+
+    def _normalize_range(self, first, last):
+        if first == tk.END:
+            first = len(self._items) - 1
+        if last is None:
+            last = first
+        elif last == tk.END:
+            last = len(self._items) - 1
+        return int(first), int(last)
+
+    def curselection(self):
+        return tuple(sorted(self._selection))
+
+    def selection_set(self, first, last=None):
+        first, last = self._normalize_range(first, last)
+        for row in range(max(0, first), min(last, len(self._items) - 1) + 1):
+            self._selection.add(row)
+            self._draw_row(row)
+
+    def selection_clear(self, first, last=None):
+        first, last = self._normalize_range(first, last)
+        changed = [row for row in self._selection if first <= row <= last]
+        for row in changed:
+            self._selection.discard(row)
+            self._draw_row(row)
+
+    def selection_includes(self, row):
+        return row in self._selection
+
+    def see(self, row):
+        """捲動使指定行可見"""
+        visible = self._visible_rows()
+        if row < self._top:
+            self._set_top(row)
+        elif row >= self._top + visible:
+            self._set_top(row - visible + 1)
+
+    # ---------- 捲動（Scrollbar相容） ----------
+
+    def yview(self, *args):
+        total = len(self._items)
+        if not args:
+            if total == 0:
+                return 0.0, 1.0
+            return self._top / total, min(1.0, (self._top + self._visible_rows()) / total)
+        if args[0] == 'moveto':
+            self._set_top(int(round(float(args[1]) * total)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= max(1, self._visible_rows() - 1)
+            self._scroll_units(amount)
+
+    def _scroll_units(self, amount):
+        self._set_top(self._top + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # 阻止事件傳遞到主視窗的全域滾輪綁定
+        return self._scroll_units(int(-1 * (event.delta / 120)) * 3)
+
+    def _set_top(self, top):
+        top = max(0, min(top, len(self._items) - self._visible_rows()))
+        if top != self._top:
+            self._top = top
+            self._schedule_redraw()
+
+    # ---------- 外觀 ----------
+
+    def configure(self, cnf=None, **kwargs):
+        """支援 Listbox 風格的 fg/selectbackground/selectforeground/font 選項"""
+        if cnf:
+            kwargs.update(cnf)
+        styled = False
+        if 'bg' in kwargs or 'background' in kwargs:
+            self._bg = kwargs.get('bg', kwargs.get('background'))
+            styled = True
+        for option in self._STYLE_OPTIONS:
+            if option in kwargs:
+                value = kwargs.pop(option)
+                if option == 'fg':
+                    self._fg = value
+                elif option == 'selectbackground':
+                    self._select_bg = value
+                elif option == 'selectforeground':
+                    self._select_fg = value
+                else:
+                    self._font = tkfont.Font(font=value)
+                    self.row_height = self._font.metrics('linespace') + 4
+                styled = True
+        result = super().configure(**kwargs) if kwargs else None
+        if styled:
+            self._schedule_redraw()
+        return result
+
+    config = configure
+
+    # ---------- 繪製 ----------
+
+    def _visible_rows(self):
+        height = self.winfo_height()
+        if height <= 1:
+            height = int(self.cget('height'))
+        return max(1, height // self.row_height)
+
+    def _schedule_redraw(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _ensure_pool(self, count):
+        while len(self._pool) < count:
+            rect = self.create_rectangle(0, 0, 0, 0, width=0, state='hidden')
+            text = self.create_text(0, 0, anchor=tk.W, state='hidden')
+            self._pool.append((rect, text))
+
+    def _redraw(self):
+        """重繪所有可見行（只涉及可見行數量的畫布項目）"""
+        self._redraw_pending = False
+        self._ensure_pool(self._visible_rows() + 1)
+        for slot in range(len(self._pool)):
+            self._draw_slot(slot)
+        self._update_scrollbar()
+
+    def _draw_row(self, row):
+        """重繪單行（不可見時忽略）"""
+        slot = row - self._top
+        if 0 <= slot < len(self._pool) and not self._redraw_pending:
+            self._draw_slot(slot)
+
+    def _draw_slot(self, slot):
+        rect, text = self._pool[slot]
+        row = self._top + slot
+        if row >= len(self._items):
+            self.itemconfigure(rect, state='hidden')
+            self.itemconfigure(text, state='hidden')
+            return
+        y = slot * self.row_height
+        selected = row in self._selection
+        self.coords(rect, 0, y, max(self.winfo_width(), 1), y + self.row_height)
+        self.itemconfigure(rect, fill=self._select_bg, state='normal' if selected else 'hidden')
+        self.coords(text, 4, y + self.row_height // 2)
+        self.itemconfigure(text, text=self._label_func(self._items[row]), font=self._font,
+                           fill=self._select_fg if selected else self._fg, state='normal')
+
+    def _update_scrollbar(self):
+        if self._yscrollcommand:
+            first, last = self.yview()
+            self._yscrollcommand(first, last)
+
+    # ---------- 滑鼠和鍵盤選擇 ----------
+
+    def _row_at(self, y):
+        row = self._top + int(y) // self.row_height
+        return min(row, len(self._items) - 1)
+
+    def _notify_select(self):
+        self.event_generate('<<ListboxSelect>>')
+
+    def _select_only(self, rows):
+        previous = self._selection
+        self._selection = set(rows)
+        for row in previous ^ self._selection:
+            self._draw_row(row)
+
+    def _on_click(self, event):
+        self.focus_set()
+        if not self._items:
+            return
+        row = self._row_at(event.y)
+        self._anchor = self._active = row
+        self._select_only([row])
+        self._notify_select()
+
+    def _on_ctrl_click(self, event):
+        self.focus_set()
+        if not self._items:
+            return "break"
+        row = self._row_at(event.y)
+        self._anchor = self._active = row
+        if row in self._selection:
+            self._selection.discard(row)
+        else:
+            self._selection.add(row)
+        self._draw_row(row)
+        self._notify_select()
+        return "break"
+
+    def _on_shift_click(self, event):
+        self.focus_set()
+        if not self._items:
+            return "break"
+        row = self._row_at(event.y)
+        self._select_range_to(row)
+        return "break"
+
+    def _on_drag(self, event):
+        if not self._items or self._anchor is None:
+            return
+        row = max(0, self._row_at(event.y))
+        self.see(row)
+        if row != self._active:
+            self._select_range_to(row)
+
+    def _select_range_to(self, row):
+        anchor = self._anchor if self._anchor is not None else row
+        self._anchor = anchor
+        self._active = row
+        self._select_only(range(min(anchor, row), max(anchor, row) + 1))
+        self._notify_select()
+
+    def _on_key_move(self, delta, extend):
+        if not self._items:
+            return "break"
+        current = self._active if self._active is not None else -1
+        row = max(0, min(len(self._items) - 1, current + delta))
+        self.see(row)
+        if extend:
+            self._select_range_to(row)
+        else:
+            self._anchor = self._active = row
+            self._select_only([row])
+            self._notify_select()
+        return "break"